@@ -5,18 +5,55 @@ from .settings import (
     get_data_path,
     get_log_path,
     get_proxy_scores_path,
+    get_state_path,
+    get_archive_path,
     get_scraper_config,
     get_elasticsearch_config,
+    get_bulk_writer_config,
+    get_async_elasticsearch_config,
+    get_content_hash_config,
+    get_spool_config,
+    get_segment_config,
     get_alert_config,
     get_schedule_config,
     get_redis_config,
+    get_browser_pool_config,
+    get_fetch_config,
+    get_session_state_config,
+    get_proxyium_config,
+    get_archive_config,
+    get_replay_config,
+    get_budget_config,
+    get_site_worker_config,
+    get_pipeline_config,
+    get_frontier_config,
+    get_revisit_config,
+    get_seen_store_config,
     ScraperConfig,
     ElasticsearchConfig,
+    BulkWriterConfig,
+    AsyncElasticsearchConfig,
+    ContentHashConfig,
+    SpoolConfig,
+    SegmentConfig,
     AlertConfig,
     ScheduleConfig,
     RedisConfig,
+    BrowserPoolConfig,
+    FetchConfig,
+    SessionStateConfig,
+    ProxyiumConfig,
+    ArchiveConfig,
+    ReplayConfig,
+    BudgetConfig,
+    SiteWorkerConfig,
+    PipelineConfig,
+    FrontierConfig,
+    RevisitConfig,
+    SeenStoreConfig,
     CATEGORIES,
     ES_INDICES,
+    FIRST_SEEN_FIELDS,
     PROJECT_ROOT,
     print_config_summary,
 )
@@ -27,18 +64,55 @@ __all__ = [
     "get_data_path",
     "get_log_path", 
     "get_proxy_scores_path",
+    "get_state_path",
+    "get_archive_path",
     "get_scraper_config",
     "get_elasticsearch_config",
+    "get_bulk_writer_config",
+    "get_async_elasticsearch_config",
+    "get_content_hash_config",
+    "get_spool_config",
+    "get_segment_config",
     "get_alert_config",
     "get_schedule_config",
     "get_redis_config",
+    "get_browser_pool_config",
+    "get_fetch_config",
+    "get_session_state_config",
+    "get_proxyium_config",
+    "get_archive_config",
+    "get_replay_config",
+    "get_budget_config",
+    "get_site_worker_config",
+    "get_pipeline_config",
+    "get_frontier_config",
+    "get_revisit_config",
+    "get_seen_store_config",
     "ScraperConfig",
     "ElasticsearchConfig",
+    "BulkWriterConfig",
+    "AsyncElasticsearchConfig",
+    "ContentHashConfig",
+    "SpoolConfig",
+    "SegmentConfig",
     "AlertConfig",
     "ScheduleConfig",
     "RedisConfig",
+    "BrowserPoolConfig",
+    "FetchConfig",
+    "SessionStateConfig",
+    "ProxyiumConfig",
+    "ArchiveConfig",
+    "ReplayConfig",
+    "BudgetConfig",
+    "SiteWorkerConfig",
+    "PipelineConfig",
+    "FrontierConfig",
+    "RevisitConfig",
+    "SeenStoreConfig",
     "CATEGORIES",
     "ES_INDICES",
+    "FIRST_SEEN_FIELDS",
     "PROJECT_ROOT",
     "print_config_summary",
 ]
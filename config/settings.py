@@ -45,16 +45,22 @@ PATHS = {
         "data": PROJECT_ROOT / "junk_test",  # Local testing saves to junk_test
         "logs": PROJECT_ROOT / "logs",
         "proxy_scores": PROJECT_ROOT / "data" / "proxy_scores.json",
+        "state": PROJECT_ROOT / "data" / "state",
+        "archive": PROJECT_ROOT / "data" / "archive",
     },
     Environment.PRODUCTION: {
         "data": PROJECT_ROOT / "data" / "scraped",
         "logs": PROJECT_ROOT / "logs",
         "proxy_scores": PROJECT_ROOT / "data" / "proxy_scores.json",
+        "state": PROJECT_ROOT / "data" / "state",
+        "archive": PROJECT_ROOT / "data" / "archive",
     },
     Environment.DOCKER: {
         "data": Path("/app/data/scraped"),
         "logs": Path("/app/logs"),
         "proxy_scores": Path("/app/data/proxy_scores.json"),
+        "state": Path("/app/data/state"),
+        "archive": Path("/app/data/archive"),
     },
 }
 
@@ -83,6 +89,22 @@ def get_proxy_scores_path() -> Path:
     return path
 
 
+def get_state_path() -> Path:
+    """Get the directory for persistent scraper state (caches, indexes, ...)."""
+    env = get_environment()
+    path = PATHS[env]["state"]
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def get_archive_path() -> Path:
+    """Get the raw HTML archive directory."""
+    env = get_environment()
+    path = PATHS[env]["archive"]
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
 # ============================================================================
 # CATEGORIES CONFIGURATION
 # ============================================================================
@@ -98,6 +120,12 @@ ES_INDICES = {
     "multimedia": "multimedia",
 }
 
+# Fields kept from the first indexing of a document, by site_origine
+# (Krello shows the scrape date, not the posting date, as date_depot)
+FIRST_SEEN_FIELDS = {
+    "Krello.net": ["date_depot"],
+}
+
 
 # ============================================================================
 # SCRAPER CONFIGURATION
@@ -164,6 +192,310 @@ def get_scraper_config() -> ScraperConfig:
     return ScraperConfig.for_production()
 
 
+# ============================================================================
+# BROWSER POOL CONFIGURATION
+# ============================================================================
+
+@dataclass
+class BrowserPoolConfig:
+    """Configuration for the shared browser pool (scraper/crawler/browser_pool.py)."""
+
+    enabled: bool = field(default_factory=lambda: os.getenv("BROWSER_POOL_ENABLED", "true").lower() == "true")
+
+    # Warm browsers kept per (browser type, config fingerprint)
+    max_browsers_per_key: int = field(default_factory=lambda: int(os.getenv("BROWSER_POOL_SIZE", "2")))
+
+    # Recycle a browser after this many pages...
+    max_pages_per_browser: int = field(default_factory=lambda: int(os.getenv("BROWSER_POOL_MAX_PAGES", "200")))
+
+    # ...or once its process tree uses more than this much memory (needs psutil)
+    max_memory_mb: int = field(default_factory=lambda: int(os.getenv("BROWSER_POOL_MAX_MEMORY_MB", "1024")))
+
+    # Close browsers that stayed idle longer than this (seconds)
+    idle_timeout: int = field(default_factory=lambda: int(os.getenv("BROWSER_POOL_IDLE_TIMEOUT", "300")))
+
+    # Idle browsers kept across all keys; the least recently used are closed beyond it
+    # (per-call fingerprints - user agent, viewport, proxy - make most keys single-use)
+    max_idle_browsers: int = field(default_factory=lambda: int(os.getenv("BROWSER_POOL_MAX_IDLE", "4")))
+
+    # Request interception profile for sites without their own
+    # (allow-all, no-media, text-only - see scraper/crawler/interception.py)
+    interception_profile: str = field(default_factory=lambda: os.getenv("BROWSER_INTERCEPTION_PROFILE", "allow-all"))
+
+
+def get_browser_pool_config() -> BrowserPoolConfig:
+    """Get browser pool configuration."""
+    return BrowserPoolConfig()
+
+
+# ============================================================================
+# FETCH TIER CONFIGURATION
+# ============================================================================
+
+@dataclass
+class FetchConfig:
+    """Configuration for the HTTP-first tiered fetcher (scraper/crawler/tiered_fetcher.py)."""
+
+    # Try a plain HTTP request before launching a browser
+    http_first: bool = field(default_factory=lambda: os.getenv("HTTP_FIRST_ENABLED", "true").lower() == "true")
+
+    # Shared aiohttp connection pool
+    http_max_connections: int = field(default_factory=lambda: int(os.getenv("HTTP_MAX_CONNECTIONS", "50")))
+    http_timeout: int = field(default_factory=lambda: int(os.getenv("HTTP_TIMEOUT", "20")))  # seconds
+
+    # Consecutive HTTP misses before a site is pinned to the browser tier
+    http_fail_threshold: int = 3
+
+    # Re-try HTTP on browser-pinned sites every N fetches (sites can change)
+    tier_probe_interval: int = field(default_factory=lambda: int(os.getenv("FETCH_TIER_PROBE_INTERVAL", "50")))
+
+
+def get_fetch_config() -> FetchConfig:
+    """Get tiered fetcher configuration."""
+    return FetchConfig()
+
+
+# ============================================================================
+# SESSION STATE CONFIGURATION
+# ============================================================================
+
+@dataclass
+class SessionStateConfig:
+    """Configuration for the per-domain browser storage-state cache (scraper/crawler/session_state.py)."""
+
+    enabled: bool = field(default_factory=lambda: os.getenv("SESSION_STATE_ENABLED", "true").lower() == "true")
+
+    # Re-run consent/locale setup once a saved state is older than this
+    max_age_hours: float = field(default_factory=lambda: float(os.getenv("SESSION_STATE_MAX_AGE_HOURS", "24")))
+
+
+def get_session_state_config() -> SessionStateConfig:
+    """Get session state cache configuration."""
+    return SessionStateConfig()
+
+
+# ============================================================================
+# PROXYIUM GATEWAY CONFIGURATION
+# ============================================================================
+
+@dataclass
+class ProxyiumConfig:
+    """Configuration for the persistent Proxyium gateway (scraper/crawler/proxyium_gateway.py)."""
+
+    url: str = field(default_factory=lambda: os.getenv("PROXYIUM_URL", "https://proxyium.com/"))
+
+    # Seconds to wait for a proxied page (form submit or direct navigation)
+    navigation_timeout: int = field(default_factory=lambda: int(os.getenv("PROXYIUM_TIMEOUT", "45")))
+
+    # Consecutive failed URLs before the gateway browser is restarted
+    max_failures: int = field(default_factory=lambda: int(os.getenv("PROXYIUM_MAX_FAILURES", "2")))
+
+    # Restart a healthy session anyway after this many URLs (memory growth)
+    max_urls_per_session: int = field(default_factory=lambda: int(os.getenv("PROXYIUM_MAX_URLS", "300")))
+
+
+def get_proxyium_config() -> ProxyiumConfig:
+    """Get Proxyium gateway configuration."""
+    return ProxyiumConfig()
+
+
+# ============================================================================
+# HTML ARCHIVE CONFIGURATION
+# ============================================================================
+
+@dataclass
+class ArchiveConfig:
+    """Configuration for the raw HTML archive (scraper/crawler/html_archive.py)."""
+
+    # Store every successfully fetched page (off by default: it costs disk)
+    enabled: bool = field(default_factory=lambda: os.getenv("HTML_ARCHIVE_ENABLED", "false").lower() == "true")
+
+    # zstd level (1-22); 3 is zstd's default speed/ratio trade-off
+    compression_level: int = field(default_factory=lambda: int(os.getenv("HTML_ARCHIVE_LEVEL", "3")))
+
+
+def get_archive_config() -> ArchiveConfig:
+    """Get HTML archive configuration."""
+    return ArchiveConfig()
+
+
+# ============================================================================
+# REPLAY CONFIGURATION
+# ============================================================================
+
+@dataclass
+class ReplayConfig:
+    """Configuration for offline replay fetching (scraper/crawler/replay.py)."""
+
+    # "" = live fetching, "archive" = the raw HTML archive, anything else = fixture directory
+    source: str = field(default_factory=lambda: os.getenv("FETCH_REPLAY", ""))
+
+    # Simulated per-page latency (milliseconds): uniform in [latency - jitter, latency + jitter]
+    latency_ms: float = field(default_factory=lambda: float(os.getenv("REPLAY_LATENCY_MS", "0")))
+    jitter_ms: float = field(default_factory=lambda: float(os.getenv("REPLAY_JITTER_MS", "0")))
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.source)
+
+
+def get_replay_config() -> ReplayConfig:
+    """Get offline replay configuration."""
+    return ReplayConfig()
+
+
+# ============================================================================
+# RESOURCE BUDGET CONFIGURATION
+# ============================================================================
+
+@dataclass
+class BudgetConfig:
+    """Process-wide resource limits for concurrent scraping (scraper/crawler/budget.py). 0 = unlimited."""
+
+    # Browser leases in use at the same time, across all categories and sites
+    max_browsers: int = field(default_factory=lambda: int(os.getenv("MAX_BROWSERS", "8")))
+
+    # Page fetches (HTTP tier, Proxyium) in flight at the same time
+    max_inflight_requests: int = field(default_factory=lambda: int(os.getenv("MAX_INFLIGHT_REQUESTS", "64")))
+
+    # Resident memory of the scraper process tree (Chromium included)
+    max_rss_mb: int = field(default_factory=lambda: int(os.getenv("MAX_RSS_MB", "0")))
+
+
+def get_budget_config() -> BudgetConfig:
+    """Get resource budget configuration."""
+    return BudgetConfig()
+
+
+# ============================================================================
+# SITE WORKER CONFIGURATION
+# ============================================================================
+
+@dataclass
+class SiteWorkerConfig:
+    """Subprocess isolation for site scrapers (core/site_worker.py)."""
+
+    # Run each site in its own worker process instead of importing it in the dispatcher
+    enabled: bool = field(default_factory=lambda: os.getenv("SITE_ISOLATION", "false").lower() == "true")
+
+    # Worker processes running at once (0 = one per CPU core)
+    workers: int = field(default_factory=lambda: int(os.getenv("SITE_WORKERS", "0")))
+
+    # A worker is killed after this many seconds
+    timeout: int = field(default_factory=lambda: int(os.getenv("SITE_TIMEOUT", "3600")))
+
+    # A worker is killed when its process tree (Chromium included) goes above this RSS (0 = no limit)
+    max_rss_mb: int = field(default_factory=lambda: int(os.getenv("SITE_MAX_RSS_MB", "2048")))
+
+    @property
+    def worker_count(self) -> int:
+        return self.workers if self.workers > 0 else (os.cpu_count() or 1)
+
+
+def get_site_worker_config() -> SiteWorkerConfig:
+    """Get site worker configuration."""
+    return SiteWorkerConfig()
+
+
+# ============================================================================
+# CRAWL PIPELINE CONFIGURATION
+# ============================================================================
+
+@dataclass
+class PipelineConfig:
+    """Defaults for listing -> detail crawl pipelines (core/pipeline.py)."""
+
+    # Bound of each stage's input queue (producers wait when it is full)
+    queue_size: int = field(default_factory=lambda: int(os.getenv("PIPELINE_QUEUE_SIZE", "1000")))
+
+    # Seconds queued items may still be processed after shutdown is requested
+    drain_timeout: float = field(default_factory=lambda: float(os.getenv("PIPELINE_DRAIN_TIMEOUT", "60")))
+
+
+def get_pipeline_config() -> PipelineConfig:
+    """Get crawl pipeline configuration."""
+    return PipelineConfig()
+
+
+# ============================================================================
+# CRAWL FRONTIER CONFIGURATION
+# ============================================================================
+
+@dataclass
+class FrontierConfig:
+    """Default HOT / WARM / COLD recrawl zones (core/frontier.py)."""
+
+    # HOT: the first listing pages, revisited often so new ads land within minutes
+    hot_pages: int = field(default_factory=lambda: int(os.getenv("FRONTIER_HOT_PAGES", "1")))
+    hot_interval: int = field(default_factory=lambda: int(os.getenv("FRONTIER_HOT_INTERVAL", "300")))
+
+    # WARM: full listing crawl (0 = until the listing runs out)
+    warm_pages: int = field(default_factory=lambda: int(os.getenv("FRONTIER_WARM_PAGES", "0")))
+    warm_interval: int = field(default_factory=lambda: int(os.getenv("FRONTIER_WARM_INTERVAL", "7200")))
+
+    # COLD: full backfill
+    cold_interval: int = field(default_factory=lambda: int(os.getenv("FRONTIER_COLD_INTERVAL", "604800")))
+
+
+def get_frontier_config() -> FrontierConfig:
+    """Get crawl frontier configuration."""
+    return FrontierConfig()
+
+
+# ============================================================================
+# ADAPTIVE REVISIT CONFIGURATION
+# ============================================================================
+
+@dataclass
+class RevisitConfig:
+    """Yield-driven revisit intervals per site (core/revisit.py)."""
+
+    # Only run sites whose learned revisit interval elapsed (instead of every site each CYCLE_DELAY)
+    enabled: bool = field(default_factory=lambda: os.getenv("REVISIT_ADAPTIVE", "false").lower() == "true")
+
+    # Bounds of a learned interval (seconds)
+    min_interval: int = field(default_factory=lambda: int(os.getenv("REVISIT_MIN_INTERVAL", "900")))
+    max_interval: int = field(default_factory=lambda: int(os.getenv("REVISIT_MAX_INTERVAL", "259200")))
+
+    # New items a visit should find: interval = target / observed new items per hour
+    target_items: float = field(default_factory=lambda: float(os.getenv("REVISIT_TARGET_ITEMS", "25")))
+
+    # Interval growth after a visit that found nothing new
+    backoff: float = field(default_factory=lambda: float(os.getenv("REVISIT_BACKOFF", "2.0")))
+
+    # Weight of the latest visit in the moving averages (0-1)
+    smoothing: float = field(default_factory=lambda: float(os.getenv("REVISIT_SMOOTHING", "0.3")))
+
+
+def get_revisit_config() -> RevisitConfig:
+    """Get adaptive revisit configuration."""
+    return RevisitConfig()
+
+
+# ============================================================================
+# SEEN-ID STORE CONFIGURATION
+# ============================================================================
+
+@dataclass
+class SeenStoreConfig:
+    """Persistent per-site dedup store (core/seen_store.py)."""
+
+    # Seconds between checks for IDs appended by other processes
+    sync_interval: float = field(default_factory=lambda: float(os.getenv("SEEN_SYNC_INTERVAL", "5")))
+
+    # Log lines before it is folded into the snapshot (at least half the snapshot size)
+    compact_threshold: int = field(default_factory=lambda: int(os.getenv("SEEN_COMPACT_THRESHOLD", "100000")))
+
+    # Keep the snapshot on disk behind a Bloom filter instead of in a set (~10 bits per ID)
+    prefilter: bool = field(default_factory=lambda: os.getenv("SEEN_PREFILTER", "false").lower() == "true")
+    prefilter_fp_rate: float = field(default_factory=lambda: float(os.getenv("SEEN_PREFILTER_FP_RATE", "0.01")))
+
+
+def get_seen_store_config() -> SeenStoreConfig:
+    """Get seen-ID store configuration."""
+    return SeenStoreConfig()
+
+
 # ============================================================================
 # ELASTICSEARCH CONFIGURATION
 # ============================================================================
@@ -188,6 +520,131 @@ def get_elasticsearch_config() -> ElasticsearchConfig:
     return ElasticsearchConfig()
 
 
+# ============================================================================
+# BULK WRITER CONFIGURATION
+# ============================================================================
+
+@dataclass
+class BulkWriterConfig:
+    """Buffered Elasticsearch writes through helpers.streaming_bulk (core/bulk_writer.py)."""
+
+    # Buffer DataStorage saves instead of one index request per document
+    enabled: bool = field(default_factory=lambda: os.getenv("ES_BULK", "false").lower() == "true")
+
+    # A batch is sent at this many documents, bytes, or seconds since the oldest one
+    batch_size: int = field(default_factory=lambda: int(os.getenv("ES_BULK_SIZE", "500")))
+    max_bytes: int = field(default_factory=lambda: int(os.getenv("ES_BULK_MAX_BYTES", "5242880")))
+    max_age: float = field(default_factory=lambda: float(os.getenv("ES_BULK_MAX_AGE", "5")))
+
+    # Attempts per document after a rejection / connection error, first delay (doubles)
+    retries: int = field(default_factory=lambda: int(os.getenv("ES_BULK_RETRIES", "3")))
+    retry_delay: float = field(default_factory=lambda: float(os.getenv("ES_BULK_RETRY_DELAY", "2")))
+
+
+def get_bulk_writer_config() -> BulkWriterConfig:
+    """Get bulk writer configuration."""
+    return BulkWriterConfig()
+
+
+# ============================================================================
+# ASYNC ELASTICSEARCH CONFIGURATION
+# ============================================================================
+
+@dataclass
+class AsyncElasticsearchConfig:
+    """AsyncElasticsearch storage mode (DataStorage.save_async / save_batch_async)."""
+
+    # Index from coroutines with AsyncElasticsearch instead of the blocking client
+    enabled: bool = field(default_factory=lambda: os.getenv("ES_ASYNC", "false").lower() == "true")
+
+    # Connections of the pool shared by every storage on an event loop (= requests in flight)
+    max_connections: int = field(default_factory=lambda: int(os.getenv("ES_MAX_CONNECTIONS", "20")))
+    request_timeout: float = field(default_factory=lambda: float(os.getenv("ES_REQUEST_TIMEOUT", "30")))
+
+
+def get_async_elasticsearch_config() -> AsyncElasticsearchConfig:
+    """Get async Elasticsearch configuration."""
+    return AsyncElasticsearchConfig()
+
+
+# ============================================================================
+# CONTENT HASH CONFIGURATION
+# ============================================================================
+
+@dataclass
+class ContentHashConfig:
+    """Skip-unchanged Elasticsearch writes (core/content_hash.py)."""
+
+    # Unchanged documents get a date_verif touch instead of a full reindex
+    enabled: bool = field(default_factory=lambda: os.getenv("SKIP_UNCHANGED_WRITES", "false").lower() == "true")
+
+    # Touches sent per bulk request (without ES_BULK, which batches them itself)
+    touch_batch_size: int = field(default_factory=lambda: int(os.getenv("TOUCH_BATCH_SIZE", "500")))
+
+    # Extra fields left out of the hash, comma-separated (crawl dates always are)
+    ignore_fields: List[str] = field(default_factory=lambda: [
+        f.strip() for f in os.getenv("CONTENT_HASH_IGNORE_FIELDS", "").split(",") if f.strip()
+    ])
+
+
+def get_content_hash_config() -> ContentHashConfig:
+    """Get content hash configuration."""
+    return ContentHashConfig()
+
+
+# ============================================================================
+# WRITE-AHEAD SPOOL CONFIGURATION
+# ============================================================================
+
+@dataclass
+class SpoolConfig:
+    """Write-ahead spool of Elasticsearch writes (core/spool.py)."""
+
+    # Every document write is appended to the spool first and replayed if it fails
+    enabled: bool = field(default_factory=lambda: os.getenv("SPOOL", "true").lower() == "true")
+
+    # A segment is closed (and handed to the drainer) at this size or age
+    segment_bytes: int = field(default_factory=lambda: int(os.getenv("SPOOL_SEGMENT_BYTES", "8388608")))
+    segment_age: float = field(default_factory=lambda: float(os.getenv("SPOOL_SEGMENT_AGE", "60")))
+
+    # Disk cap: the oldest segments are dropped beyond it
+    max_bytes: int = field(default_factory=lambda: int(os.getenv("SPOOL_MAX_BYTES", "1073741824")))
+
+    # Drainer: seconds between replay passes (doubles while Elasticsearch is down), documents per bulk request
+    drain_interval: float = field(default_factory=lambda: float(os.getenv("SPOOL_DRAIN_INTERVAL", "10")))
+    drain_batch_size: int = field(default_factory=lambda: int(os.getenv("SPOOL_DRAIN_BATCH", "500")))
+
+    # fsync every record (survives a power loss, not only a crash)
+    fsync: bool = field(default_factory=lambda: os.getenv("SPOOL_FSYNC", "false").lower() == "true")
+
+
+def get_spool_config() -> SpoolConfig:
+    """Get write-ahead spool configuration."""
+    return SpoolConfig()
+
+
+# ============================================================================
+# JSONL SEGMENT CONFIGURATION
+# ============================================================================
+
+@dataclass
+class SegmentConfig:
+    """Local JSON output as rolling JSONL segments (core/segments.py)."""
+
+    # An open segment is closed at this many (uncompressed) bytes or this age in seconds
+    segment_bytes: int = field(default_factory=lambda: int(os.getenv("JSONL_SEGMENT_BYTES", "67108864")))
+    segment_age: float = field(default_factory=lambda: float(os.getenv("JSONL_SEGMENT_AGE", "3600")))
+
+    # Compress closed segments (zstd, gzip without the zstandard package)
+    compress: bool = field(default_factory=lambda: os.getenv("JSONL_COMPRESS", "true").lower() == "true")
+    compression_level: int = field(default_factory=lambda: int(os.getenv("JSONL_COMPRESSION_LEVEL", "3")))
+
+
+def get_segment_config() -> SegmentConfig:
+    """Get JSONL segment configuration."""
+    return SegmentConfig()
+
+
 # ============================================================================
 # ALERTING CONFIGURATION
 # ============================================================================
@@ -245,6 +702,13 @@ class ScheduleConfig:
     
     # Max runtime per category (seconds) before moving to next
     max_category_runtime: int = field(default_factory=lambda: int(os.getenv("MAX_CATEGORY_RUNTIME", "7200")))  # 2 hours
+    
+    # Run all categories of a cycle in parallel (category_delays become start offsets)
+    concurrent_categories: bool = field(default_factory=lambda: os.getenv("CONCURRENT_CATEGORIES", "false").lower() == "true")
+    
+    # Run the sites of a category in parallel (at most max_parallel_sites at once)
+    parallel_sites: bool = field(default_factory=lambda: os.getenv("PARALLEL_SITES", "false").lower() == "true")
+    max_parallel_sites: int = field(default_factory=lambda: int(os.getenv("MAX_PARALLEL_SITES", "3")))
 
 
 def get_schedule_config() -> ScheduleConfig:
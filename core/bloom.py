@@ -0,0 +1,134 @@
+"""
+Kloufi-Scrape Bloom Filter
+
+Compact probabilistic set membership: "definitely not seen" or "maybe seen",
+at about 10 bits per item for a 1% false-positive rate (a Python set of
+listing IDs costs 60-100 bytes per item).
+
+    bloom = BloomFilter.create(capacity=2_000_000, fp_rate=0.01)
+    bloom.add("48254269")
+    bloom.save(path)
+
+    shared = BloomFilter.open(path)     # read-only mmap: one copy in the page cache for all processes
+    if "48254269" not in shared:
+        ...                             # definitely new
+
+The file is a small header (bits, hash count, item count, a caller-defined
+tag) followed by the bit array, so `open()` maps it without reading it.
+"""
+
+import hashlib
+import math
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Union
+
+MAGIC = b"KLBLOOM1"
+HEADER = struct.Struct("<8sQQQQ")   # magic, bits, hashes, count, tag
+
+
+class BloomFilter:
+    """Bit array + double hashing (blake2b split into two 64-bit hashes)."""
+
+    def __init__(self, bits: int, hashes: int, buffer: Any, count: int = 0, tag: int = 0, offset: int = 0):
+        self.bits = bits
+        self.hashes = hashes
+        self.count = count
+        self.tag = tag                      # Free for the owner, e.g. the size of the data it covers
+        self._buffer = buffer               # bytearray (writable) or read-only mmap
+        self._offset = offset               # Start of the bit array in the buffer
+
+    @staticmethod
+    def optimal(capacity: int, fp_rate: float) -> tuple:
+        """(bits, hashes) for `capacity` items at `fp_rate`."""
+        capacity = max(capacity, 1)
+        bits = max(int(math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2)), 64)
+        hashes = max(int(round(bits / capacity * math.log(2))), 1)
+        return bits, hashes
+
+    @classmethod
+    def create(cls, capacity: int, fp_rate: float = 0.01, tag: int = 0) -> "BloomFilter":
+        bits, hashes = cls.optimal(capacity, fp_rate)
+        return cls(bits, hashes, bytearray((bits + 7) // 8), tag=tag)
+
+    @classmethod
+    def from_items(cls, items: Iterable[str], capacity: int, fp_rate: float = 0.01, tag: int = 0) -> "BloomFilter":
+        bloom = cls.create(capacity, fp_rate, tag)
+        for item in items:
+            bloom.add(item)
+        return bloom
+
+    @classmethod
+    def open(cls, path: Union[str, Path]) -> Optional["BloomFilter"]:
+        """Map a saved filter read-only. None if the file is missing or not a filter."""
+        try:
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        if len(mapped) < HEADER.size:
+            mapped.close()
+            return None
+        magic, bits, hashes, count, tag = HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC or len(mapped) < HEADER.size + (bits + 7) // 8:
+            mapped.close()
+            return None
+        return cls(bits, hashes, mapped, count=count, tag=tag, offset=HEADER.size)
+
+    # ------------------------------------------------------------------
+    # Membership
+    # ------------------------------------------------------------------
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.bits
+
+    def add(self, item: str):
+        buffer, offset = self._buffer, self._offset
+        for position in self._positions(item):
+            buffer[offset + (position >> 3)] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        buffer, offset = self._buffer, self._offset
+        for position in self._positions(item):
+            if not buffer[offset + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def save(self, path: Union[str, Path]):
+        """Write the filter atomically (header + bit array)."""
+        path = Path(path)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, self.bits, self.hashes, self.count, self.tag))
+            f.write(self._buffer[self._offset:self._offset + (self.bits + 7) // 8])
+        os.replace(tmp_path, path)
+
+    def close(self):
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+    @property
+    def fp_rate(self) -> float:
+        """Expected false-positive rate at the current fill."""
+        return (1 - math.exp(-self.hashes * self.count / self.bits)) ** self.hashes
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "items": self.count,
+            "bits": self.bits,
+            "hashes": self.hashes,
+            "size_mb": round(self.bits / 8 / (1024 * 1024), 2),
+            "fp_rate": round(self.fp_rate, 5),
+        }
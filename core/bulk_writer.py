@@ -0,0 +1,295 @@
+"""
+Kloufi-Scrape Bulk Writer
+
+Buffers Elasticsearch documents and sends them with `helpers.streaming_bulk`
+from a background thread, instead of one blocking `index` call per document:
+
+    writer = get_bulk_writer(es_client)
+    writer.add({"_index": "voiture", "_id": url, "_source": doc}, on_done=callback)
+    writer.flush()      # end of a site run: wait until everything added is acknowledged
+    close_bulk_writer() # shutdown: flush and stop the thread (also run at exit)
+
+A batch is sent as soon as ES_BULK_SIZE documents or ES_BULK_MAX_BYTES are
+buffered, or the oldest buffered document is ES_BULK_MAX_AGE seconds old.
+
+Each document is retried on its own: a rejected (429), failed (5xx) or
+unsent (connection error) document goes back to the buffer, up to
+ES_BULK_RETRIES times with a growing delay; a document the cluster refuses
+(mapping error, 400) fails at once. `on_done(ok, created)` is called once
+per document with the final outcome (from the writer thread).
+
+`add()` blocks while 4 batches are waiting, so a stalled cluster slows the
+scrapers down instead of filling the memory.
+"""
+
+import atexit
+import json
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import BulkWriterConfig, get_bulk_writer_config
+from scraper.utils.logger import get_logger
+
+logger = get_logger("bulk_writer")
+
+try:
+    from elasticsearch import helpers
+except ImportError:
+    helpers = None
+
+# Statuses worth sending again (anything else is the document's fault)
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+@dataclass
+class _Pending:
+    """One buffered document."""
+    action: Dict[str, Any]
+    size: int
+    added_at: float
+    on_done: Optional[Callable[[bool, bool], None]] = None
+    attempts: int = 0
+
+
+class BulkWriter:
+    """Background thread batching index actions into bulk requests."""
+
+    def __init__(self, client: Any, config: Optional[BulkWriterConfig] = None):
+        if helpers is None:
+            raise RuntimeError("Elasticsearch not installed. Install with: pip install elasticsearch")
+        self.client = client
+        self.config = config or get_bulk_writer_config()
+        self.max_pending = self.config.batch_size * 4
+
+        self._buffer: Deque[_Pending] = deque()
+        self._bytes = 0
+        self._outstanding = 0               # Added and not finally acknowledged / failed
+        self._flushing = 0                  # Callers waiting in flush()
+        self._closing = False
+        self._cond = threading.Condition()
+
+        self._stats = {
+            "added": 0, "created": 0, "updated": 0, "failed": 0,
+            "retries": 0, "batches": 0, "bytes_sent": 0, "blocked_adds": 0,
+        }
+        self._send_time = 0.0
+        self._started = time.monotonic()
+
+        self._thread = threading.Thread(target=self._run, name="es-bulk-writer", daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+
+    def add(self, action: Dict[str, Any], on_done: Optional[Callable[[bool, bool], None]] = None):
+        """Buffer one bulk action (`_index`, `_id`, `_source`)."""
+        size = len(json.dumps(action.get("_source", action), ensure_ascii=False, default=str))
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("Bulk writer is closed")
+            if self._outstanding >= self.max_pending:
+                self._stats["blocked_adds"] += 1
+                while self._outstanding >= self.max_pending and not self._closing:
+                    self._cond.wait()
+            self._buffer.append(_Pending(action, size, time.monotonic(), on_done))
+            self._bytes += size
+            self._outstanding += 1
+            self._stats["added"] += 1
+            self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None, until: Optional[Callable[[], bool]] = None) -> bool:
+        """
+        Send what is buffered and wait for it. False if `timeout` ran out first.
+
+        With `until`, only wait until it returns True (e.g. the documents of
+        one site run are acknowledged), not for every outstanding document.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flushing += 1
+            self._cond.notify_all()
+            try:
+                while self._outstanding if until is None else not until():
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+            finally:
+                self._flushing -= 1
+        return True
+
+    def close(self, timeout: Optional[float] = None):
+        """Flush, then stop the writer thread."""
+        self.flush(timeout)
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._thread.join(timeout=5)
+        s = self.stats
+        logger.info(
+            f"Bulk writer closed: {s['created']} created, {s['updated']} updated, {s['failed']} failed, "
+            f"{s['retries']} retries in {s['batches']} batches ({s['docs_per_sec']} docs/s)"
+        )
+
+    # ------------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------------
+
+    def _ready(self) -> bool:
+        if not self._buffer:
+            return False
+        return (
+            self._flushing
+            or self._closing
+            or len(self._buffer) >= self.config.batch_size
+            or self._bytes >= self.config.max_bytes
+            or time.monotonic() - self._buffer[0].added_at >= self.config.max_age
+        )
+
+    def _take_batch(self) -> List[_Pending]:
+        batch, size = [], 0
+        while self._buffer and len(batch) < self.config.batch_size:
+            item = self._buffer[0]
+            if batch and size + item.size > self.config.max_bytes:
+                break
+            self._buffer.popleft()
+            self._bytes -= item.size
+            size += item.size
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._ready():
+                    if self._closing and not self._buffer:
+                        return
+                    timeout = None
+                    if self._buffer:
+                        timeout = max(self._buffer[0].added_at + self.config.max_age - time.monotonic(), 0.01)
+                    self._cond.wait(timeout)
+                batch = self._take_batch()
+
+            retry = self._send(batch)
+            if retry:
+                attempt = max(item.attempts for item in retry)
+                time.sleep(min(self.config.retry_delay * 2 ** (attempt - 1), 60))
+                with self._cond:
+                    # Back to the front: retried documents keep their place
+                    for item in reversed(retry):
+                        self._buffer.appendleft(item)
+                        self._bytes += item.size
+                    self._cond.notify_all()
+
+    def _send(self, batch: List[_Pending]) -> List[_Pending]:
+        """One bulk request. Returns the documents to send again."""
+        retry: List[_Pending] = []
+        done = 0
+        started = time.monotonic()
+        try:
+            results = helpers.streaming_bulk(
+                self.client,
+                [item.action for item in batch],
+                chunk_size=len(batch),
+                max_chunk_bytes=max(self.config.max_bytes * 2, 1024 * 1024),
+                raise_on_error=False,
+                raise_on_exception=False,
+                max_retries=0,
+            )
+            for ok, info in results:
+                item = batch[done]
+                done += 1
+                result = next(iter(info.values()), {}) if info else {}
+                if ok:
+                    self._finish(item, True, result.get("result") == "created")
+                elif self._retryable(item, result.get("status")):
+                    retry.append(item)
+                else:
+                    logger.warning(f"Bulk index failed for {result.get('_id')}: {result.get('error')}")
+                    self._finish(item, False, False)
+        except Exception as e:
+            logger.warning(f"Bulk request failed after {done}/{len(batch)} documents: {e}")
+            for item in batch[done:]:
+                if self._retryable(item, None):
+                    retry.append(item)
+                else:
+                    self._finish(item, False, False)
+
+        with self._cond:
+            self._send_time += time.monotonic() - started
+            self._stats["batches"] += 1
+            self._stats["bytes_sent"] += sum(item.size for item in batch)
+            self._stats["retries"] += len(retry)
+        return retry
+
+    def _retryable(self, item: _Pending, status: Any) -> bool:
+        item.attempts += 1
+        if item.attempts > self.config.retries:
+            return False
+        return not isinstance(status, int) or status in RETRY_STATUSES
+
+    def _finish(self, item: _Pending, ok: bool, created: bool):
+        # Callback first: a flush() that returns has seen every outcome counted
+        if item.on_done is not None:
+            try:
+                item.on_done(ok, created)
+            except Exception as e:
+                logger.error(f"Bulk writer callback error: {e}")
+        with self._cond:
+            self._stats["created" if created else "updated" if ok else "failed"] += 1
+            self._outstanding -= 1
+            self._cond.notify_all()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            indexed = self._stats["created"] + self._stats["updated"]
+            return {
+                **self._stats,
+                "pending": self._outstanding,
+                "send_seconds": round(self._send_time, 2),
+                "docs_per_sec": round(indexed / self._send_time, 1) if self._send_time else 0.0,
+                "docs_per_sec_overall": round(indexed / max(time.monotonic() - self._started, 1e-6), 1),
+            }
+
+
+# ============================================================================
+# CONVENIENCE FUNCTIONS
+# ============================================================================
+
+# Process-wide writer (one thread for every index)
+_writer: Optional[BulkWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_bulk_writer(client: Any) -> BulkWriter:
+    """Get or start the process-wide bulk writer (on `client` the first time)."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = BulkWriter(client)
+            # The thread is a daemon: make sure a plain exit still sends the buffer
+            atexit.register(close_bulk_writer)
+        return _writer
+
+
+def flush_bulk_writer(timeout: Optional[float] = None, until: Optional[Callable[[], bool]] = None) -> bool:
+    """Wait until every buffered document (or `until`) is acknowledged (no-op without a writer)."""
+    return _writer.flush(timeout, until) if _writer is not None else True
+
+
+def close_bulk_writer(timeout: Optional[float] = None):
+    """Flush and stop the process-wide writer."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close(timeout)
@@ -0,0 +1,266 @@
+"""
+Kloufi-Scrape Listing Card Index
+
+Fingerprints of listing cards (title, price, date, photo count as shown on
+the listing page), keyed by listing ID. A zone pass can then tell from the
+listing page alone whether an ad is new, unchanged, or changed since its
+detail page was last fetched:
+
+    cards = get_card_index("voiture/ouedkniss")
+    change = cards.check(listing_id, card)
+    if change.status in ("new", "changed"):
+        await scrape_detail(card.url)
+        cards.record(listing_id, card, change)     # only once the record is saved: a failed one is retried next pass
+
+A changed price is also appended to a price-event log, so price drops are
+kept even though only the latest version of an ad is stored:
+
+    {"id": "48254269", "url": "...", "old_price": "1450000", "new_price": "1390000", "at": "..."}
+
+Files in data/state/cards/ (one ad per line, last line wins):
+
+    <namespace>.tsv            compacted snapshot: id, fingerprint, price, updated_at
+    <namespace>.log            appended since the last compaction
+    <namespace>.prices.jsonl   price-change events
+
+The log is folded into the snapshot once it passes SEEN_COMPACT_THRESHOLD
+lines. A card without any fingerprint field (a listing that only gives
+URLs) has no fingerprint and is handled by the seen-ID store alone.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import get_seen_store_config, get_state_path
+from scraper.utils.logger import get_logger
+
+logger = get_logger("card_index")
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+@dataclass
+class Card:
+    """What a listing page shows about one ad."""
+    url: str
+    title: Optional[str] = None
+    price: Optional[str] = None
+    date: Optional[str] = None
+    photos: Optional[int] = None
+    extra: Dict[str, Any] = field(default_factory=dict)   # Other fields a site wants fingerprinted
+
+    @property
+    def normalized_price(self) -> Optional[str]:
+        """Digits of the price ("1 450 000 DA" -> "1450000"), or the trimmed text."""
+        if not self.price:
+            return None
+        digits = re.sub(r"[^\d]", "", str(self.price))
+        return digits or " ".join(str(self.price).split())
+
+    @property
+    def fingerprint(self) -> Optional[str]:
+        """Hash of the card fields (None when the card has none)."""
+        values = {
+            "title": " ".join(self.title.split()).lower() if self.title else None,
+            "price": self.normalized_price,
+            "date": " ".join(self.date.split()) if self.date else None,
+            "photos": self.photos,
+            **{key: self.extra[key] for key in sorted(self.extra)},
+        }
+        if all(value in (None, "") for value in values.values()):
+            return None
+        payload = json.dumps(values, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class CardChange:
+    """Result of comparing a card with the index."""
+    status: str                                 # "new", "changed", "unchanged" or "untracked"
+    fingerprint: Optional[str] = None
+    old_price: Optional[str] = None
+    new_price: Optional[str] = None
+
+    @property
+    def price_changed(self) -> bool:
+        return self.status == "changed" and self.old_price != self.new_price and bool(self.new_price)
+
+
+class CardIndex:
+    """Listing ID -> (card fingerprint, price), persisted as snapshot + append-only log."""
+
+    def __init__(self, namespace: str, directory: Optional[Path] = None):
+        self.namespace = namespace
+        self.compact_threshold = get_seen_store_config().compact_threshold
+        directory = directory or get_state_path() / "cards"
+        directory.mkdir(parents=True, exist_ok=True)
+        slug = namespace.replace("/", "__")
+        self.snapshot_path = directory / f"{slug}.tsv"
+        self.log_path = directory / f"{slug}.log"
+        self.events_path = directory / f"{slug}.prices.jsonl"
+
+        self._cards: Dict[str, Tuple[str, str]] = {}   # id -> (fingerprint, price)
+        self._lock = threading.Lock()
+        self._log_fd = os.open(str(self.log_path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._log_lines = 0
+        self._stats = {"new": 0, "changed": 0, "unchanged": 0, "untracked": 0, "price_changes": 0}
+
+        for path in (self.snapshot_path, self.log_path):
+            lines = self._replay(path)
+            if path == self.log_path:
+                self._log_lines = lines
+        logger.info(f"[{namespace}] {len(self._cards)} listing card fingerprints loaded")
+
+    def _replay(self, path: Path) -> int:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                lines = 0
+                for line in f:
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) >= 3 and parts[0]:
+                        self._cards[parts[0]] = (parts[1], parts[2])
+                        lines += 1
+                return lines
+        except FileNotFoundError:
+            return 0
+
+    def __len__(self) -> int:
+        return len(self._cards)
+
+    def __contains__(self, listing_id: str) -> bool:
+        return listing_id in self._cards
+
+    # ------------------------------------------------------------------
+    # Change detection
+    # ------------------------------------------------------------------
+
+    def check(self, listing_id: str, card: Card) -> CardChange:
+        """Compare a card with its last recorded version (does not record anything)."""
+        fingerprint = card.fingerprint
+        if fingerprint is None:
+            change = CardChange("untracked")
+        else:
+            known = self._cards.get(listing_id)
+            if known is None:
+                change = CardChange("new", fingerprint, new_price=card.normalized_price)
+            elif known[0] == fingerprint:
+                change = CardChange("unchanged", fingerprint)
+            else:
+                change = CardChange("changed", fingerprint, old_price=known[1] or None,
+                                    new_price=card.normalized_price)
+        self._stats[change.status] += 1
+        return change
+
+    def record(self, listing_id: str, card: Card, change: Optional[CardChange] = None):
+        """Store the card's fingerprint (and log a price change) once its detail page was handled."""
+        change = change or self.check(listing_id, card)
+        if change.fingerprint is None:
+            return
+        price = card.normalized_price or ""
+        with self._lock:
+            self._cards[listing_id] = (change.fingerprint, price)
+            line = f"{listing_id}\t{change.fingerprint}\t{price}\t{int(time.time())}\n"
+            self._append(line)
+            self._log_lines += 1
+            if change.price_changed:
+                self._stats["price_changes"] += 1
+                event = {
+                    "id": listing_id,
+                    "url": card.url,
+                    "old_price": change.old_price,
+                    "new_price": change.new_price,
+                    "at": datetime.now().isoformat(),
+                }
+                with open(self.events_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        if change.price_changed:
+            logger.info(f"[{self.namespace}] Price change for {listing_id}: {change.old_price} -> {change.new_price}")
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+
+    def _append(self, line: str):
+        # Shared lock: appends of several processes may interleave, not overlap a compaction
+        if fcntl is not None:
+            fcntl.flock(self._log_fd, fcntl.LOCK_SH)
+        try:
+            os.write(self._log_fd, line.encode("utf-8"))
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._log_fd, fcntl.LOCK_UN)
+
+    def compact(self):
+        """Rewrite the snapshot from memory and empty the log."""
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._log_fd, fcntl.LOCK_EX)
+            try:
+                # Entries other processes appended since we loaded
+                self._replay(self.log_path)
+                tmp_path = self.snapshot_path.with_name(f"{self.snapshot_path.name}.{os.getpid()}.tmp")
+                now = int(time.time())
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    for listing_id, (fingerprint, price) in self._cards.items():
+                        f.write(f"{listing_id}\t{fingerprint}\t{price}\t{now}\n")
+                os.replace(tmp_path, self.snapshot_path)
+                os.truncate(self.log_path, 0)
+                self._log_lines = 0
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._log_fd, fcntl.LOCK_UN)
+        logger.info(f"[{self.namespace}] Compacted to {len(self._cards)} card fingerprints")
+
+    def save(self):
+        """Records are on disk already; compact when the log is due."""
+        if self._log_lines >= max(self.compact_threshold, len(self._cards) // 2):
+            self.compact()
+
+    def close(self):
+        self.save()
+        try:
+            os.close(self._log_fd)
+        except OSError:
+            pass
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "cards": len(self._cards), "log_lines": self._log_lines}
+
+
+# ============================================================================
+# CONVENIENCE FUNCTIONS
+# ============================================================================
+
+# One index per namespace and process
+_indexes: Dict[str, CardIndex] = {}
+
+
+def get_card_index(namespace: str, **kwargs) -> CardIndex:
+    """Get or open the listing card index of `namespace` (usually "category/site")."""
+    index = _indexes.get(namespace)
+    if index is None:
+        index = CardIndex(namespace, **kwargs)
+        _indexes[namespace] = index
+    return index
+
+
+def close_card_indexes():
+    """Compact (when due) and close every open index."""
+    for index in list(_indexes.values()):
+        index.close()
+    _indexes.clear()
@@ -5,21 +5,35 @@ Generic runner that discovers and executes site scrapers for a category.
 """
 
 import asyncio
+import contextvars
 import importlib
+import inspect
 import os
 import sys
+import time
 from pathlib import Path
 from typing import Dict, Any, Optional, List
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from config import get_scraper_config, CATEGORIES, get_data_path, Environment, get_environment
+from config import get_scraper_config, get_schedule_config, CATEGORIES, get_data_path, Environment, get_environment
 from scraper.utils.logger import get_logger
 from scraper.proxy.proxy_manager import ProxyManager
+from scraper.crawler.readiness import ReadinessProfile, get_site_profiles
+from core.site_worker import get_site_worker_pool
+from core.revisit import get_revisit_scheduler, track_new_items
+from core.storage import track_site_writes
+from scraper.crawler.budget import Slots
+from scraper.crawler.html_archive import current_site
 
 logger = get_logger("category_runner")
 
+# Sites run in this process share sys.path and their top-level sibling modules
+# (`main`, `scrape_details`, ...): only one runs at a time. Parallel sites and
+# concurrent categories run theirs in worker processes instead
+_in_process_sites = Slots("in_process_sites", 1)
+
 
 @dataclass
 class SiteConfig:
@@ -29,6 +43,27 @@ class SiteConfig:
     module_path: str
     enabled: bool = True
     priority: int = 0  # Higher = run first
+    readiness: Dict[str, ReadinessProfile] = field(default_factory=dict)  # Page kind -> profile
+    group: Optional[str] = None  # Sites sharing a domain (parallel mode limits them together)
+    max_parallel: int = 1  # Sites of the same group allowed to run at once
+    
+    @property
+    def key(self) -> str:
+        return f"{self.category}/{self.name}"
+
+
+# Scheduling overrides per "category/site". Slow sites get a higher priority
+# so that in parallel mode they start first instead of becoming the tail.
+SITE_SCHEDULING: Dict[str, Dict[str, Any]] = {
+    "immobilier/ouedkniss": {"priority": 10},
+    "immobilier/krello": {"priority": 5},
+    "voiture/ouedkniss": {"priority": 10},
+    "emploi/emploitic": {"priority": 5},
+    "emploi/ouedkniss-offres": {"priority": 5, "group": "ouedkniss.com"},
+    "emploi/ouedkniss-demandes": {"group": "ouedkniss.com"},
+    "multimedia/jumia": {"group": "jumia.dz"},
+    "multimedia/jumia_laptops": {"group": "jumia.dz"},
+}
 
 
 class CategoryRunner:
@@ -67,6 +102,8 @@ class CategoryRunner:
                     name=site_dir.name,
                     category=self.category,
                     module_path=f"sites.{self.category}.{site_dir.name}.main",
+                    readiness=get_site_profiles(self.category, site_dir.name),
+                    **SITE_SCHEDULING.get(f"{self.category}/{site_dir.name}", {}),
                 ))
         
         # Sort by priority
@@ -80,24 +117,59 @@ class CategoryRunner:
         proxy_manager: Optional[ProxyManager],
         config: Any,
         shutdown_event: asyncio.Event,
+        isolated: bool = False,
     ) -> Dict[str, Any]:
-        """Run a single site scraper."""
+        """Run a single site scraper (in a worker process when `isolated`)."""
         logger.info(f"Starting site: {site.name}")
         
+        started = time.monotonic()
+        if isolated:
+            result = await get_site_worker_pool().run(site, shutdown_event)
+        else:
+            async with _in_process_sites.hold():
+                with track_new_items() as counter, track_site_writes() as writes:
+                    result = await self._run_site_in_process(site, proxy_manager, config, shutdown_event)
+                    # This site's buffered documents are acknowledged (and counted) before the visit is recorded
+                    await asyncio.to_thread(writes.flush)
+            # Sites that save through core storage report new documents; others only their own count
+            result["new_items"] = counter.new_items if counter.saved else result.get("items_scraped", 0)
+        
+        ended = time.monotonic()
+        result.update(wall_time=round(ended - started, 1), _interval=(started, ended))
+        return result
+    
+    async def _run_site_in_process(
+        self,
+        site: SiteConfig,
+        proxy_manager: Optional[ProxyManager],
+        config: Any,
+        shutdown_event: asyncio.Event,
+    ) -> Dict[str, Any]:
+        """Import and run a site scraper inside this process."""
         items_scraped = 0
         errors = 0
         
+        site_dir = _site_dir(site)
+        sys.path.insert(0, site_dir)
+        # Pages the site fetches without a site key are archived under it
+        archive_token = current_site.set(site.key)
         try:
             # Import the site module
-            module = importlib.import_module(site.module_path)
+            module = _import_site_module(site, site_dir)
             
             # Check for required function
             if hasattr(module, "run_scraper"):
                 # New-style async scraper
+                kwargs = {}
+                if "readiness" in inspect.signature(module.run_scraper).parameters:
+                    # Module-level READINESS overrides the registered profiles
+                    kwargs["readiness"] = {**site.readiness, **getattr(module, "READINESS", {})}
+                
                 result = await module.run_scraper(
                     proxy_manager=proxy_manager,
                     config=config,
                     shutdown_event=shutdown_event,
+                    **kwargs,
                 )
                 items_scraped = result.get("items_scraped", 0)
                 errors = result.get("errors", 0)
@@ -105,21 +177,30 @@ class CategoryRunner:
             elif hasattr(module, "main"):
                 # Old-style main() function - wrap it
                 if asyncio.iscoroutinefunction(module.main):
-                    await module.main()
+                    if "shutdown_event" in inspect.signature(module.main).parameters:
+                        # Pipeline-based sites drain their queues on shutdown
+                        await module.main(shutdown_event=shutdown_event)
+                    else:
+                        await module.main()
                 else:
-                    # Run sync function in executor
+                    # Run sync function in executor (with our context, so its saves are counted)
                     loop = asyncio.get_event_loop()
-                    await loop.run_in_executor(None, module.main)
+                    await loop.run_in_executor(None, contextvars.copy_context().run, module.main)
                     
             else:
                 logger.warning(f"Site {site.name} has no run_scraper or main function")
                 errors = 1
                 
-        except Exception as e:
-            logger.error(f"Error running site {site.name}: {e}")
+        except (Exception, SystemExit) as e:
+            # SystemExit: legacy scripts call sys.exit() on import/setup errors
+            logger.error(f"Error running site {site.name}: {e!r}")
             import traceback
             logger.error(traceback.format_exc())
             errors = 1
+        finally:
+            current_site.reset(archive_token)
+            if site_dir in sys.path:
+                sys.path.remove(site_dir)
         
         return {
             "site": site.name,
@@ -133,6 +214,9 @@ class CategoryRunner:
         config: Optional[Any] = None,
         shutdown_event: Optional[asyncio.Event] = None,
         sites: Optional[List[str]] = None,
+        parallel: Optional[bool] = None,
+        isolated: Optional[bool] = None,
+        adaptive: Optional[bool] = None,
     ) -> Dict[str, Any]:
         """
         Run all (or specified) site scrapers for this category.
@@ -142,6 +226,10 @@ class CategoryRunner:
             config: Scraper configuration
             shutdown_event: Event to signal shutdown
             sites: Optional list of specific sites to run
+            parallel: Run sites concurrently (default: PARALLEL_SITES)
+            isolated: Run each site in a worker process (default: SITE_ISOLATION)
+            adaptive: Only run the sites due for a revisit, most expected
+                new items first (default: REVISIT_ADAPTIVE)
             
         Returns:
             Dict with aggregated results
@@ -149,6 +237,19 @@ class CategoryRunner:
         if config is None:
             config = get_scraper_config()
         
+        schedule_config = get_schedule_config()
+        if parallel is None:
+            parallel = schedule_config.parallel_sites
+        if isolated is None:
+            isolated = get_site_worker_pool().enabled
+        if parallel and not isolated:
+            # In-process sites cannot overlap (shared sys.path / sibling modules)
+            logger.warning(f"{self.category}: PARALLEL_SITES without SITE_ISOLATION, running sites in worker processes")
+            isolated = True
+        revisits = get_revisit_scheduler()
+        if adaptive is None:
+            adaptive = revisits.enabled
+        
         if shutdown_event is None:
             shutdown_event = asyncio.Event()
         
@@ -156,6 +257,13 @@ class CategoryRunner:
         sites_to_run = self.sites
         if sites:
             sites_to_run = [s for s in self.sites if s.name in sites]
+        elif adaptive:
+            revisits.refresh()
+            due = [s for s in sites_to_run if revisits.due(s.key)]
+            logger.info(f"{self.category}: {len(due)}/{len(sites_to_run)} sites due for a revisit")
+            if not due:
+                return {"category": self.category, "items_scraped": 0, "errors": 0, "sites": []}
+            sites_to_run = revisits.order(due, key=lambda s: s.key)
         
         if not sites_to_run:
             logger.warning(f"No sites to run for {self.category}")
@@ -164,33 +272,166 @@ class CategoryRunner:
         total_items = 0
         total_errors = 0
         site_results = []
+        started = time.monotonic()
         
-        for site in sites_to_run:
-            if shutdown_event.is_set():
-                logger.info("Shutdown requested, stopping category run")
-                break
-            
-            result = await self.run_site(
-                site=site,
-                proxy_manager=proxy_manager,
-                config=config,
-                shutdown_event=shutdown_event,
+        if parallel:
+            site_results = await self._run_parallel(
+                sites_to_run, proxy_manager, config, shutdown_event,
+                max(schedule_config.max_parallel_sites, 1), isolated,
             )
-            
-            site_results.append(result)
+        else:
+            for site in sites_to_run:
+                if shutdown_event.is_set():
+                    logger.info("Shutdown requested, stopping category run")
+                    break
+                
+                result = await self.run_site(
+                    site=site,
+                    proxy_manager=proxy_manager,
+                    config=config,
+                    shutdown_event=shutdown_event,
+                    isolated=isolated,
+                )
+                
+                site_results.append(result)
+                self._record_visit(site, result, shutdown_event)
+                
+                # Small delay between sites
+                if not shutdown_event.is_set():
+                    await asyncio.sleep(2)
+        
+        for result in site_results:
             total_items += result.get("items_scraped", 0)
             total_errors += result.get("errors", 0)
-            
-            # Small delay between sites
-            if not shutdown_event.is_set():
-                await asyncio.sleep(2)
+        
+        wall_time = time.monotonic() - started
+        _add_overlap(site_results)
+        busy_time = sum(r.get("wall_time", 0) for r in site_results)
+        logger.info(
+            f"{self.category}: {len(site_results)} sites in {wall_time:.0f}s "
+            f"({busy_time:.0f}s of site time, parallelism x{busy_time / wall_time if wall_time else 0:.1f})"
+        )
         
         return {
             "category": self.category,
             "items_scraped": total_items,
             "errors": total_errors,
             "sites": site_results,
+            "wall_time": round(wall_time, 1),
+            "parallel": parallel,
+            "isolated": isolated,
+            "adaptive": adaptive,
         }
+    
+    def _record_visit(self, site: SiteConfig, result: Dict[str, Any], shutdown_event: asyncio.Event):
+        """Let the revisit scheduler learn from a finished visit (interrupted ones say nothing)."""
+        if shutdown_event.is_set() or result.get("status") in ("shutdown", "skipped"):
+            return
+        get_revisit_scheduler().record_visit(site.key, result.get("new_items", 0), result.get("errors", 0))
+    
+    def due_sites(self) -> List[SiteConfig]:
+        """Sites whose revisit interval elapsed."""
+        revisits = get_revisit_scheduler()
+        revisits.refresh()
+        return [s for s in self.sites if revisits.due(s.key)]
+    
+    def next_due_in(self) -> float:
+        """Seconds until the next site of this category is due."""
+        return get_revisit_scheduler().next_due_in(s.key for s in self.sites)
+    
+    async def _run_parallel(
+        self,
+        sites_to_run: List[SiteConfig],
+        proxy_manager: Optional[ProxyManager],
+        config: Any,
+        shutdown_event: asyncio.Event,
+        max_parallel: int,
+        isolated: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Run sites concurrently, at most `max_parallel` at a time.
+        
+        Sites start in the given order (priority, or expected new items in
+        adaptive mode); sites of the same `group` (shared domain) are
+        additionally limited to the group's `max_parallel`.
+        """
+        slots = asyncio.Semaphore(max_parallel)
+        group_limits: Dict[str, int] = {}
+        for site in sites_to_run:
+            if site.group:
+                group_limits[site.group] = min(site.max_parallel, group_limits.get(site.group, site.max_parallel))
+        group_slots = {group: asyncio.Semaphore(max(limit, 1)) for group, limit in group_limits.items()}
+        
+        async def _run(site: SiteConfig) -> Optional[Dict[str, Any]]:
+            group = group_slots.get(site.group) if site.group else None
+            if group is not None:
+                await group.acquire()
+            try:
+                async with slots:
+                    if shutdown_event.is_set():
+                        return None
+                    result = await self.run_site(
+                        site=site,
+                        proxy_manager=proxy_manager,
+                        config=config,
+                        shutdown_event=shutdown_event,
+                        isolated=isolated,
+                    )
+                    self._record_visit(site, result, shutdown_event)
+                    return result
+            finally:
+                if group is not None:
+                    group.release()
+        
+        # Tasks are created in order, so the semaphores admit them in that order
+        results = await asyncio.gather(*[_run(site) for site in sites_to_run])
+        if shutdown_event.is_set():
+            logger.info("Shutdown requested, remaining sites skipped")
+        return [r for r in results if r is not None]
+
+
+def _add_overlap(site_results: List[Dict[str, Any]]):
+    """
+    Replace each result's internal `_interval` with `overlap`: the seconds
+    during which at least one other site of the category was running.
+    """
+    intervals = [r.pop("_interval", None) for r in site_results]
+    for i, result in enumerate(site_results):
+        if intervals[i] is None:
+            continue
+        start, end = intervals[i]
+        others = sorted(iv for j, iv in enumerate(intervals) if j != i and iv is not None)
+        overlap = 0.0
+        cursor = start
+        for other_start, other_end in others:
+            lo, hi = max(other_start, cursor), min(other_end, end)
+            if hi > lo:
+                overlap += hi - lo
+                cursor = hi
+        result["overlap"] = round(overlap, 1)
+
+
+def _site_dir(site: SiteConfig) -> str:
+    return str(Path(__file__).parent.parent / "sites" / site.category / site.name)
+
+
+def _import_site_module(site: SiteConfig, site_dir: str):
+    """
+    Import a site's main module.
+
+    Legacy sites import their siblings as top-level modules
+    (`from scrape_details import ...`), so the site directory must be on
+    sys.path, and a sibling cached by another site must not be reused.
+    """
+    sites_root = Path(__file__).parent.parent / "sites"
+    for name, module in list(sys.modules.items()):
+        module_file = getattr(module, "__file__", None)
+        if "." in name or not module_file:
+            continue
+        module_dir = Path(module_file).parent
+        if sites_root in module_dir.parents and str(module_dir) != site_dir:
+            del sys.modules[name]
+    return importlib.import_module(site.module_path)
 
 
 # Cache of runners
@@ -215,6 +456,9 @@ async def main():
     parser = argparse.ArgumentParser(description="Run category scraper")
     parser.add_argument("category", choices=CATEGORIES)
     parser.add_argument("--sites", nargs="+", help="Specific sites to run")
+    parser.add_argument("--parallel", action="store_true", default=None, help="Run sites concurrently")
+    parser.add_argument("--isolated", action="store_true", default=None, help="Run each site in a worker process")
+    parser.add_argument("--adaptive", action="store_true", default=None, help="Only run sites due for a revisit")
     args = parser.parse_args()
     
     runner = get_runner(args.category)
@@ -223,7 +467,9 @@ async def main():
     for site in runner.sites:
         print(f"  - {site.name}")
     
-    result = await runner.run(sites=args.sites)
+    result = await runner.run(
+        sites=args.sites, parallel=args.parallel, isolated=args.isolated, adaptive=args.adaptive,
+    )
     print(f"\nResult: {result}")
 
 
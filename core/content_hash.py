@@ -0,0 +1,262 @@
+"""
+Kloufi-Scrape Content Hashes
+
+Skip reindexing documents whose content did not change since they were last
+written. A recrawl of an unchanged ad only differs in `date_crawl` /
+`date_verif`, yet a full `index` rewrites the document (segment merges,
+bandwidth). Storage hashes the business fields of each document instead:
+
+    h = content_hash(doc)                         # stable: key order, crawl dates ignored
+    cache = get_content_hash_cache("immobilier")
+    if cache.get(doc_id) == h:
+        ...                                       # unchanged: a batched date_verif touch
+    else:
+        ...                                       # full write, then cache.set(doc_id, h)
+
+The hash is also stored in the document as `_content_hash`.
+
+The cache is one file pair per index in data/state/content_hashes/ (the
+card index layout: a compacted snapshot plus an append-only log, last line
+wins). Processes writing the same index pick up each other's lines at most
+every SEEN_SYNC_INTERVAL seconds; a stale entry only ever costs a full write
+or, when a touch hits a document that no longer exists, is dropped.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import get_content_hash_config, get_seen_store_config, get_state_path
+from core.first_seen import first_seen_fields
+from scraper.utils.logger import get_logger
+
+logger = get_logger("content_hash")
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Set on every crawl: never part of the content
+VOLATILE_FIELDS = {"date_crawl", "date_verif", "_content_hash"}
+
+
+def content_hash(data: Dict[str, Any], ignore: Iterable[str] = ()) -> str:
+    """Hash of the business fields of a document (crawl dates and first-seen fields excluded)."""
+    skipped = VOLATILE_FIELDS.union(ignore, first_seen_fields(data), get_content_hash_config().ignore_fields)
+    fields = {key: value for key, value in data.items() if key not in skipped}
+    payload = json.dumps(fields, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _key(doc_id: str) -> str:
+    # Document IDs are URLs: a fixed-size digest keeps the cache small
+    return hashlib.blake2b(str(doc_id).encode("utf-8"), digest_size=8).hexdigest()
+
+
+class ContentHashCache:
+    """Document ID -> content hash of the last full write, for one index."""
+
+    def __init__(self, namespace: str, directory: Optional[Path] = None):
+        self.namespace = namespace
+        seen_config = get_seen_store_config()
+        self.compact_threshold = seen_config.compact_threshold
+        self.sync_interval = seen_config.sync_interval
+        directory = directory or get_state_path() / "content_hashes"
+        directory.mkdir(parents=True, exist_ok=True)
+        slug = namespace.replace("/", "__")
+        self.snapshot_path = directory / f"{slug}.tsv"
+        self.log_path = directory / f"{slug}.log"
+
+        self._hashes: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._log_fd = os.open(str(self.log_path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._log_offset = 0
+        self._log_lines = 0
+        self._synced_at = time.monotonic()
+        self._stats = {"hits": 0, "misses": 0, "dropped": 0}
+
+        self._load()
+        logger.info(f"[{namespace}] {len(self._hashes)} content hashes loaded")
+
+    # ------------------------------------------------------------------
+    # Files
+    # ------------------------------------------------------------------
+
+    def _snapshot_signature(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.snapshot_path)
+            return (st.st_ino, st.st_mtime_ns)
+        except FileNotFoundError:
+            return None
+
+    def _load(self):
+        self._snapshot_id = self._snapshot_signature()
+        self._hashes = {}
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                self._apply(f.read().splitlines())
+        except FileNotFoundError:
+            pass
+        self._log_offset = 0
+        self._log_lines = 0
+        self._read_log()
+
+    def _apply(self, lines) -> int:
+        applied = 0
+        for line in lines:
+            key, _, value = line.partition("\t")
+            if not key:
+                continue
+            if value:
+                self._hashes[key] = value
+            else:
+                self._hashes.pop(key, None)     # Dropped entry
+            applied += 1
+        return applied
+
+    def _read_log(self):
+        """Apply what was appended to the log since the last read."""
+        with open(self.log_path, "rb") as f:
+            f.seek(self._log_offset)
+            data = f.read()
+        # Only complete lines: a concurrent append may be half written
+        end = data.rfind(b"\n") + 1
+        if end:
+            self._log_lines += self._apply(data[:end].decode("utf-8").splitlines())
+            self._log_offset += end
+
+    def _append(self, line: str):
+        # Shared lock: appends of several processes may interleave, not overlap a compaction
+        if fcntl is not None:
+            fcntl.flock(self._log_fd, fcntl.LOCK_SH)
+        try:
+            os.write(self._log_fd, line.encode("utf-8"))
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._log_fd, fcntl.LOCK_UN)
+
+    def sync(self, force: bool = False):
+        """Pick up other processes' writes (at most every SEEN_SYNC_INTERVAL seconds)."""
+        now = time.monotonic()
+        if not force and now - self._synced_at < self.sync_interval:
+            return
+        self._synced_at = now
+        with self._lock:
+            self._catch_up()
+
+    def _catch_up(self):
+        if self._snapshot_signature() != self._snapshot_id:
+            # Compacted by another process: the log restarted from zero
+            self._load()
+        else:
+            self._read_log()
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def get(self, doc_id: str) -> Optional[str]:
+        self.sync()
+        value = self._hashes.get(_key(doc_id))
+        self._stats["hits" if value else "misses"] += 1
+        return value
+
+    def set(self, doc_id: str, value: str):
+        """Record the content hash of a full write."""
+        self._write(_key(doc_id), value)
+
+    def discard(self, doc_id: str):
+        """Forget a document (its next save is a full write)."""
+        self._stats["dropped"] += 1
+        self._write(_key(doc_id), "")
+
+    def _write(self, key: str, value: str):
+        with self._lock:
+            # Read other processes' lines first: jumping the offset past them
+            # would keep them out of memory, and compact() would then drop them
+            self._catch_up()
+            if self._hashes.get(key, "") == value:
+                return
+            self._append(f"{key}\t{value}\n")
+            # Applied by reading it back, in file order with anything appended meanwhile
+            self._read_log()
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+
+    def compact(self):
+        """Rewrite the snapshot from memory and empty the log."""
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._log_fd, fcntl.LOCK_EX)
+            try:
+                # Lines other processes appended since we last read
+                self._read_log()
+                tmp_path = self.snapshot_path.with_name(f"{self.snapshot_path.name}.{os.getpid()}.tmp")
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    for key, value in self._hashes.items():
+                        f.write(f"{key}\t{value}\n")
+                os.replace(tmp_path, self.snapshot_path)
+                os.truncate(self.log_path, 0)
+                self._snapshot_id = self._snapshot_signature()
+                self._log_offset = 0
+                self._log_lines = 0
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._log_fd, fcntl.LOCK_UN)
+        logger.info(f"[{self.namespace}] Compacted to {len(self._hashes)} content hashes")
+
+    def save(self):
+        """Writes are on disk already; compact when the log is due."""
+        if self._log_lines >= max(self.compact_threshold, len(self._hashes) // 2):
+            self.compact()
+
+    def close(self):
+        self.save()
+        try:
+            os.close(self._log_fd)
+        except OSError:
+            pass
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "hashes": len(self._hashes), "log_lines": self._log_lines}
+
+
+# ============================================================================
+# CONVENIENCE FUNCTIONS
+# ============================================================================
+
+# One cache per index and process
+_caches: Dict[str, ContentHashCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_content_hash_cache(namespace: str, **kwargs) -> ContentHashCache:
+    """Get or open the content hash cache of `namespace` (an index name)."""
+    with _caches_lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            cache = ContentHashCache(namespace, **kwargs)
+            _caches[namespace] = cache
+        return cache
+
+
+def close_content_hash_caches():
+    """Compact (when due) and close every open cache."""
+    with _caches_lock:
+        for cache in list(_caches.values()):
+            cache.close()
+        _caches.clear()
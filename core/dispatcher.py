@@ -27,11 +27,23 @@ from config import (
 )
 from core.alerting import get_alert_manager, cleanup_alerts, AlertLevel
 from scraper.utils.logger import get_logger
-from scraper.proxy.proxy_sources import fetch_proxies
+from scraper.proxy.proxy_sources import fetch_and_validate_proxies
 from scraper.proxy.proxy_manager import ProxyManager
+from scraper.crawler.browser_pool import close_browser_pool, close_idle_browsers
+from scraper.crawler.tiered_fetcher import close_fetcher
+from scraper.crawler.interception import interception_stats
+from scraper.crawler.session_state import get_session_state_cache
+from scraper.crawler.replay import configure_replay, get_replay_backend
+from scraper.crawler.budget import get_resource_budget
+from core.site_worker import get_site_worker_pool
+from core.revisit import get_revisit_scheduler
+from core.storage import close_async_es_client, close_storages
 
 logger = get_logger("dispatcher")
 
+# Shortest sleep between cycles in adaptive revisit mode
+MIN_ADAPTIVE_WAIT = 60
+
 
 class ScraperDispatcher:
     """
@@ -48,12 +60,20 @@ class ScraperDispatcher:
         self,
         categories: Optional[List[str]] = None,
         single_run: bool = False,
+        concurrent: Optional[bool] = None,
     ):
         self.categories = categories or CATEGORIES
         self.single_run = single_run
         self.config = get_scraper_config()
         self.schedule_config = get_schedule_config()
         self.alert_manager = get_alert_manager()
+        self.concurrent = self.schedule_config.concurrent_categories if concurrent is None else concurrent
+        if self.concurrent and not get_site_worker_pool().enabled:
+            # In-process sites run one at a time, which would serialize the categories
+            logger.warning("Concurrent categories without SITE_ISOLATION: running sites in worker processes")
+            get_site_worker_pool().config.enabled = True
+        self.budget = get_resource_budget()
+        self.revisits = get_revisit_scheduler()
         
         # State tracking
         self._running = False
@@ -72,11 +92,13 @@ class ScraperDispatcher:
         """Initialize dispatcher resources."""
         logger.info("Initializing dispatcher...")
         
-        # Fetch proxies if enabled
-        if self.config.use_proxies:
+        # Fetch proxies if enabled (never in replay mode: nothing goes online)
+        if get_replay_backend().enabled:
+            logger.info(f"Replay mode: pages served from '{get_replay_backend().config.source}', proxies skipped")
+        elif self.config.use_proxies:
             logger.info("Fetching proxies...")
             try:
-                proxies = await fetch_proxies()
+                proxies = await fetch_and_validate_proxies()
                 self._proxy_manager = ProxyManager(proxies)
                 logger.info(f"Loaded {len(proxies)} proxies")
             except Exception as e:
@@ -118,12 +140,16 @@ class ScraperDispatcher:
             # Run the scraper with timeout
             timeout = self.schedule_config.max_category_runtime
             
+            # Concurrent categories cannot share this process's sys.path / sibling
+            # modules: their sites run in worker processes
+            run_kwargs = {"isolated": True} if self.concurrent else {}
             try:
                 result = await asyncio.wait_for(
                     scraper_module.run(
                         proxy_manager=self._proxy_manager,
                         config=self.config,
                         shutdown_event=self._shutdown_event,
+                        **run_kwargs,
                     ),
                     timeout=timeout
                 )
@@ -200,30 +226,39 @@ class ScraperDispatcher:
         cycle_start = datetime.now()
         results = {}
         
-        logger.info(f"Starting scrape cycle #{self._cycle_count}")
+        logger.info(f"Starting scrape cycle #{self._cycle_count}{' (concurrent)' if self.concurrent else ''}")
         
-        for i, category in enumerate(self.categories):
-            if self._shutdown_event.is_set():
-                logger.info("Shutdown requested, stopping cycle")
-                break
-            
-            # Apply category delay (stagger requests)
-            delay = self.schedule_config.category_delays.get(category, 0)
-            if delay > 0 and i > 0:
-                logger.info(f"Waiting {delay}s before starting {category}")
-                try:
-                    await asyncio.wait_for(
-                        self._shutdown_event.wait(),
-                        timeout=delay
-                    )
-                    # If we get here, shutdown was requested
+        categories = self.categories
+        if self.revisits.enabled:
+            # Categories without a site due for a revisit sit this cycle out
+            categories = [c for c in self.categories if self._due_sites(c)]
+            logger.info(f"Categories with sites due: {categories or 'none'}")
+        
+        if self.concurrent:
+            results = await self._run_categories_concurrently(categories)
+        else:
+            for i, category in enumerate(categories):
+                if self._shutdown_event.is_set():
+                    logger.info("Shutdown requested, stopping cycle")
                     break
-                except asyncio.TimeoutError:
-                    pass  # Normal, delay completed
-            
-            # Run the category
-            result = await self.run_category(category)
-            results[category] = result.get("items_scraped", 0)
+                
+                # Apply category delay (stagger requests)
+                delay = self.schedule_config.category_delays.get(category, 0)
+                if delay > 0 and i > 0:
+                    logger.info(f"Waiting {delay}s before starting {category}")
+                    try:
+                        await asyncio.wait_for(
+                            self._shutdown_event.wait(),
+                            timeout=delay
+                        )
+                        # If we get here, shutdown was requested
+                        break
+                    except asyncio.TimeoutError:
+                        pass  # Normal, delay completed
+                
+                # Run the category
+                result = await self.run_category(category)
+                results[category] = result.get("items_scraped", 0)
         
         cycle_duration = (datetime.now() - cycle_start).total_seconds()
         
@@ -234,6 +269,56 @@ class ScraperDispatcher:
         
         return results
     
+    async def _run_categories_concurrently(self, categories: List[str]) -> Dict[str, int]:
+        """
+        Run all categories of a cycle in parallel.
+        
+        `category_delays` are start offsets from the cycle start (not
+        cumulative waits). Browsers, requests and memory are bounded by the
+        global resource budget; a category only starts once RSS is under it.
+        """
+        async def _start(category: str) -> int:
+            offset = self.schedule_config.category_delays.get(category, 0)
+            if offset > 0:
+                logger.info(f"{category} starts in {offset}s")
+                try:
+                    await asyncio.wait_for(self._shutdown_event.wait(), timeout=offset)
+                    return 0  # Shutdown requested during the offset
+                except asyncio.TimeoutError:
+                    pass
+            if not await self.budget.wait_for_memory(self._shutdown_event, relieve=close_idle_browsers):
+                return 0
+            if self._shutdown_event.is_set():
+                return 0
+            result = await self.run_category(category)
+            return result.get("items_scraped", 0)
+        
+        counts = await asyncio.gather(*[_start(c) for c in categories], return_exceptions=True)
+        results = {}
+        for category, count in zip(categories, counts):
+            if isinstance(count, BaseException):
+                logger.error(f"Category {category} crashed: {count}")
+                count = 0
+            results[category] = count
+        return results
+    
+    def _due_sites(self, category: str) -> List[Any]:
+        runner = self._get_scraper_module(category)
+        if runner is None or not hasattr(runner, "due_sites"):
+            return [category]  # Custom category dispatcher: always runs
+        return runner.due_sites()
+    
+    def _next_cycle_delay(self) -> float:
+        """CYCLE_DELAY, or (adaptive revisits) the time until the next site is due."""
+        if not self.revisits.enabled:
+            return self.schedule_config.cycle_delay
+        waits = [
+            runner.next_due_in()
+            for runner in map(self._get_scraper_module, self.categories)
+            if runner is not None and hasattr(runner, "next_due_in")
+        ]
+        return max(min(waits, default=self.schedule_config.cycle_delay), MIN_ADAPTIVE_WAIT)
+    
     async def run(self):
         """
         Main run loop. Runs scraping cycles continuously until shutdown.
@@ -252,7 +337,9 @@ class ScraperDispatcher:
         
         logger.info("=" * 60)
         logger.info("KLOUFI SCRAPER STARTED")
-        logger.info(f"Mode: {'Single Run' if self.single_run else 'Continuous'}")
+        logger.info(f"Mode: {'Single Run' if self.single_run else 'Continuous'}"
+                    f"{', concurrent categories' if self.concurrent else ''}"
+                    f"{', adaptive revisits' if self.revisits.enabled else ''}")
         logger.info(f"Categories: {self.categories}")
         logger.info("=" * 60)
         
@@ -267,7 +354,7 @@ class ScraperDispatcher:
                     break
                 
                 # Wait before next cycle
-                cycle_delay = self.schedule_config.cycle_delay
+                cycle_delay = self._next_cycle_delay()
                 logger.info(f"Waiting {cycle_delay/60:.0f} minutes before next cycle...")
                 
                 try:
@@ -306,6 +393,10 @@ class ScraperDispatcher:
         
         # Cleanup
         await cleanup_alerts()
+        await close_fetcher()
+        await close_browser_pool()
+        await asyncio.to_thread(close_storages)  # Buffered bulk writes (logs docs/s)
+        await close_async_es_client()
         
         # Log final stats
         total_items = sum(s["items_scraped"] for s in self._category_stats.values())
@@ -317,12 +408,51 @@ class ScraperDispatcher:
         
         logger.info(f"Total items scraped: {total_items}")
         logger.info(f"Total errors: {total_errors}")
+        for site, s in interception_stats().items():
+            logger.info(
+                f"Interception [{site}]: {s['requests_blocked']} requests blocked, "
+                f"~{s['mb_saved_estimate']} MB saved"
+            )
+        b = self.budget.stats
+        logger.info(
+            f"Budget peaks: {b['browsers_peak']} browsers, {b['requests_peak']} requests in flight, "
+            f"{b['rss_peak_mb']:.0f} MB RSS ({b['browser_waits']} browser waits, {b['memory_waits']} memory waits)"
+        )
+        replay = get_replay_backend()
+        if replay.enabled:
+            r = replay.stats
+            logger.info(
+                f"Replay: {r['hits']} pages served, {r['misses']} misses, "
+                f"{r['pages_per_sec']} pages/s over {r['elapsed']}s"
+            )
+        workers = get_site_worker_pool()
+        if workers.enabled:
+            w = workers.stats
+            logger.info(
+                f"Site workers: {w['started']} started, {w['completed']} completed, {w['failed']} failed, "
+                f"{w['crashed']} crashed ({w['timeouts']} timeouts, {w['memory_kills']} memory kills), "
+                f"peak {w['workers_peak']}/{w['workers']} workers, {w['rss_peak_mb']:.0f} MB"
+            )
+        if self.revisits.enabled:
+            for site, r in self.revisits.stats.items():
+                logger.info(
+                    f"Revisits [{site}]: {r['new_per_visit']} new/visit, {r['new_per_hour']}/h, "
+                    f"every {r['interval'] / 60:.0f} min"
+                    f"{', new ads down to page ' + str(r['yield_depth']) if r['yield_depth'] else ''}"
+                )
+        session_stats = get_session_state_cache().stats
+        logger.info(
+            f"Session state: {session_stats['hits']} preloaded, {session_stats['saves']} saved, "
+            f"{session_stats['invalidations']} invalidated"
+        )
         logger.info("Dispatcher shutdown complete")
     
     def request_shutdown(self, reason: str = "Manual stop"):
         """Request graceful shutdown (can be called from signal handlers)."""
         logger.info(f"Shutdown requested: {reason}")
         self._shutdown_event.set()
+        # Leases waiting for memory headroom have no access to the event above
+        self.budget.request_shutdown()
 
 
 # ============================================================================
@@ -372,8 +502,20 @@ Examples:
   # Single run (scrape once and exit)
   python dispatcher.py --single-run
 
+  # All categories in parallel (MAX_BROWSERS / MAX_INFLIGHT_REQUESTS / MAX_RSS_MB)
+  python dispatcher.py --concurrent
+
+  # Each site in its own worker process (SITE_WORKERS / SITE_TIMEOUT / SITE_MAX_RSS_MB)
+  python dispatcher.py --isolated
+
+  # Revisit each site on its learned interval instead of CYCLE_DELAY
+  python dispatcher.py --adaptive
+
   # Local testing mode
   KLOUFI_ENV=local python dispatcher.py --single-run --categories immobilier
+
+  # Offline replay from the HTML archive with 200ms simulated latency
+  KLOUFI_ENV=local python dispatcher.py --single-run --replay archive --replay-latency 200
         """
     )
     
@@ -391,6 +533,48 @@ Examples:
         help="Run once and exit (don't loop)"
     )
     
+    parser.add_argument(
+        "--concurrent",
+        action="store_true",
+        default=None,
+        help="Run categories in parallel under the global resource budget"
+    )
+    
+    parser.add_argument(
+        "--isolated",
+        action="store_true",
+        help="Run each site in a supervised worker process (SITE_ISOLATION)"
+    )
+    
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Revisit sites on intervals learned from their new items (REVISIT_ADAPTIVE)"
+    )
+    
+    parser.add_argument(
+        "--replay",
+        metavar="SOURCE",
+        default=None,
+        help='Serve recorded pages instead of live sites: "archive" or a fixture directory'
+    )
+    
+    parser.add_argument(
+        "--replay-latency",
+        type=float,
+        default=None,
+        metavar="MS",
+        help="Simulated latency per replayed page in ms (default: REPLAY_LATENCY_MS)"
+    )
+    
+    parser.add_argument(
+        "--replay-jitter",
+        type=float,
+        default=None,
+        metavar="MS",
+        help="Random +/- jitter around --replay-latency in ms"
+    )
+    
     parser.add_argument(
         "--list-categories",
         action="store_true",
@@ -410,10 +594,20 @@ async def main():
             print(f"  - {cat}")
         return
     
+    if args.replay:
+        configure_replay(args.replay, args.replay_latency, args.replay_jitter)
+    
+    if args.isolated:
+        get_site_worker_pool().config.enabled = True
+    
+    if args.adaptive:
+        get_revisit_scheduler().config.enabled = True
+    
     # Create dispatcher
     dispatcher = ScraperDispatcher(
         categories=args.categories,
         single_run=args.single_run,
+        concurrent=args.concurrent,
     )
     
     # Setup signal handlers
@@ -0,0 +1,63 @@
+"""
+Kloufi-Scrape First-Seen Fields
+
+Fields a site sets when an ad is first indexed and later scrapes must not
+overwrite (FIRST_SEEN_FIELDS in config, e.g. Krello's date_depot).
+
+Instead of reading the stored document before every write (one GET per
+document), the write is a scripted upsert: the script replaces the document
+like an `index` would, but copies the first-seen fields over from the stored
+version when there is one. One round trip, and it works inside bulk requests:
+
+    action = bulk_action("immobilier", url, doc)          # index, or update + script
+    es.update(index="immobilier", id=url, **upsert_body(doc, fields))
+
+The bulk / update result is still "created" for a new document and
+"updated" for an existing one.
+"""
+
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import FIRST_SEEN_FIELDS
+
+# Replace the document, keeping non-null first-seen fields of the stored one
+KEEP_FIRST_SEEN_SCRIPT = """
+Map doc = new HashMap(params.doc);
+for (String field : params.keep) {
+    if (ctx._source.containsKey(field) && ctx._source[field] != null) {
+        doc[field] = ctx._source[field];
+    }
+}
+ctx._source.clear();
+ctx._source.putAll(doc);
+""".strip()
+
+
+def first_seen_fields(data: Dict[str, Any]) -> List[str]:
+    """First-seen fields of the document's site (empty for most sites)."""
+    return FIRST_SEEN_FIELDS.get(data.get("site_origine"), [])
+
+
+def upsert_body(data: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """`update` arguments writing `data` while keeping `fields` of an existing document."""
+    return {
+        "script": {
+            "source": KEEP_FIRST_SEEN_SCRIPT,
+            "lang": "painless",
+            "params": {"doc": data, "keep": fields},
+        },
+        "scripted_upsert": True,
+        "upsert": {},
+    }
+
+
+def bulk_action(index_name: str, doc_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Bulk action for one document: a plain index, or a first-seen-preserving upsert."""
+    fields = first_seen_fields(data)
+    if not fields:
+        return {"_index": index_name, "_id": doc_id, "_source": data}
+    return {"_op_type": "update", "_index": index_name, "_id": doc_id, **upsert_body(data, fields)}
@@ -0,0 +1,366 @@
+"""
+Kloufi-Scrape Crawl Frontier
+
+Zone-based recrawl of listing pages, for any site (the HOT / WARM / COLD
+design first built for Ouedkniss immobilier):
+
+    HOT   first listing page(s), every few minutes   -> fresh ads land fast
+    WARM  full listing crawl, every couple of hours
+    COLD  full backfill, weekly, slow and patient
+
+All zones of a site share one seen-ID set (the site's core.seen_store
+namespace), so an ad picked up by HOT is not fetched again by WARM or COLD
+(and one that is being fetched by a zone right now is skipped by the others).
+
+A site supplies a listing callback and a detail callback; each zone run is a
+core.pipeline.CrawlPipeline over that zone's pages:
+
+    frontier = Frontier(
+        "voiture/ouedkniss",
+        list_page=lambda page: scrape_listing_page(page, proxy_manager),
+        scrape_detail=lambda url: scrape_single_url(url, proxy_manager),
+        extract_id=extract_listing_id,
+    )
+    await frontier.run_due(shutdown_event)      # one dispatcher cycle: zones whose interval elapsed
+    await frontier.run_forever(shutdown_event)  # standalone: every zone on its own schedule
+
+`scrape_detail` raises when an ad could not be scraped or saved (the
+pipeline retries it); returning False also counts as not saved. Only a
+saved ad is marked seen, counted as new and has its card recorded.
+
+Sites with their own crawl logic pass `run_zone(zone, frontier)` instead of
+the two callbacks and still get the schedule and the shared seen set.
+
+`list_page` may return core.card_index.Card objects instead of URLs (title,
+price, date, photo count as the listing shows them). Their fingerprints are
+kept in the site's card index, and a detail page is only fetched for a new
+ad or one whose card changed since the last fetch; an ad already scraped is
+refetched when its card changes, and price changes are logged.
+
+Zone depth and intervals default to the FRONTIER_* settings; a site passes
+its own `zones` to override them. When each zone last ran is kept in
+data/state/frontier/, so `run_due()` works across dispatcher cycles and
+restarts.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Union
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import get_frontier_config, get_state_path
+from core.card_index import Card, get_card_index
+from core.pipeline import CrawlPipeline, Pagination, Stage
+from core.revisit import get_revisit_scheduler
+from core.seen_store import get_seen_store
+from scraper.utils.logger import get_logger
+
+logger = get_logger("frontier")
+
+# Seconds a zone waits while a rarer zone over the same pages is due or running
+COVER_POLL_INTERVAL = 60
+
+
+@dataclass
+class Zone:
+    """Depth, schedule and politeness of one recrawl zone."""
+    name: str
+    start_page: int = 1
+    end_page: Optional[int] = None      # None = until the listing runs out
+    interval: int = 3600                # Seconds between two runs of the zone
+    listing_concurrency: int = 1
+    detail_concurrency: int = 1
+    retries: int = 2                    # Per listing page / detail URL
+    retry_delay: float = 2.0
+    throttle: float = 0.0               # Pause of a detail worker after each ad
+
+    @property
+    def max_pages(self) -> Optional[int]:
+        return None if self.end_page is None else max(self.end_page - self.start_page + 1, 0)
+
+    @property
+    def pages_desc(self) -> str:
+        return f"{self.start_page}-{self.end_page if self.end_page is not None else '∞'}"
+
+
+def default_zones() -> Dict[str, Zone]:
+    """HOT / WARM / COLD zones from the FRONTIER_* settings."""
+    config = get_frontier_config()
+    return {
+        "hot": Zone(
+            name="HOT", end_page=config.hot_pages, interval=config.hot_interval,
+            detail_concurrency=3, retries=2, retry_delay=1.0, throttle=1.0,
+        ),
+        "warm": Zone(
+            name="WARM", end_page=config.warm_pages or None, interval=config.warm_interval,
+            detail_concurrency=2, retries=3, retry_delay=3.0, throttle=2.0,
+        ),
+        "cold": Zone(
+            name="COLD", end_page=None, interval=config.cold_interval,
+            detail_concurrency=1, retries=5, retry_delay=5.0, throttle=5.0,
+        ),
+    }
+
+
+@dataclass
+class ZoneState:
+    """Persisted run history of one zone."""
+    last_run: float = 0.0
+    runs: int = 0
+    new_items: int = 0                  # Found by the last run
+    total_new_items: int = 0
+    last_duration: float = 0.0
+
+
+class Frontier:
+    """Zone scheduler + shared seen set for one "category/site"."""
+
+    def __init__(
+        self,
+        site: str,
+        list_page: Optional[Callable[[int], Awaitable[List[Union[str, Card]]]]] = None,
+        scrape_detail: Optional[Callable[[str], Awaitable[Any]]] = None,
+        extract_id: Optional[Callable[[str], Optional[str]]] = None,
+        run_zone: Optional[Callable[[Zone, "Frontier"], Awaitable[int]]] = None,
+        zones: Optional[Dict[str, Zone]] = None,
+        seen: Optional[Any] = None,
+        cards: Optional[Any] = None,
+    ):
+        if run_zone is None and (list_page is None or scrape_detail is None):
+            raise ValueError("Frontier needs list_page + scrape_detail, or run_zone")
+        self.site = site
+        self.list_page = list_page
+        self.scrape_detail = scrape_detail
+        self.extract_id = extract_id or (lambda url: url)
+        self.custom_run_zone = run_zone
+        self.zones = zones or default_zones()
+
+        directory = get_state_path() / "frontier"
+        directory.mkdir(parents=True, exist_ok=True)
+        slug = site.replace("/", "__")
+        if seen is None:
+            seen = get_seen_store(site, legacy_path=directory / f"{slug}.seen.json")
+        self.seen = seen
+        self._cards = cards                     # Opened on the first fingerprinted card
+        self.in_flight: Set[str] = set()       # IDs being fetched by some zone right now
+        self._running: Set[str] = set()
+        self._state_path = directory / f"{slug}.zones.json"
+        self.state: Dict[str, ZoneState] = self._load_state()
+
+    # ------------------------------------------------------------------
+    # Schedule
+    # ------------------------------------------------------------------
+
+    def _load_state(self) -> Dict[str, ZoneState]:
+        try:
+            raw = json.loads(self._state_path.read_text(encoding="utf-8"))
+            return {key: ZoneState(**value) for key, value in raw.items()}
+        except FileNotFoundError:
+            return {}
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Unreadable zone state {self._state_path}: {e}")
+            return {}
+
+    def _save_state(self):
+        tmp_path = self._state_path.with_suffix(".tmp")
+        try:
+            tmp_path.write_text(json.dumps({k: asdict(v) for k, v in self.state.items()}, indent=2), encoding="utf-8")
+            os.replace(tmp_path, self._state_path)
+        except OSError as e:
+            logger.warning(f"Could not save zone state for {self.site}: {e}")
+
+    def next_run_in(self, key: str, now: Optional[float] = None) -> float:
+        """Seconds until zone `key` is due (<= 0 when due)."""
+        state = self.state.get(key)
+        if state is None or not state.last_run:
+            return 0.0
+        return state.last_run + self.zones[key].interval - (now or time.time())
+
+    def due_zones(self, now: Optional[float] = None) -> List[str]:
+        return [key for key in self.zones if self.next_run_in(key, now) <= 0]
+
+    def _covers(self, key: str, other: str) -> bool:
+        """A run of zone `key` also does `other`'s work (same pages, rarer schedule)."""
+        zone, other_zone = self.zones[key], self.zones[other]
+        return (
+            key != other
+            and zone.start_page == other_zone.start_page
+            and zone.end_page == other_zone.end_page
+            and zone.interval > other_zone.interval
+        )
+
+    def _covered(self, key: str, candidates) -> bool:
+        return any(self._covers(other, key) for other in candidates)
+
+    # ------------------------------------------------------------------
+    # Zone runs
+    # ------------------------------------------------------------------
+
+    @property
+    def cards(self):
+        """Listing card index of the site."""
+        if self._cards is None:
+            self._cards = get_card_index(self.site)
+        return self._cards
+
+    def claim(self, item_id: str, refetch: bool = False) -> bool:
+        """Reserve an ID for fetching. False if it is already scraped (unless `refetch`) or in flight."""
+        if (not refetch and item_id in self.seen) or item_id in self.in_flight:
+            return False
+        self.in_flight.add(item_id)
+        return True
+
+    def release(self, item_id: str, scraped: bool):
+        self.in_flight.discard(item_id)
+        if scraped:
+            self.seen.add(item_id)
+
+    async def _pipeline_zone(self, zone: Zone, shutdown_event: asyncio.Event) -> int:
+        new_items = 0
+        page_new_items: Dict[int, int] = {}     # Listing page -> new items it led to
+        cards = {"changed": 0, "unchanged": 0}  # Card index outcomes of this run
+
+        async def listing(page: int):
+            entries = await self.list_page(page)
+            page_new_items.setdefault(page, 0)
+            return [(page, entry) for entry in entries or []]
+
+        async def detail(entry):
+            nonlocal new_items
+            page, card = entry
+            if not isinstance(card, Card):
+                card = Card(url=card)
+            item_id = self.extract_id(card.url) or card.url
+
+            change = None
+            if card.fingerprint is not None:
+                change = self.cards.check(item_id, card)
+                if change.status == "unchanged":
+                    cards["unchanged"] += 1
+                    return None
+                if change.status == "new" and item_id in self.seen:
+                    # Scraped before the index knew it: the current card is the baseline
+                    self.cards.record(item_id, card, change)
+                    return None
+            refetch = change is not None and change.status == "changed"
+
+            if not self.claim(item_id, refetch=refetch):
+                return None
+            scraped = False
+            try:
+                if await self.scrape_detail(card.url) is False:
+                    return None
+                scraped = True
+                if change is not None:
+                    self.cards.record(item_id, card, change)
+                if refetch:
+                    cards["changed"] += 1
+                else:
+                    new_items += 1
+                    page_new_items[page] += 1
+            finally:
+                self.release(item_id, scraped)
+            return None
+
+        pipeline = CrawlPipeline(
+            f"{self.site} {zone.name}",
+            stages=[
+                Stage("listing", listing, concurrency=zone.listing_concurrency,
+                      retries=zone.retries, retry_delay=zone.retry_delay,
+                      queue_size=zone.listing_concurrency * 2),
+                Stage("detail", detail, concurrency=zone.detail_concurrency,
+                      retries=zone.retries, retry_delay=zone.retry_delay, delay=zone.throttle),
+            ],
+            shutdown_event=shutdown_event,
+        )
+        await pipeline.run(Pagination(start=zone.start_page, max_pages=zone.max_pages))
+        get_revisit_scheduler().record_pages(self.site, page_new_items)
+        if self._cards is not None:
+            self._cards.save()
+            logger.info(
+                f"[{self.site}] {zone.name} cards: {cards['changed']} changed (refetched), "
+                f"{cards['unchanged']} unchanged (skipped)"
+            )
+        return new_items
+
+    async def run_zone(self, key: str, shutdown_event: Optional[asyncio.Event] = None) -> int:
+        """Run zone `key` once. Returns the number of new items scraped."""
+        shutdown_event = shutdown_event or asyncio.Event()
+        zone = self.zones[key]
+        logger.info(f"[{self.site}] {zone.name} zone started (pages {zone.pages_desc})")
+        started = time.time()
+        self._running.add(key)
+
+        try:
+            if self.custom_run_zone is not None:
+                new_items = await self.custom_run_zone(zone, self)
+            else:
+                new_items = await self._pipeline_zone(zone, shutdown_event)
+        finally:
+            self._running.discard(key)
+            if hasattr(self.seen, "save"):
+                self.seen.save()
+
+        state = self.state.setdefault(key, ZoneState())
+        state.last_run = started
+        state.runs += 1
+        state.new_items = new_items or 0
+        state.total_new_items += state.new_items
+        state.last_duration = round(time.time() - started, 1)
+        for other in self.zones:
+            if self._covers(key, other):
+                # e.g. a COLD backfill also counts as the WARM crawl
+                self.state.setdefault(other, ZoneState()).last_run = started
+        self._save_state()
+
+        logger.info(
+            f"[{self.site}] {zone.name} zone finished in {state.last_duration:.0f}s: "
+            f"{state.new_items} new items ({len(self.seen)} seen)"
+        )
+        return state.new_items
+
+    async def run_due(self, shutdown_event: Optional[asyncio.Event] = None) -> Dict[str, int]:
+        """Run every zone whose interval has elapsed, concurrently."""
+        due = [key for key in self.due_zones() if not self._covered(key, self.due_zones())]
+        if not due:
+            waits = ", ".join(f"{self.zones[k].name} in {self.next_run_in(k) / 60:.0f}m" for k in self.zones)
+            logger.info(f"[{self.site}] No zone due ({waits})")
+            return {}
+        results = await asyncio.gather(*[self.run_zone(key, shutdown_event) for key in due])
+        return dict(zip(due, results))
+
+    async def run_forever(self, shutdown_event: Optional[asyncio.Event] = None):
+        """Run each zone on its own interval until shutdown."""
+        shutdown_event = shutdown_event or asyncio.Event()
+
+        async def _loop(key: str):
+            while not shutdown_event.is_set():
+                wait = self.next_run_in(key)
+                if wait <= 0 and self._covered(key, self.due_zones() + list(self._running)):
+                    # A rarer zone over the same pages is about to run (or running): it does this one's work
+                    wait = COVER_POLL_INTERVAL
+                if wait > 0:
+                    try:
+                        await asyncio.wait_for(shutdown_event.wait(), timeout=wait)
+                        return
+                    except asyncio.TimeoutError:
+                        pass
+                await self.run_zone(key, shutdown_event)
+
+        await asyncio.gather(*[_loop(key) for key in self.zones])
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "seen": len(self.seen),
+            "zones": {
+                key: {**asdict(self.state.get(key, ZoneState())), "next_run_in": round(max(self.next_run_in(key), 0))}
+                for key in self.zones
+            },
+        }
@@ -0,0 +1,293 @@
+"""
+Kloufi-Scrape Crawl Pipeline
+
+Reusable producer/consumer pipeline for listing -> detail crawls. A site
+supplies one async callback per stage; the pipeline runs each stage with its
+own worker count, connects the stages with bounded queues (a slow detail
+stage holds back listing pagination instead of buffering URLs without end),
+retries failed items, and keeps per-stage throughput counters.
+
+    pipeline = CrawlPipeline(
+        "voiture/ouedkniss",
+        stages=[
+            Stage("listing", scrape_listing_page, concurrency=2, retries=4),
+            Stage("detail", scrape_single_url, concurrency=5, delay=0.8),
+        ],
+        shutdown_event=shutdown_event,
+    )
+    stats = await pipeline.run(Pagination(start=1))
+
+A stage handler gets one item and returns the items for the next stage (a
+list, or None). Raising an exception retries the item up to `retries` times
+with a growing delay; after that it is counted as failed and skipped.
+
+`Pagination` feeds page numbers to the first stage and stops at the first
+page that produced no items, so listing handlers only parse one page.
+
+When `shutdown_event` is set, no new seeds are fed; items already queued are
+drained through the remaining stages for up to `drain_timeout` seconds, then
+the workers are cancelled and the leftovers counted as dropped.
+"""
+
+import asyncio
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Union
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import get_pipeline_config
+from scraper.utils.logger import get_logger
+
+logger = get_logger("pipeline")
+
+
+@dataclass
+class Stage:
+    """One step of the pipeline: `handler(item)` with `concurrency` workers."""
+    name: str
+    handler: Callable[[Any], Awaitable[Optional[Iterable[Any]]]]
+    concurrency: int = 1
+    retries: int = 2                    # Extra attempts after the first failure
+    retry_delay: float = 2.0            # Seconds, multiplied by the attempt number
+    delay: float = 0.0                  # Pause of a worker after each item (politeness)
+    queue_size: Optional[int] = None    # Input queue bound (default: PIPELINE_QUEUE_SIZE)
+
+
+@dataclass
+class StageStats:
+    """Throughput counters of one stage."""
+    received: int = 0
+    processed: int = 0
+    emitted: int = 0                    # Items handed to the next stage
+    failed: int = 0
+    retries: int = 0
+    dropped: int = 0                    # Left in the queue at shutdown
+    busy_time: float = 0.0              # Seconds spent inside the handler
+    queue_peak: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started_at
+        return {
+            "received": self.received,
+            "processed": self.processed,
+            "emitted": self.emitted,
+            "failed": self.failed,
+            "retries": self.retries,
+            "dropped": self.dropped,
+            "queue_peak": self.queue_peak,
+            "items_per_sec": round(self.processed / elapsed, 2) if elapsed else 0.0,
+            "avg_item_time": round(self.busy_time / self.processed, 2) if self.processed else 0.0,
+        }
+
+
+class Pagination:
+    """
+    Page numbers for a listing stage: start, start+1, ... until a page yields
+    no items, `max_failures` pages in a row failed, or `max_pages` pages were fed.
+    """
+
+    def __init__(self, start: int = 1, max_pages: Optional[int] = None, max_failures: int = 10):
+        self.start = start
+        self.max_pages = max_pages
+        self.max_failures = max_failures
+        self.last_page: Optional[int] = None    # First page known to be empty
+        self._failures = 0
+
+    def report(self, page: int, count: Optional[int]):
+        """Called by the pipeline with the number of items a page produced (None = failed)."""
+        if count is None:
+            self._failures += 1
+            if self._failures < self.max_failures:
+                return
+            logger.warning(f"{self._failures} listing pages failed in a row, pagination stops")
+        else:
+            self._failures = 0
+            if count:
+                return
+        if self.last_page is None or page < self.last_page:
+            self.last_page = page
+            logger.debug(f"Pagination stops before page {page}")
+
+    def wanted(self, page: int) -> bool:
+        """False for pages queued before an earlier page turned out empty."""
+        return self.last_page is None or page < self.last_page
+
+    def __aiter__(self) -> AsyncIterator[int]:
+        return self._pages()
+
+    async def _pages(self) -> AsyncIterator[int]:
+        page = self.start
+        while self.last_page is None or page < self.last_page:
+            if self.max_pages is not None and page >= self.start + self.max_pages:
+                return
+            yield page
+            page += 1
+
+
+class CrawlPipeline:
+    """Stages connected by bounded queues."""
+
+    def __init__(
+        self,
+        name: str,
+        stages: List[Stage],
+        shutdown_event: Optional[asyncio.Event] = None,
+        drain_timeout: Optional[float] = None,
+    ):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        self.name = name
+        self.stages = stages
+        self.shutdown_event = shutdown_event or asyncio.Event()
+        config = get_pipeline_config()
+        self.drain_timeout = config.drain_timeout if drain_timeout is None else drain_timeout
+        self._queue_size = config.queue_size
+        self._queues: List[asyncio.Queue] = []
+        self._stats: Dict[str, StageStats] = {}
+        self._source: Any = None
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    async def _handle(self, stage: Stage, stats: StageStats, item: Any) -> Optional[List[Any]]:
+        """Run the handler with retries. Returns the produced items, or None when it failed."""
+        for attempt in range(stage.retries + 1):
+            start = time.monotonic()
+            try:
+                produced = await stage.handler(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                stats.busy_time += time.monotonic() - start
+                if attempt >= stage.retries:
+                    logger.warning(f"[{self.name}] {stage.name} failed for {item!r} after {attempt + 1} attempts: {e}")
+                    return None
+                stats.retries += 1
+                logger.debug(f"[{self.name}] {stage.name} attempt {attempt + 1} failed for {item!r}: {e}")
+                await asyncio.sleep(stage.retry_delay * (attempt + 1))
+                continue
+            stats.busy_time += time.monotonic() - start
+            return list(produced) if produced else []
+        return None
+
+    async def _worker(self, index: int):
+        stage = self.stages[index]
+        stats = self._stats[stage.name]
+        queue = self._queues[index]
+        next_queue = self._queues[index + 1] if index + 1 < len(self.stages) else None
+
+        while True:
+            item = await queue.get()
+            if index == 0 and hasattr(self._source, "wanted") and not self._source.wanted(item):
+                queue.task_done()
+                continue
+            try:
+                produced = await self._handle(stage, stats, item)
+                if produced is None:
+                    stats.failed += 1
+                    if index == 0 and hasattr(self._source, "report"):
+                        self._source.report(item, None)
+                    continue
+                stats.processed += 1
+                if index == 0 and hasattr(self._source, "report"):
+                    self._source.report(item, len(produced))
+                if next_queue is not None:
+                    for out in produced:
+                        await self._put(index + 1, out)
+                        stats.emitted += 1
+            finally:
+                queue.task_done()
+            if stage.delay:
+                await asyncio.sleep(stage.delay)
+
+    async def _put(self, index: int, item: Any):
+        """Blocking put (backpressure) with counters."""
+        stats = self._stats[self.stages[index].name]
+        await self._queues[index].put(item)
+        stats.received += 1
+        stats.queue_peak = max(stats.queue_peak, self._queues[index].qsize())
+
+    async def _feed(self, seeds: Union[Iterable[Any], AsyncIterator[Any]]):
+        if hasattr(seeds, "__aiter__"):
+            async for seed in seeds:
+                if self.shutdown_event.is_set():
+                    logger.info(f"[{self.name}] Shutdown requested, no more seeds")
+                    return
+                await self._put(0, seed)
+        else:
+            for seed in seeds:
+                if self.shutdown_event.is_set():
+                    logger.info(f"[{self.name}] Shutdown requested, no more seeds")
+                    return
+                await self._put(0, seed)
+
+    # ------------------------------------------------------------------
+    # Run
+    # ------------------------------------------------------------------
+
+    async def _join(self):
+        # Stage i's items are all handled (and their outputs queued) once queue i is joined
+        for queue in self._queues:
+            await queue.join()
+
+    async def run(self, seeds: Union[Iterable[Any], AsyncIterator[Any]]) -> Dict[str, Any]:
+        """Feed `seeds` to the first stage and run until every queue is empty."""
+        self._source = seeds
+        self._queues = [asyncio.Queue(maxsize=s.queue_size or self._queue_size) for s in self.stages]
+        self._stats = {s.name: StageStats() for s in self.stages}
+        started = time.monotonic()
+
+        workers = [
+            asyncio.create_task(self._worker(index))
+            for index, stage in enumerate(self.stages)
+            for _ in range(max(stage.concurrency, 1))
+        ]
+        feeder = asyncio.create_task(self._feed(seeds))
+        shutdown_wait = asyncio.create_task(self.shutdown_event.wait())
+
+        try:
+            done = asyncio.create_task(self._finish(feeder))
+            await asyncio.wait({done, shutdown_wait}, return_when=asyncio.FIRST_COMPLETED)
+            if not done.done():
+                # Shutdown: the feeder stops by itself; drain what is already queued
+                logger.info(f"[{self.name}] Draining queued items (up to {self.drain_timeout:.0f}s)")
+                try:
+                    await asyncio.wait_for(done, timeout=self.drain_timeout)
+                except asyncio.TimeoutError:
+                    logger.warning(f"[{self.name}] Drain timed out")
+        finally:
+            shutdown_wait.cancel()
+            feeder.cancel()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(feeder, *workers, return_exceptions=True)
+            for stage, queue in zip(self.stages, self._queues):
+                self._stats[stage.name].dropped += queue.qsize()
+
+        elapsed = time.monotonic() - started
+        self._log_summary(elapsed)
+        return {"name": self.name, "elapsed": round(elapsed, 1), "stages": self.stats}
+
+    async def _finish(self, feeder: asyncio.Task):
+        await feeder
+        await self._join()
+
+    def _log_summary(self, elapsed: float):
+        for stage in self.stages:
+            s = self._stats[stage.name].as_dict()
+            logger.info(
+                f"[{self.name}] {stage.name}: {s['processed']} done, {s['failed']} failed, "
+                f"{s['retries']} retries, {s['dropped']} dropped, {s['items_per_sec']}/s "
+                f"(queue peak {s['queue_peak']})"
+            )
+        logger.info(f"[{self.name}] Pipeline finished in {elapsed:.0f}s")
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage counters (live while running)."""
+        return {name: stats.as_dict() for name, stats in self._stats.items()}
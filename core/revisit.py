@@ -0,0 +1,303 @@
+"""
+Kloufi-Scrape Adaptive Revisits
+
+Learns how often each site is worth revisiting from what its visits actually
+find. Ouedkniss posts hundreds of ads an hour, a dealer site a handful a
+week; revisiting both every CYCLE_DELAY wastes most of the crawl on pages
+with nothing new.
+
+After every visit the scheduler records the number of NEW items it produced
+(documents that did not exist in storage yet) and keeps moving averages of
+new items per visit and per hour. The next interval is the time the site
+needs to produce REVISIT_TARGET_ITEMS new items at that rate; a visit that
+found nothing multiplies the interval by REVISIT_BACKOFF. Intervals stay
+within REVISIT_MIN_INTERVAL / REVISIT_MAX_INTERVAL.
+
+    scheduler = get_revisit_scheduler()
+    if scheduler.due("voiture/dickreich"):
+        with track_new_items() as counter:
+            await run_site(...)               # storage counts what it creates
+        scheduler.record_visit("voiture/dickreich", counter.new_items)
+
+With REVISIT_ADAPTIVE=true (or `--adaptive` on core/dispatcher.py) a
+category run only starts the sites that are due, the ones with the most new
+items expected first, and the dispatcher sleeps until the next site is due
+instead of CYCLE_DELAY. Visits are recorded either way, so intervals are
+already learned when the mode is switched on.
+
+Listing pages are tracked too: the crawl frontier reports the new items of
+each page it visited, and `yield_depth()` tells how deep new ads actually
+land on a site.
+
+State is kept in data/state/revisit.json (shared with site worker processes:
+every update re-reads the file before writing it).
+"""
+
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import get_revisit_config, get_schedule_config, get_state_path, RevisitConfig
+from scraper.utils.logger import get_logger
+
+logger = get_logger("revisit")
+
+
+@dataclass
+class SiteYield:
+    """Visit history and learned revisit interval of one "category/site"."""
+    visits: int = 0
+    failures: int = 0                   # Visits that errored without finding anything
+    last_visit: float = 0.0
+    last_new_items: int = 0
+    total_new_items: int = 0
+    new_per_visit: float = 0.0          # Moving average
+    new_per_hour: float = 0.0           # Moving average, over the time between visits
+    interval: float = 0.0               # Learned revisit interval (seconds)
+    next_due: float = 0.0
+    pages: Dict[str, float] = field(default_factory=dict)  # Listing page -> new items per visit
+
+
+class RevisitScheduler:
+    """Per-site revisit intervals learned from new items per visit."""
+
+    def __init__(self, config: Optional[RevisitConfig] = None, path: Optional[Path] = None):
+        self.config = config or get_revisit_config()
+        self.path = path or get_state_path() / "revisit.json"
+        self._lock = threading.Lock()
+        self.sites: Dict[str, SiteYield] = self._load()
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.enabled
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _load(self) -> Dict[str, SiteYield]:
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+            return {key: SiteYield(**value) for key, value in raw.items()}
+        except FileNotFoundError:
+            return {}
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Unreadable revisit state {self.path}: {e}")
+            return {}
+
+    def _save(self):
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            tmp_path.write_text(json.dumps({k: asdict(v) for k, v in self.sites.items()}, indent=2), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save revisit state: {e}")
+
+    def refresh(self):
+        """Re-read the state (site workers record page yields in their own process)."""
+        with self._lock:
+            self.sites = self._load()
+
+    # ------------------------------------------------------------------
+    # Schedule
+    # ------------------------------------------------------------------
+
+    def _clamp(self, interval: float) -> float:
+        return min(max(interval, self.config.min_interval), self.config.max_interval)
+
+    def _default_interval(self) -> float:
+        return self._clamp(get_schedule_config().cycle_delay)
+
+    def due_in(self, site: str, now: Optional[float] = None) -> float:
+        """Seconds until `site` should be visited again (<= 0 when due)."""
+        entry = self.sites.get(site)
+        if entry is None or not entry.next_due:
+            return 0.0
+        return entry.next_due - (now or time.time())
+
+    def due(self, site: str, now: Optional[float] = None) -> bool:
+        return self.due_in(site, now) <= 0
+
+    def next_due_in(self, sites: Iterable[str], now: Optional[float] = None) -> float:
+        """Seconds until the first of `sites` is due."""
+        now = now or time.time()
+        return min((self.due_in(site, now) for site in sites), default=float(self.config.max_interval))
+
+    def expected_new_items(self, site: str, now: Optional[float] = None) -> float:
+        """New items probably waiting on `site` (inf when it has no history yet)."""
+        entry = self.sites.get(site)
+        if entry is None or entry.visits < 2:
+            return float("inf")
+        hours = ((now or time.time()) - entry.last_visit) / 3600
+        return entry.new_per_hour * max(hours, 0.0)
+
+    def order(self, sites: List[Any], key=lambda site: site, now: Optional[float] = None) -> List[Any]:
+        """`sites` sorted by expected new items, most first (stable for ties)."""
+        now = now or time.time()
+        return sorted(sites, key=lambda site: -self.expected_new_items(key(site), now))
+
+    # ------------------------------------------------------------------
+    # Learning
+    # ------------------------------------------------------------------
+
+    def _average(self, current: float, value: float, first: bool) -> float:
+        if first:
+            return value
+        return self.config.smoothing * value + (1 - self.config.smoothing) * current
+
+    def record_visit(self, site: str, new_items: int, errors: int = 0, now: Optional[float] = None) -> SiteYield:
+        """Learn from one visit of `site` and schedule the next one."""
+        now = now or time.time()
+        with self._lock:
+            self.sites = self._load()
+            entry = self.sites.setdefault(site, SiteYield())
+            interval = entry.interval or self._default_interval()
+
+            if errors and not new_items:
+                # A broken visit says nothing about the site: keep the interval and the window
+                entry.failures += 1
+            elif not entry.last_visit:
+                # First visit: everything is new (backfill), there is no rate yet
+                entry.visits += 1
+                entry.last_visit = now
+            else:
+                entry.visits += 1
+                first = entry.visits == 2
+                hours = max(now - entry.last_visit, 1.0) / 3600
+                entry.new_per_visit = self._average(entry.new_per_visit, new_items, first)
+                entry.new_per_hour = self._average(entry.new_per_hour, new_items / hours, first)
+                if new_items and entry.new_per_hour > 0:
+                    interval = self.config.target_items / entry.new_per_hour * 3600
+                else:
+                    interval *= self.config.backoff
+                entry.last_visit = now
+
+            entry.last_new_items = new_items
+            entry.total_new_items += new_items
+            entry.interval = round(self._clamp(interval))
+            entry.next_due = now + entry.interval
+            self._save()
+
+        logger.info(
+            f"[{site}] {new_items} new items (avg {entry.new_per_visit:.1f}/visit, "
+            f"{entry.new_per_hour:.1f}/h), next visit in {entry.interval / 60:.0f} min"
+        )
+        return entry
+
+    def record_pages(self, site: str, page_new_items: Dict[int, int]):
+        """Record the new items found on each listing page of one visit (0 for pages with none)."""
+        if not page_new_items:
+            return
+        with self._lock:
+            self.sites = self._load()
+            entry = self.sites.setdefault(site, SiteYield())
+            for page, count in page_new_items.items():
+                key = str(page)
+                entry.pages[key] = round(self._average(entry.pages.get(key, 0.0), count, key not in entry.pages), 2)
+            self._save()
+
+    def yield_depth(self, site: str, share: float = 0.9) -> Optional[int]:
+        """Listing page depth holding `share` of a site's new items (None when unknown)."""
+        entry = self.sites.get(site)
+        if entry is None or not entry.pages:
+            return None
+        pages = sorted((int(page), value) for page, value in entry.pages.items())
+        total = sum(value for _, value in pages)
+        if total <= 0:
+            return pages[0][0]
+        running = 0.0
+        for page, value in pages:
+            running += value
+            if running >= share * total:
+                return page
+        return pages[-1][0]
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        now = time.time()
+        return {
+            site: {
+                "visits": entry.visits,
+                "new_per_visit": round(entry.new_per_visit, 1),
+                "new_per_hour": round(entry.new_per_hour, 2),
+                "interval": entry.interval,
+                "due_in": round(max(entry.next_due - now, 0)),
+                "yield_depth": self.yield_depth(site),
+            }
+            for site, entry in sorted(self.sites.items())
+        }
+
+
+# ============================================================================
+# NEW ITEM COUNTING
+# ============================================================================
+
+class YieldCounter:
+    """Items saved (and how many of them were new) during one site visit."""
+
+    def __init__(self):
+        self.saved = 0
+        self.new_items = 0
+        self._lock = threading.Lock()   # Legacy sites save from executor threads
+
+    def add(self, new: bool):
+        with self._lock:
+            self.saved += 1
+            if new:
+                self.new_items += 1
+
+
+_current_counter: contextvars.ContextVar[Optional[YieldCounter]] = contextvars.ContextVar(
+    "revisit_counter", default=None
+)
+
+
+@contextmanager
+def track_new_items():
+    """
+    Count what storage saves inside this block (and tasks / threads started from it).
+
+    Re-entrant: a nested block shares the outer counter.
+    """
+    current = _current_counter.get()
+    if current is not None:
+        yield current
+        return
+    counter = YieldCounter()
+    token = _current_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _current_counter.reset(token)
+
+
+def count_saved_item(new: bool):
+    """Called by storage for every saved item; `new` when the document did not exist yet."""
+    counter = _current_counter.get()
+    if counter is not None:
+        counter.add(new)
+
+
+# ============================================================================
+# CONVENIENCE FUNCTIONS
+# ============================================================================
+
+# Process-wide scheduler instance
+_scheduler: Optional[RevisitScheduler] = None
+
+
+def get_revisit_scheduler() -> RevisitScheduler:
+    """Get or create the process-wide revisit scheduler."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = RevisitScheduler()
+    return _scheduler
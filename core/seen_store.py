@@ -0,0 +1,422 @@
+"""
+Kloufi-Scrape Seen-ID Store
+
+Persistent dedup store for listing IDs (or URLs) a site already scraped, one
+namespace per site:
+
+    seen = get_seen_store("immobilier/ouedkniss")
+    if listing_id not in seen:                  # O(1), in-memory set
+        await scrape(url)
+        seen.add(listing_id)                    # one appended line, durable at once
+
+On disk a namespace is two plain-text files (one ID per line) in
+data/state/seen/:
+
+    <namespace>.ids    compacted snapshot: unique IDs, sorted
+    <namespace>.log    append-only log of IDs added since the last compaction
+
+Adding an ID never rewrites anything. Loading is a single read-and-split of
+both files (a few seconds for millions of IDs, no JSON parsing). Once the
+log grows past SEEN_COMPACT_THRESHOLD lines (and half the snapshot), it is
+folded into a new snapshot.
+
+With SEEN_PREFILTER=true the snapshot is not loaded into memory at all:
+
+    <namespace>.bloom  Bloom filter over the snapshot (core/bloom.py), built at compaction
+
+Only the log IDs are kept in a set. A lookup that misses it asks the Bloom
+filter: "definitely not in the snapshot" settles it (most lookups of new
+ads); "maybe" is confirmed by a binary search in the memory-mapped, sorted
+snapshot. Both files are mapped read-only, so every worker process shares
+one copy in the page cache. Memory per namespace drops from ~80 bytes per
+ID to ~10 bits per ID (SEEN_PREFILTER_FP_RATE=0.01).
+
+Several processes (site workers, standalone site runs) can share a
+namespace: appends and compaction are serialized with an advisory file lock,
+and each process picks up the IDs the others appended at most every
+SEEN_SYNC_INTERVAL seconds. File locking needs fcntl (not available on
+Windows, where a store should only be used by one process at a time).
+
+A legacy JSON array of IDs (the old `scraped_urls_cache.json`) is imported
+the first time a namespace is opened with `legacy_path=`.
+"""
+
+import heapq
+import json
+import mmap
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Set, Union
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import get_seen_store_config, get_state_path, SeenStoreConfig
+from core.bloom import BloomFilter
+from scraper.utils.logger import get_logger
+
+logger = get_logger("seen_store")
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class SeenStore:
+    """Append-only, compacting set of IDs for one namespace."""
+
+    def __init__(
+        self,
+        namespace: str,
+        directory: Optional[Path] = None,
+        legacy_path: Optional[Union[str, Path]] = None,
+        config: Optional[SeenStoreConfig] = None,
+        prefilter: Optional[bool] = None,
+    ):
+        self.namespace = namespace
+        self.config = config or get_seen_store_config()
+        self.prefilter = self.config.prefilter if prefilter is None else prefilter
+        directory = directory or get_state_path() / "seen"
+        directory.mkdir(parents=True, exist_ok=True)
+        slug = namespace.replace("/", "__")
+        self.snapshot_path = directory / f"{slug}.ids"
+        self.log_path = directory / f"{slug}.log"
+        self.bloom_path = directory / f"{slug}.bloom"
+
+        self._ids: Set[str] = set()                 # Everything, or only the log IDs with the prefilter
+        self._lock = threading.Lock()               # Legacy sites add from executor threads
+        self._lock_fd = os.open(str(directory / f"{slug}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        self._log_fd = os.open(str(self.log_path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._snapshot_id: Optional[tuple] = None   # (inode, mtime) of the loaded snapshot
+        self._snapshot_lines = 0
+        self._snapshot_map: Optional[mmap.mmap] = None
+        self._bloom: Optional[BloomFilter] = None
+        self._log_offset = 0                        # Bytes of the log already loaded
+        self._log_lines = 0
+        self._synced_at = 0.0
+        self._stats = {
+            "added": 0, "synced": 0, "compactions": 0,
+            "definitely_new": 0, "snapshot_lookups": 0, "false_positives": 0,
+        }
+
+        started = time.monotonic()
+        with self._file_lock(exclusive=False):
+            self._load_snapshot()
+            self._read_log()
+        if legacy_path and not len(self):
+            self._import_legacy(Path(legacy_path))
+        logger.info(
+            f"[{namespace}] {len(self)} seen IDs loaded in {time.monotonic() - started:.2f}s"
+            f"{' (Bloom prefilter)' if self.prefilter else ''}"
+        )
+
+    # ------------------------------------------------------------------
+    # Files
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        """Advisory lock shared by every process using the namespace."""
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _snapshot_signature(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.snapshot_path)
+            return (st.st_ino, st.st_mtime_ns)
+        except FileNotFoundError:
+            return None
+
+    def _load_snapshot(self):
+        self._snapshot_id = self._snapshot_signature()
+        self._log_offset = 0
+        self._log_lines = 0
+        if self.prefilter:
+            self._map_snapshot()
+            return
+        try:
+            ids = self.snapshot_path.read_text(encoding="utf-8").splitlines()
+        except FileNotFoundError:
+            ids = []
+        self._snapshot_lines = len(ids)
+        self._ids.update(ids)
+
+    def _map_snapshot(self):
+        """Prefilter mode: map the snapshot and its Bloom filter (built if missing or stale)."""
+        self._close_maps()
+        # IDs of the previous log are in the new snapshot now
+        self._ids = set()
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size:
+                    self._snapshot_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            size = 0
+        if not size:
+            self._snapshot_lines = 0
+            return
+
+        bloom = BloomFilter.open(self.bloom_path)
+        if bloom is None or bloom.tag != size:
+            if bloom is not None:
+                bloom.close()
+            lines = sum(1 for _ in self._iter_snapshot())
+            BloomFilter.from_items(
+                self._iter_snapshot(), capacity=lines, fp_rate=self.config.prefilter_fp_rate, tag=size,
+            ).save(self.bloom_path)
+            bloom = BloomFilter.open(self.bloom_path)
+            logger.info(f"[{self.namespace}] Bloom prefilter built for {lines} IDs")
+        self._bloom = bloom
+        self._snapshot_lines = bloom.count
+
+    def _close_maps(self):
+        if self._snapshot_map is not None:
+            self._snapshot_map.close()
+            self._snapshot_map = None
+        if self._bloom is not None:
+            self._bloom.close()
+            self._bloom = None
+
+    def _iter_snapshot(self) -> Iterator[str]:
+        if self._snapshot_map is not None:
+            self._snapshot_map.seek(0)
+            for line in iter(self._snapshot_map.readline, b""):
+                yield line.rstrip(b"\n").decode("utf-8")
+            return
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    yield line.rstrip("\n")
+        except FileNotFoundError:
+            return
+
+    def _in_snapshot(self, item_id: str) -> bool:
+        """Prefilter mode: Bloom filter first, binary search in the sorted snapshot on "maybe"."""
+        mapped = self._snapshot_map
+        if mapped is None or self._bloom is None:
+            return False
+        if item_id not in self._bloom:
+            self._stats["definitely_new"] += 1
+            return False
+        self._stats["snapshot_lookups"] += 1
+        target = item_id.encode("utf-8")
+        lo, hi = 0, len(mapped)
+        while lo < hi:
+            # lo and hi are always line starts; look at the line around the middle
+            start = mapped.rfind(b"\n", lo, (lo + hi) // 2) + 1 or lo
+            end = mapped.find(b"\n", start, hi)
+            end = hi if end == -1 else end
+            line = mapped[start:end]
+            if line == target:
+                return True
+            if line < target:
+                lo = end + 1
+            else:
+                hi = start
+        self._stats["false_positives"] += 1
+        return False
+
+    def _read_log(self):
+        """Load what was appended to the log since the last read."""
+        with open(self.log_path, "rb") as f:
+            f.seek(self._log_offset)
+            data = f.read()
+        # Only complete lines: a concurrent append may be half written
+        end = data.rfind(b"\n") + 1
+        if not end:
+            return
+        lines = data[:end].decode("utf-8").splitlines()
+        self._ids.update(lines)
+        self._log_offset += end
+        self._log_lines += len(lines)
+
+    def _import_legacy(self, path: Path):
+        try:
+            ids = [str(x) for x in json.loads(path.read_text(encoding="utf-8"))]
+        except FileNotFoundError:
+            return
+        except ValueError as e:
+            logger.warning(f"[{self.namespace}] Unreadable legacy seen-ID file {path}: {e}")
+            return
+        added = self.add_many(ids)
+        logger.info(f"[{self.namespace}] Imported {added} IDs from {path}")
+        self.compact()
+
+    # ------------------------------------------------------------------
+    # Set interface
+    # ------------------------------------------------------------------
+
+    def sync(self, force: bool = False) -> bool:
+        """
+        Pick up IDs other processes added (at most every SEEN_SYNC_INTERVAL
+        seconds). Returns True if anything changed.
+        """
+        now = time.monotonic()
+        if not force and now - self._synced_at < self.config.sync_interval:
+            return False
+        self._synced_at = now
+        with self._lock, self._file_lock(exclusive=False):
+            reloaded = self._snapshot_signature() != self._snapshot_id
+            if reloaded:
+                # Compacted by another process: the log restarted from zero
+                self._load_snapshot()
+            before = self._log_offset
+            self._read_log()
+            picked_up = self._log_offset != before
+            self._stats["synced"] += int(picked_up)
+        return reloaded or picked_up
+
+    def _known(self, item_id: str) -> bool:
+        return item_id in self._ids or (self.prefilter and self._in_snapshot(item_id))
+
+    def __contains__(self, item_id: str) -> bool:
+        if self._known(item_id):
+            return True
+        return self.sync() and self._known(item_id)
+
+    def __len__(self) -> int:
+        if self.prefilter:
+            return self._snapshot_lines + len(self._ids)
+        return len(self._ids)
+
+    def __iter__(self):
+        if self.prefilter:
+            return heapq.merge(self._iter_snapshot(), sorted(self._ids))
+        return iter(list(self._ids))
+
+    def add(self, item_id: str) -> bool:
+        """Add one ID. Returns False if it was already known."""
+        return self.add_many([item_id]) == 1
+
+    def add_many(self, item_ids: Iterable[str]) -> int:
+        """Add IDs with a single append. Returns how many were new."""
+        with self._lock:
+            new = []
+            for item_id in item_ids:
+                item_id = str(item_id).strip()
+                if item_id and not self._known(item_id):
+                    self._ids.add(item_id)
+                    new.append(item_id)
+            if new:
+                with self._file_lock(exclusive=False):
+                    os.write(self._log_fd, ("\n".join(new) + "\n").encode("utf-8"))
+                self._stats["added"] += len(new)
+        return len(new)
+
+    def update(self, item_ids: Iterable[str]):
+        self.add_many(item_ids)
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+
+    def needs_compaction(self) -> bool:
+        return self._log_lines >= max(self.config.compact_threshold, self._snapshot_lines // 2)
+
+    def _write_snapshot(self, tmp_path: Path) -> int:
+        """Sorted, de-duplicated union of the snapshot and the log. Returns the line count."""
+        if not self.prefilter:
+            tmp_path.write_text("".join(f"{item_id}\n" for item_id in sorted(self._ids)), encoding="utf-8")
+            return len(self._ids)
+
+        # Streamed merge: the snapshot is never loaded as a whole
+        lines = 0
+        previous = None
+        bloom = BloomFilter.create(self._snapshot_lines + len(self._ids), self.config.prefilter_fp_rate)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for item_id in heapq.merge(self._iter_snapshot(), sorted(self._ids)):
+                if item_id == previous:
+                    continue
+                f.write(f"{item_id}\n")
+                bloom.add(item_id)
+                previous = item_id
+                lines += 1
+        bloom.tag = tmp_path.stat().st_size
+        bloom.save(self.bloom_path)
+        return lines
+
+    def compact(self):
+        """Fold the log into a new sorted snapshot and empty the log."""
+        with self._lock, self._file_lock(exclusive=True):
+            if self._snapshot_signature() != self._snapshot_id:
+                self._load_snapshot()
+            self._read_log()
+            tmp_path = self.snapshot_path.with_name(f"{self.snapshot_path.name}.{os.getpid()}.tmp")
+            lines = self._write_snapshot(tmp_path)
+            os.replace(tmp_path, self.snapshot_path)
+            # Truncated in place: other processes keep appending to the same file
+            os.truncate(self.log_path, 0)
+            if self.prefilter:
+                self._map_snapshot()
+            self._snapshot_id = self._snapshot_signature()
+            self._snapshot_lines = lines
+            self._log_offset = 0
+            self._log_lines = 0
+        self._stats["compactions"] += 1
+        logger.info(f"[{self.namespace}] Compacted to {lines} IDs")
+
+    def save(self):
+        """Appends are already on disk; catch up with other processes and compact when due."""
+        self.sync(force=True)
+        if self.needs_compaction():
+            self.compact()
+
+    def close(self):
+        self.save()
+        self._close_maps()
+        for fd in (self._log_fd, self._lock_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            **self._stats,
+            "ids": len(self),
+            "snapshot_ids": self._snapshot_lines,
+            "log_ids": self._log_lines,
+        }
+        if self._bloom is not None:
+            stats["bloom"] = self._bloom.stats
+        return stats
+
+
+# ============================================================================
+# CONVENIENCE FUNCTIONS
+# ============================================================================
+
+# One store per namespace and process
+_stores: Dict[str, SeenStore] = {}
+
+
+def get_seen_store(namespace: str, **kwargs) -> SeenStore:
+    """
+    Get or open the seen-ID store of `namespace` (usually "category/site").
+
+    Keyword arguments (legacy_path, directory, prefilter) only apply when it is opened.
+    """
+    store = _stores.get(namespace)
+    if store is None:
+        store = SeenStore(namespace, **kwargs)
+        _stores[namespace] = store
+    return store
+
+
+def close_seen_stores():
+    """Compact (when due) and close every open store."""
+    for store in list(_stores.values()):
+        store.close()
+    _stores.clear()
@@ -0,0 +1,361 @@
+"""
+Kloufi-Scrape JSONL Segments
+
+Local JSON output as rolling JSONL segments, instead of one pretty-printed
+file per document (hundreds of thousands of tiny files, an open/close per
+save):
+
+    writer = get_segment_writer(get_data_path() / "immobilier" / "ouedkniss")
+    writer.write(doc)               # one line in a buffered, open segment
+    close_segment_writers()         # end of the process (also run at exit)
+
+    for doc in read_segments(get_data_path() / "immobilier" / "ouedkniss"):
+        ...
+
+Layout of a category/site directory:
+
+    20261017-031500-4242-1.jsonl.part   open segment (flock held by its writer)
+    20261017-021500-4242-1.jsonl.zst    closed segment (.jsonl.gz without zstandard, .jsonl with JSONL_COMPRESS=false)
+    manifest.jsonl                      one line per closed segment: file, documents, bytes, first / last write
+
+A segment is closed at JSONL_SEGMENT_BYTES or after JSONL_SEGMENT_AGE
+seconds. The open segment of a dead process (an unlocked `.part`) is closed
+by the next writer of its directory. Names start with the opening time, so
+reading them in name order is reading them in write order.
+
+CLI:
+
+    python core/segments.py ls junk_test/immobilier/ouedkniss
+    python core/segments.py cat junk_test/immobilier/ouedkniss > listings.jsonl
+"""
+
+import atexit
+import gzip
+import io
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, TextIO
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import SegmentConfig, get_segment_config
+from scraper.utils.logger import get_logger
+
+logger = get_logger("segments")
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+OPEN_SUFFIX = ".jsonl.part"
+PLAIN_SUFFIX = ".jsonl"
+ZSTD_SUFFIX = ".jsonl.zst"
+GZIP_SUFFIX = ".jsonl.gz"
+MANIFEST = "manifest.jsonl"
+
+# Write buffer of an open segment (flushed at rotation, flush() and close())
+BUFFER_SIZE = 1024 * 1024
+
+
+def _lock(fd: int) -> bool:
+    """Try to take the exclusive lock of a segment (True without fcntl)."""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _stem(path: Path) -> str:
+    return path.name.split(".", 1)[0]
+
+
+class SegmentWriter:
+    """Buffered JSONL output of one directory (category/site), rolled into compressed segments."""
+
+    def __init__(self, directory: Path, config: Optional[SegmentConfig] = None):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.config = config or get_segment_config()
+        self.manifest_path = self.directory / MANIFEST
+
+        self._lock = threading.Lock()
+        self._file: Optional[TextIO] = None
+        self._path: Optional[Path] = None
+        self._opened_at = 0.0
+        self._size = 0
+        self._documents = 0
+        self._first: Optional[float] = None
+        self._last: Optional[float] = None
+        self._counter = 0
+        self._stats = {"documents": 0, "segments": 0, "bytes": 0, "stored_bytes": 0}
+
+        self._recover()
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def write(self, data: Dict[str, Any]):
+        """Append one document to the open segment (rolled over when full or old)."""
+        line = json.dumps(data, ensure_ascii=False, default=str) + "\n"
+        now = time.time()
+        with self._lock:
+            if self._file is not None and self._due(now):
+                self._roll()
+            if self._file is None:
+                self._open(now)
+            self._file.write(line)
+            self._size += len(line.encode("utf-8"))
+            self._documents += 1
+            self._first = self._first or now
+            self._last = now
+            self._stats["documents"] += 1
+
+    def flush(self):
+        """Write the buffer out (and roll an old segment over)."""
+        with self._lock:
+            if self._file is None:
+                return
+            if self._due(time.time()):
+                self._roll()
+            else:
+                self._file.flush()
+
+    def close(self):
+        """Close the open segment."""
+        with self._lock:
+            if self._file is not None:
+                self._roll()
+
+    def _due(self, now: float) -> bool:
+        return self._size >= self.config.segment_bytes or now - self._opened_at >= self.config.segment_age
+
+    def _open(self, now: float):
+        self._counter += 1
+        path = self.directory / f"{datetime.fromtimestamp(now):%Y%m%d-%H%M%S}-{os.getpid()}-{self._counter}{OPEN_SUFFIX}"
+        # Locked before it gets its name: an unlocked .part always belongs to a dead process
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        fd = os.open(str(tmp_path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        _lock(fd)
+        os.rename(tmp_path, path)
+        self._file = os.fdopen(fd, "a", encoding="utf-8", buffering=BUFFER_SIZE)
+        self._path = path
+        self._opened_at = now
+        self._size = 0
+        self._documents = 0
+        self._first = self._last = None
+
+    def _roll(self):
+        """Close the open segment: flush, compress and record it (the lock is held until done)."""
+        handle, self._file = self._file, None
+        try:
+            handle.flush()
+            self._finish(self._path, self._documents, self._first, self._last)
+        except OSError as e:
+            logger.error(f"Segment {self._path.name} could not be closed: {e}")
+        finally:
+            handle.close()
+
+    def _finish(self, path: Path, documents: int, first: Optional[float], last: Optional[float]):
+        size = path.stat().st_size
+        target = self._compress(path) if self.config.compress else self._rename(path, PLAIN_SUFFIX)
+        stored = target.stat().st_size
+        entry = {
+            "file": target.name,
+            "documents": documents,
+            "bytes": size,
+            "stored_bytes": stored,
+            "first": datetime.fromtimestamp(first).isoformat() if first else None,
+            "last": datetime.fromtimestamp(last).isoformat() if last else None,
+            "closed_at": datetime.now().isoformat(),
+        }
+        # One short append per segment: lines of several processes do not interleave
+        with open(self.manifest_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._stats["segments"] += 1
+        self._stats["bytes"] += size
+        self._stats["stored_bytes"] += stored
+        logger.debug(f"Closed segment {target.name}: {documents} documents, {size} -> {stored} bytes")
+
+    @staticmethod
+    def _rename(path: Path, suffix: str) -> Path:
+        target = path.with_name(_stem(path) + suffix)
+        os.replace(path, target)
+        return target
+
+    def _compress(self, path: Path) -> Path:
+        suffix = ZSTD_SUFFIX if ZSTD_AVAILABLE else GZIP_SUFFIX
+        target = path.with_name(_stem(path) + suffix)
+        tmp_path = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        with open(path, "rb") as src, open(tmp_path, "wb") as dst:
+            if ZSTD_AVAILABLE:
+                zstandard.ZstdCompressor(level=self.config.compression_level).copy_stream(src, dst)
+            else:
+                with gzip.GzipFile(fileobj=dst, mode="wb", compresslevel=6) as gz:
+                    shutil.copyfileobj(src, gz, BUFFER_SIZE)
+        os.replace(tmp_path, target)
+        os.unlink(path)
+        return target
+
+    def _recover(self):
+        """Close the open segments of dead processes."""
+        if fcntl is None:
+            # Without locks a live segment cannot be told from an abandoned one
+            return
+        for path in sorted(self.directory.glob(f"*{OPEN_SUFFIX}")):
+            try:
+                fd = os.open(str(path), os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            try:
+                if not _lock(fd) or os.fstat(fd).st_ino != os.stat(path).st_ino:
+                    continue
+                with open(path, "rb") as f:
+                    documents = sum(1 for _ in f)
+                self._finish(path, documents, None, None)
+                logger.info(f"Closed the segment of a dead process: {path.name}")
+            except OSError as e:
+                logger.warning(f"Could not recover segment {path.name}: {e}")
+            finally:
+                os.close(fd)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "open_documents": self._documents, "open_bytes": self._size}
+
+
+# ============================================================================
+# READING
+# ============================================================================
+
+def segment_files(directory: Path) -> List[Path]:
+    """Segments of a directory in write order (closed ones and the open ones)."""
+    suffixes = (OPEN_SUFFIX, PLAIN_SUFFIX, ZSTD_SUFFIX, GZIP_SUFFIX)
+    return sorted(
+        (path for path in Path(directory).iterdir() if path.name.endswith(suffixes) and path.name != MANIFEST),
+        key=lambda path: path.name,
+    )
+
+
+def _open_segment(path: Path) -> TextIO:
+    if path.name.endswith(ZSTD_SUFFIX):
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError(f"{path.name} needs the zstandard package")
+        raw = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        return io.TextIOWrapper(raw, encoding="utf-8")
+    if path.name.endswith(GZIP_SUFFIX):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def read_segments(directory: Path) -> Iterator[Dict[str, Any]]:
+    """Stream every document of a directory, oldest segment first."""
+    for path in segment_files(directory):
+        if not path.exists():
+            # Closed (renamed) since it was listed
+            closed = [p for p in segment_files(directory) if _stem(p) == _stem(path)]
+            if not closed:
+                continue
+            path = closed[0]
+        with _open_segment(path) as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Unfinished last line of an open segment
+                    continue
+
+
+# ============================================================================
+# CONVENIENCE FUNCTIONS
+# ============================================================================
+
+# One writer per directory and process
+_writers: Dict[Path, SegmentWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_segment_writer(directory: Path) -> SegmentWriter:
+    """Get or open the segment writer of a category/site directory."""
+    key = Path(directory).resolve()
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            if not _writers:
+                # Buffered lines would be lost on a plain exit
+                atexit.register(close_segment_writers)
+            writer = SegmentWriter(key)
+            _writers[key] = writer
+        return writer
+
+
+def flush_segment_writer(directory: Path):
+    """Write out the buffer of one directory's writer (if it has one)."""
+    with _writers_lock:
+        writer = _writers.get(Path(directory).resolve())
+    if writer is not None:
+        writer.flush()
+
+
+def flush_segment_writers():
+    """Write out every writer's buffer (end of a site run)."""
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.flush()
+
+
+def close_segment_writers():
+    """Close every open segment."""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="JSONL segments of a category/site directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ls_parser = sub.add_parser("ls", help="List segments (from the manifest) and open ones")
+    ls_parser.add_argument("directory")
+    cat_parser = sub.add_parser("cat", help="Print every document as a JSON line")
+    cat_parser.add_argument("directory")
+    args = parser.parse_args()
+
+    directory = Path(args.directory)
+    if args.command == "ls":
+        manifest: Dict[str, Dict[str, Any]] = {}
+        if (directory / MANIFEST).exists():
+            with open(directory / MANIFEST, "r", encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    manifest[entry["file"]] = entry
+        for path in segment_files(directory):
+            entry = manifest.get(path.name)
+            if entry:
+                print(f"{path.name:<45} {entry['documents']:>8} docs  {entry['bytes']:>12} -> {entry['stored_bytes']} bytes")
+            else:
+                print(f"{path.name:<45} {'open':>8}       {path.stat().st_size:>12} bytes")
+    elif args.command == "cat":
+        for doc in read_segments(directory):
+            print(json.dumps(doc, ensure_ascii=False))
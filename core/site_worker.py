@@ -0,0 +1,329 @@
+"""
+Kloufi-Scrape Site Worker Pool
+
+Runs each site scraper in its own worker process instead of importing it
+into the dispatcher. Legacy site scripts do things that are unsafe in a
+shared process: `asyncio.run(...)` at import time, `sys.setrecursionlimit`,
+`locale.setlocale`, `sys.exit()`, unbounded Chromium launches. In a worker
+they can only take themselves down.
+
+    pool = get_site_worker_pool()
+    result = await pool.run(site, shutdown_event)
+    # {"site": "tonobiles", "items_scraped": 0, "errors": 0, "status": "completed", ...}
+
+Each worker is supervised:
+- killed (with its whole process tree) after SITE_TIMEOUT seconds
+- killed when the tree's RSS goes above SITE_MAX_RSS_MB
+- terminated, then killed after a grace period, when shutdown is requested
+
+At most SITE_WORKERS workers run at once (0 = one per CPU core), across all
+categories. The worker reports its result as JSON in a result file; a worker
+that dies without writing one is reported as "crashed" with its exit code.
+
+Enabled with SITE_ISOLATION=true (or `--isolated` on core/dispatcher.py).
+
+Worker entry point (started by the pool):
+
+    python core/site_worker.py <category> <site> --result <path>
+"""
+
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import get_site_worker_config, SiteWorkerConfig, PROJECT_ROOT
+from scraper.crawler.budget import Slots
+from scraper.crawler.replay import get_replay_backend
+from scraper.utils.logger import get_logger
+
+logger = get_logger("site_worker")
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+
+WORKER_SCRIPT = Path(__file__).resolve()
+
+# Seconds a worker gets to exit after SIGTERM before it is killed
+SHUTDOWN_GRACE = 10.0
+
+# How often a running worker is checked (timeout, memory, shutdown)
+POLL_INTERVAL = 1.0
+
+
+def _tree_rss_mb(pid: int) -> float:
+    """RSS of a process and all its children, in MB (0 when unknown)."""
+    if not PSUTIL_AVAILABLE:
+        return 0.0
+    try:
+        proc = psutil.Process(pid)
+        total = proc.memory_info().rss
+        for child in proc.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        return total / (1024 * 1024)
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return 0.0
+
+
+def _signal_tree(pid: int, kill: bool):
+    """Terminate (or kill) a worker and every process it started."""
+    if PSUTIL_AVAILABLE:
+        try:
+            proc = psutil.Process(pid)
+            procs = proc.children(recursive=True) + [proc]
+        except psutil.NoSuchProcess:
+            return
+        for p in procs:
+            try:
+                p.kill() if kill else p.terminate()
+            except psutil.NoSuchProcess:
+                pass
+    elif hasattr(os, "killpg"):
+        # Workers are started in their own session: the group is the whole tree
+        try:
+            os.killpg(pid, signal.SIGKILL if kill else signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    else:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError:
+            pass
+
+
+class SiteWorkerPool:
+    """Runs sites in supervised worker processes, a bounded number at a time."""
+
+    def __init__(self, config: Optional[SiteWorkerConfig] = None):
+        self.config = config or get_site_worker_config()
+        self.slots = Slots("site_workers", self.config.worker_count)
+        self._stats = {
+            "started": 0, "completed": 0, "failed": 0, "crashed": 0,
+            "timeouts": 0, "memory_kills": 0, "shutdown_kills": 0,
+        }
+        self.peak_rss_mb = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.enabled
+
+    def _env(self) -> Dict[str, str]:
+        """Worker environment: ours, plus settings made at runtime (e.g. --replay)."""
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(PROJECT_ROOT), env.get("PYTHONPATH")]))
+        replay = get_replay_backend()
+        if replay.enabled:
+            env["FETCH_REPLAY"] = replay.config.source
+            env["REPLAY_LATENCY_MS"] = str(replay.config.latency_ms)
+            env["REPLAY_JITTER_MS"] = str(replay.config.jitter_ms)
+        return env
+
+    async def run(self, site: Any, shutdown_event: Optional[asyncio.Event] = None) -> Dict[str, Any]:
+        """Run one site (a core.category_runner.SiteConfig) in a worker process."""
+        async with self.slots.hold():
+            if shutdown_event is not None and shutdown_event.is_set():
+                return {"site": site.name, "items_scraped": 0, "errors": 0, "status": "skipped"}
+            return await self._run_worker(site, shutdown_event)
+
+    async def _run_worker(self, site: Any, shutdown_event: Optional[asyncio.Event]) -> Dict[str, Any]:
+        fd, result_path = tempfile.mkstemp(prefix="site_result_", suffix=".json")
+        os.close(fd)
+        os.unlink(result_path)
+
+        if sys.platform == "win32":
+            isolation = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            isolation = {"start_new_session": True}
+
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, str(WORKER_SCRIPT), site.category, site.name, "--result", result_path,
+            cwd=str(PROJECT_ROOT), env=self._env(), **isolation,
+        )
+        self._stats["started"] += 1
+        logger.info(f"Worker {proc.pid} started for {site.category}/{site.name}")
+
+        status, peak_rss = await self._supervise(proc, site, shutdown_event)
+
+        result: Dict[str, Any] = {"site": site.name, "items_scraped": 0, "errors": 1}
+        try:
+            with open(result_path, "r", encoding="utf-8") as f:
+                result.update(json.load(f))
+        except (FileNotFoundError, ValueError):
+            if status == "completed":
+                status = "crashed"
+        finally:
+            try:
+                os.unlink(result_path)
+            except FileNotFoundError:
+                pass
+
+        if status == "completed" and result.get("errors"):
+            status = "failed"
+        self._stats[status if status in ("completed", "failed", "crashed") else "failed"] += 1
+        result.update(status=status, exit_code=proc.returncode, peak_rss_mb=round(peak_rss, 0))
+
+        if status != "completed":
+            logger.warning(
+                f"Worker for {site.category}/{site.name} ended: {status} "
+                f"(exit code {proc.returncode}){': ' + result['error'] if result.get('error') else ''}"
+            )
+        return result
+
+    async def _supervise(self, proc, site: Any, shutdown_event: Optional[asyncio.Event]):
+        """Wait for a worker, killing it on timeout, memory or shutdown. Returns (status, peak RSS)."""
+        started = time.monotonic()
+        peak_rss = 0.0
+        status = "completed"
+
+        while True:
+            try:
+                await asyncio.wait_for(proc.wait(), timeout=POLL_INTERVAL)
+                return status, peak_rss
+            except asyncio.TimeoutError:
+                pass
+
+            rss = _tree_rss_mb(proc.pid)
+            peak_rss = max(peak_rss, rss)
+            self.peak_rss_mb = max(self.peak_rss_mb, rss)
+
+            if time.monotonic() - started > self.config.timeout:
+                status = "timeout"
+                self._stats["timeouts"] += 1
+                logger.warning(f"{site.category}/{site.name} exceeded {self.config.timeout}s, killing worker {proc.pid}")
+                _signal_tree(proc.pid, kill=True)
+            elif self.config.max_rss_mb and rss > self.config.max_rss_mb:
+                status = "memory"
+                self._stats["memory_kills"] += 1
+                logger.warning(
+                    f"{site.category}/{site.name} uses {rss:.0f} MB (limit {self.config.max_rss_mb} MB), "
+                    f"killing worker {proc.pid}"
+                )
+                _signal_tree(proc.pid, kill=True)
+            elif shutdown_event is not None and shutdown_event.is_set():
+                status = "shutdown"
+                self._stats["shutdown_kills"] += 1
+                _signal_tree(proc.pid, kill=False)
+                try:
+                    await asyncio.wait_for(proc.wait(), timeout=SHUTDOWN_GRACE)
+                except asyncio.TimeoutError:
+                    _signal_tree(proc.pid, kill=True)
+            else:
+                continue
+
+            await proc.wait()
+            return status, peak_rss
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "workers": self.config.worker_count,
+            "workers_peak": self.slots.peak,
+            "rss_peak_mb": round(self.peak_rss_mb, 0),
+        }
+
+
+# ============================================================================
+# WORKER PROCESS
+# ============================================================================
+
+def _worker_main(category: str, site_name: str) -> Dict[str, Any]:
+    """Run one site inside this (worker) process."""
+    result: Dict[str, Any] = {"site": site_name, "items_scraped": 0, "new_items": 0, "errors": 0, "error": None}
+    counter = None
+    try:
+        from config import get_scraper_config
+        from core.category_runner import CategoryRunner, _site_dir, _import_site_module
+        from core.revisit import track_new_items
+        from core.storage import close_async_es_client
+
+        runner = CategoryRunner(category)
+        site = next((s for s in runner.sites if s.name == site_name), None)
+        if site is None:
+            raise ValueError(f"Unknown site: {category}/{site_name}")
+
+        with track_new_items() as counter:
+            # Import before any event loop exists: legacy sites that scrape from
+            # an import-time asyncio.run() do their whole run right here
+            sys.path.insert(0, _site_dir(site))
+            module = _import_site_module(site, _site_dir(site))
+
+            if hasattr(module, "run_scraper") or hasattr(module, "main"):
+                async def _run():
+                    try:
+                        return await runner.run_site(
+                            site=site,
+                            proxy_manager=None,
+                            config=get_scraper_config(),
+                            shutdown_event=asyncio.Event(),
+                        )
+                    finally:
+                        await close_async_es_client()   # Bound to this loop
+
+                outcome = asyncio.run(_run())
+                result["items_scraped"] = outcome.get("items_scraped", 0)
+                result["errors"] = outcome.get("errors", 0)
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            result.update(errors=1, error=f"sys.exit({e.code!r})")
+    except Exception as e:
+        result.update(errors=1, error=repr(e))
+    if counter is not None:
+        from core.storage import close_storages
+        close_storages()    # Buffered documents are acknowledged (and counted) before the result
+        result["new_items"] = counter.new_items if counter.saved else result["items_scraped"]
+    return result
+
+
+def _write_result(path: str, result: Dict[str, Any]):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+# ============================================================================
+# CONVENIENCE FUNCTIONS
+# ============================================================================
+
+# Process-wide pool instance
+_pool: Optional[SiteWorkerPool] = None
+
+
+def get_site_worker_pool() -> SiteWorkerPool:
+    """Get or create the process-wide site worker pool."""
+    global _pool
+    if _pool is None:
+        _pool = SiteWorkerPool()
+    return _pool
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run one site scraper (site worker process)")
+    parser.add_argument("category")
+    parser.add_argument("site")
+    parser.add_argument("--result", help="Write the JSON result to this file")
+    args = parser.parse_args()
+
+    worker_result = _worker_main(args.category, args.site)
+    if args.result:
+        _write_result(args.result, worker_result)
+    else:
+        print(json.dumps(worker_result, indent=2, ensure_ascii=False))
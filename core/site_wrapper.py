@@ -79,9 +79,10 @@ class SiteScraperWrapper:
         """
         Save scraped data using unified storage.
         
-        Automatically handles JSON vs Elasticsearch based on environment.
+        Automatically handles JSON vs Elasticsearch based on environment,
+        without blocking the other coroutines of the site.
         """
-        success = self.storage.save(data)
+        success = await self.storage.save_async(data)
         
         if success:
             self.items_scraped += 1
@@ -0,0 +1,635 @@
+"""
+Kloufi-Scrape Write-Ahead Spool
+
+Every Elasticsearch document write is appended to a local spool before it is
+sent, so a write that fails (cluster down, rejections past the bulk writer's
+retries, a process killed mid-batch) is replayed later instead of lost:
+
+    spool = get_spool()
+    ticket = spool.append("voiture", doc_id, doc)   # before the write
+    ...
+    spool.ack(ticket)                               # written: nothing to replay
+    spool.nack(ticket)                              # failed: replayed by the drainer
+
+Records are JSON lines in segment files in data/state/spool/:
+
+    <started ms>-<pid>-<n>.open     segment a process appends to (flock held while open)
+    <started ms>-<pid>-<n>.seg      closed segment: the records to replay
+    rejected.jsonl                  records the cluster refused (mapping errors, 400)
+
+A segment is closed at SPOOL_SEGMENT_BYTES or after SPOOL_SEGMENT_AGE
+seconds. Once its in-flight writes are settled it is deleted if they were all
+acknowledged, otherwise rewritten as a `.seg` with the others. A newer write
+of the same document supersedes a pending record of the same process.
+
+A background drainer replays `.seg` segments oldest first with bulk requests
+once the cluster answers (backing off while it does not). Documents keep
+their IDs, so a replay is idempotent; segments of dead processes (an unlocked
+`.open`) are picked up too. Past SPOOL_MAX_BYTES the oldest closed segments
+are dropped.
+
+A replay is a scripted update that does nothing (`noop`, counted as stale)
+when the stored document's `date_crawl` is not older than the record's: a
+newer write made meanwhile, by this or another process, is never overwritten.
+Every write stamps `date_crawl` as a full ISO timestamp (`stamp_date_crawl`),
+so a date-only value cannot make two writes of the same day look equal.
+The content hash of every replayed document is discarded, so its next save
+is a full write.
+"""
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import (
+    ES_INDICES,
+    SpoolConfig,
+    get_content_hash_config,
+    get_elasticsearch_config,
+    get_scraper_config,
+    get_spool_config,
+    get_state_path,
+)
+from core.bulk_writer import RETRY_STATUSES
+from core.content_hash import get_content_hash_cache
+from core.first_seen import KEEP_FIRST_SEEN_SCRIPT, bulk_action, first_seen_fields
+from scraper.utils.logger import get_logger
+
+logger = get_logger("spool")
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    from elasticsearch import Elasticsearch, helpers
+except ImportError:
+    Elasticsearch = helpers = None
+
+# Longest wait between drain passes while the cluster is unreachable
+MAX_DRAIN_DELAY = 300
+
+
+def _lock(fd: int) -> bool:
+    """Try to take the exclusive lock of a segment (True without fcntl)."""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+@dataclass
+class _Segment:
+    """A segment this process appends to, or closed and waiting for its in-flight writes."""
+    path: Path
+    fd: int
+    started: float
+    size: int = 0
+    records: int = 0
+    pending: Dict[int, Tuple[float, Tuple[str, str]]] = field(default_factory=dict)  # n -> (appended at, key)
+    failed: Set[int] = field(default_factory=set)
+    closed_at: Optional[float] = None
+
+    @property
+    def settled(self) -> bool:
+        """Every pending record failed: nothing left to wait for."""
+        return len(self.failed) >= len(self.pending)
+
+
+# (segment, record number, (index, document ID))
+Ticket = Tuple[_Segment, int, Tuple[str, str]]
+
+
+class Spool:
+    """Segmented write-ahead log of document writes, with a background drainer."""
+
+    def __init__(self, directory: Optional[Path] = None, config: Optional[SpoolConfig] = None):
+        self.config = config or get_spool_config()
+        self.directory = directory or get_state_path() / "spool"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.rejected_path = self.directory / "rejected.jsonl"
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closing = False
+        self._open: Optional[_Segment] = None
+        self._closed: List[_Segment] = []           # Rotated, waiting for in-flight writes
+        self._latest: Dict[Tuple[str, str], Ticket] = {}
+        self._counter = 0
+        self._client: Optional[Any] = None
+        self._failures = 0                          # Consecutive failed drain passes
+        self._last_drain: Optional[float] = None
+        self._stats = {
+            "appended": 0, "acked": 0, "failed": 0, "superseded": 0,
+            "spooled": 0, "replayed": 0, "stale": 0, "rejected": 0, "dropped": 0,
+        }
+
+        # Appending works without a client; replaying needs one
+        self._thread: Optional[threading.Thread] = None
+        if helpers is not None and get_elasticsearch_config().is_configured:
+            self._thread = threading.Thread(target=self._run, name="es-spool-drainer", daemon=True)
+            self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Writers
+    # ------------------------------------------------------------------
+
+    def append(self, index_name: str, doc_id: str, data: Dict[str, Any]) -> Optional[Ticket]:
+        """Log one document write. None if the spool is closed or the disk write failed."""
+        now = time.time()
+        key = (index_name, str(doc_id))
+        with self._lock:
+            if self._closing:
+                return None
+            try:
+                segment = self._segment(now)
+                record = {"n": segment.records, "at": round(now, 3), "index": index_name, "id": doc_id, "doc": data}
+                line = (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+                os.write(segment.fd, line)
+                if self.config.fsync:
+                    os.fsync(segment.fd)
+            except OSError as e:
+                logger.error(f"Spool write failed: {e}")
+                return None
+            ticket = (segment, segment.records, key)
+            segment.pending[segment.records] = (now, key)
+            segment.records += 1
+            segment.size += len(line)
+
+            previous = self._latest.get(key)
+            if previous is not None:
+                self._forget(previous)
+                self._stats["superseded"] += 1
+            self._latest[key] = ticket
+            self._stats["appended"] += 1
+            self._settle(now)
+        return ticket
+
+    def ack(self, ticket: Optional[Ticket]):
+        """The write was acknowledged: its record is not replayed."""
+        if ticket is None:
+            return
+        with self._lock:
+            self._forget(ticket)
+            self._stats["acked"] += 1
+            self._settle(time.time())
+
+    def nack(self, ticket: Optional[Ticket]):
+        """The write failed: its record is replayed once its segment is closed."""
+        if ticket is None:
+            return
+        with self._lock:
+            segment, n, _ = ticket
+            if n in segment.pending:
+                segment.failed.add(n)
+                self._stats["failed"] += 1
+            self._settle(time.time())
+
+    def _forget(self, ticket: Ticket):
+        segment, n, key = ticket
+        segment.pending.pop(n, None)
+        segment.failed.discard(n)
+        if self._latest.get(key) is ticket:
+            del self._latest[key]
+
+    # ------------------------------------------------------------------
+    # Segments
+    # ------------------------------------------------------------------
+
+    def _segment(self, now: float) -> _Segment:
+        """The open segment, rotated when full or old."""
+        segment = self._open
+        if segment is not None and (
+            segment.size >= self.config.segment_bytes or now - segment.started >= self.config.segment_age
+        ):
+            self._rotate(now)
+            segment = None
+        if segment is None:
+            self._counter += 1
+            path = self.directory / f"{int(now * 1000):013d}-{os.getpid()}-{self._counter}.open"
+            # Locked before it gets its name: an unlocked .open always belongs to a dead process
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            fd = os.open(str(tmp_path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            _lock(fd)
+            os.rename(tmp_path, path)
+            segment = self._open = _Segment(path, fd, now)
+        return segment
+
+    def _rotate(self, now: float):
+        # The fd (and its lock) stays open until the segment is finalized
+        segment, self._open = self._open, None
+        if segment is not None:
+            segment.closed_at = now
+            self._closed.append(segment)
+
+    def _settle(self, now: float, force: bool = False):
+        """Finalize closed segments whose writes are settled (or waited on for a whole segment age)."""
+        for segment in list(self._closed):
+            if force or segment.settled or now - segment.closed_at >= self.config.segment_age:
+                self._closed.remove(segment)
+                self._finalize(segment)
+
+    def _finalize(self, segment: _Segment):
+        """Delete a closed segment, or keep its unacknowledged records as a .seg."""
+        keep = set(segment.pending)
+        for _, key in segment.pending.values():
+            ticket = self._latest.get(key)
+            if ticket is not None and ticket[0] is segment:
+                del self._latest[key]
+        try:
+            if keep:
+                target = segment.path.with_suffix(".seg")
+                tmp_path = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+                with open(segment.path, "r", encoding="utf-8") as src, open(tmp_path, "w", encoding="utf-8") as dst:
+                    for line in src:
+                        if json.loads(line)["n"] in keep:
+                            dst.write(line)
+                os.replace(tmp_path, target)
+                self._stats["spooled"] += len(keep)
+                logger.warning(f"{len(keep)} unacknowledged writes spooled for replay ({target.name})")
+                if not self._failures:
+                    self._wake.set()
+            os.unlink(segment.path)
+        except OSError as e:
+            logger.error(f"Spool segment {segment.path.name} could not be closed: {e}")
+        finally:
+            os.close(segment.fd)
+
+    # ------------------------------------------------------------------
+    # Drainer
+    # ------------------------------------------------------------------
+
+    def _es(self) -> Optional[Any]:
+        if self._client is None:
+            es_config = get_elasticsearch_config()
+            try:
+                self._client = Elasticsearch(
+                    [es_config.host],
+                    basic_auth=(es_config.username, es_config.password),
+                    verify_certs=es_config.verify_certs,
+                )
+            except Exception as e:
+                logger.error(f"Spool drainer cannot create an Elasticsearch client: {e}")
+        return self._client
+
+    def _run(self):
+        while not self._closing:
+            self._wake.wait(min(self.config.drain_interval * 2 ** self._failures, MAX_DRAIN_DELAY))
+            self._wake.clear()
+            if self._closing:
+                return
+            with self._lock:
+                # An idle process still hands its segment over
+                now = time.time()
+                if self._open is not None and now - self._open.started >= self.config.segment_age:
+                    self._rotate(now)
+                self._settle(now)
+            try:
+                self.drain()
+            except Exception as e:
+                logger.error(f"Spool drain error: {e}")
+
+    def drain(self) -> bool:
+        """Replay every closed segment, oldest first. False if the cluster did not take them all."""
+        self._recover()
+        self._enforce_cap()
+        for path in sorted(self.directory.glob("*.seg")):
+            if not self._replay(path):
+                self._failures += 1
+                return False
+        self._failures = 0
+        self._last_drain = time.time()
+        return True
+
+    def _claim(self, path: Path) -> Optional[int]:
+        """Open and lock a segment file. None if it is gone or someone else holds it."""
+        try:
+            fd = os.open(str(path), os.O_RDONLY)
+        except FileNotFoundError:
+            return None
+        # Locked, or replaced by its drainer since we opened it
+        try:
+            if _lock(fd) and os.fstat(fd).st_ino == os.stat(path).st_ino:
+                return fd
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+        return None
+
+    def _recover(self):
+        """Turn the .open segments of dead processes into .seg segments."""
+        if fcntl is None:
+            # Without locks a live segment cannot be told from an abandoned one
+            return
+        for path in self.directory.glob("*.open"):
+            fd = self._claim(path)
+            if fd is None:
+                continue
+            try:
+                os.rename(path, path.with_suffix(".seg"))
+                logger.warning(f"Recovered spool segment of a dead process: {path.name}")
+            except OSError:
+                pass
+            finally:
+                os.close(fd)
+
+    def _replay(self, path: Path) -> bool:
+        fd = self._claim(path)
+        if fd is None:
+            return True
+        try:
+            records = []
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        # Torn last line of a killed writer
+                        logger.warning(f"Skipping an unreadable record in {path.name}")
+            client = self._es()
+            if client is None:
+                return False
+
+            keep: List[Dict[str, Any]] = []
+            replayed = stale = 0
+            replayed_ids: List[Tuple[str, str]] = []
+            size = max(self.config.drain_batch_size, 1)
+            for start in range(0, len(records), size):
+                chunk = records[start:start + size]
+                if keep:
+                    # The cluster failed on this segment already: keep the rest for the next pass
+                    keep.extend(chunk)
+                    continue
+                done = 0
+                try:
+                    results = helpers.streaming_bulk(
+                        client,
+                        [replay_action(record) for record in chunk],
+                        chunk_size=len(chunk),
+                        raise_on_error=False,
+                        raise_on_exception=False,
+                        max_retries=0,
+                    )
+                    for ok, info in results:
+                        record = chunk[done]
+                        done += 1
+                        result = next(iter(info.values()), {}) if info else {}
+                        status = result.get("status")
+                        if ok:
+                            replayed += 1
+                            replayed_ids.append((record["index"], record["id"]))
+                            if result.get("result") == "noop":
+                                stale += 1
+                        elif isinstance(status, int) and status not in RETRY_STATUSES:
+                            self._reject(record, status, result.get("error"))
+                        else:
+                            keep.append(record)
+                except Exception as e:
+                    logger.warning(f"Spool replay of {path.name} failed after {done}/{len(chunk)} documents: {e}")
+                    keep.extend(chunk[done:])
+
+            with self._lock:
+                self._stats["replayed"] += replayed
+                self._stats["stale"] += stale
+            if replayed_ids and get_content_hash_config().enabled:
+                # Cached hashes describe whichever write the replay raced with
+                for index_name, doc_id in replayed_ids:
+                    get_content_hash_cache(index_name).discard(doc_id)
+            if keep:
+                tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    for record in keep:
+                        f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                os.replace(tmp_path, path)
+                if replayed:
+                    logger.info(f"Replayed {replayed} spooled writes, {len(keep)} left in {path.name}")
+                return False
+            os.unlink(path)
+            if replayed:
+                logger.info(f"Replayed {replayed} spooled writes ({path.name})")
+            return True
+        finally:
+            os.close(fd)
+
+    def _reject(self, record: Dict[str, Any], status: int, error: Any):
+        logger.warning(f"Spooled write refused for {record.get('id')} ({status}): {error}")
+        entry = {**record, "status": status, "error": error, "rejected_at": datetime.now().isoformat()}
+        with self._lock:
+            self._stats["rejected"] += 1
+            with open(self.rejected_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+
+    def _enforce_cap(self):
+        """Drop the oldest closed segments while the spool is over SPOOL_MAX_BYTES."""
+        files = []
+        for path in sorted(self.directory.iterdir()):
+            if path.suffix in (".open", ".seg"):
+                try:
+                    files.append((path, path.stat().st_size))
+                except FileNotFoundError:
+                    pass
+        total = sum(size for _, size in files)
+        for path, size in files:
+            if total <= self.config.max_bytes:
+                break
+            if path.suffix != ".seg":
+                continue
+            fd = self._claim(path)
+            if fd is None:
+                continue
+            try:
+                with open(path, "rb") as f:
+                    lines = sum(1 for _ in f)
+                os.unlink(path)
+                total -= size
+                with self._lock:
+                    self._stats["dropped"] += lines
+                logger.error(f"Spool over {self.config.max_bytes} bytes: dropped {lines} writes ({path.name})")
+            finally:
+                os.close(fd)
+
+    # ------------------------------------------------------------------
+    # Shutdown / metrics
+    # ------------------------------------------------------------------
+
+    def close(self):
+        """Hand the open segment over to the drainers and stop this one."""
+        with self._lock:
+            self._closing = True
+            now = time.time()
+            self._rotate(now)
+            self._settle(now, force=True)
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        s = self.stats
+        logger.info(
+            f"Spool closed: {s['appended']} appended, {s['acked']} acknowledged, {s['spooled']} spooled, "
+            f"{s['replayed']} replayed, {s['segments']} segments waiting (lag {s['lag_seconds']}s)"
+        )
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        oldest: Optional[float] = None
+        segments = 0
+        size = 0
+        for path in self.directory.iterdir():
+            if path.suffix not in (".open", ".seg"):
+                continue
+            try:
+                size += path.stat().st_size
+            except FileNotFoundError:
+                continue
+            if path.suffix == ".seg":
+                segments += 1
+                started = int(path.name.split("-", 1)[0]) / 1000
+                oldest = started if oldest is None else min(oldest, started)
+        with self._lock:
+            live = [s for s in (self._open, *self._closed) if s is not None]
+            in_flight = sum(len(s.pending) - len(s.failed) for s in live)
+            failed = [s.pending[n][0] for s in live for n in s.failed]
+            if failed:
+                oldest = min(failed) if oldest is None else min(oldest, *failed)
+            return {
+                **self._stats,
+                "in_flight": in_flight,
+                "waiting": len(failed),
+                "segments": segments,
+                "spool_bytes": size,
+                # Age of the oldest write waiting for a replay
+                "lag_seconds": round(now - oldest, 1) if oldest is not None else 0.0,
+                "drain_failures": self._failures,
+                "last_drain": datetime.fromtimestamp(self._last_drain).isoformat() if self._last_drain else None,
+            }
+
+
+# Skips the replay when the stored document is at least as recent (date_crawl
+# is a full ISO timestamp, see stamp_date_crawl: string order is time order),
+# else the first-seen upsert
+REPLAY_SCRIPT = f"""
+Object stored = ctx._source.date_crawl;
+Object replayed = params.doc.date_crawl;
+if (stored != null && replayed != null && stored.toString().compareTo(replayed.toString()) >= 0) {{
+    ctx.op = 'noop';
+}} else {{
+{KEEP_FIRST_SEEN_SCRIPT}
+}}
+""".strip()
+
+
+def stamp_date_crawl(data: Dict[str, Any]):
+    """
+    Set `date_crawl` to a full ISO timestamp (now when missing).
+
+    A date-only value ("2026-10-17") of today becomes the current time, so a
+    replay of the morning's write still loses to the afternoon's. Other dates
+    and datetimes are written out in full; unparseable strings are left as is.
+    """
+    value = data.get("date_crawl")
+    now = datetime.now()
+    if value in (None, ""):
+        data["date_crawl"] = now.isoformat()
+    elif isinstance(value, datetime):
+        data["date_crawl"] = value.isoformat()
+    elif isinstance(value, date):
+        data["date_crawl"] = (now if value == now.date() else datetime.combine(value, datetime.min.time())).isoformat()
+    elif isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value.strip())
+        except ValueError:
+            return
+        if len(value.strip()) == 10 and parsed.date() == now.date():
+            parsed = now    # Date only: crawled today
+        data["date_crawl"] = parsed.isoformat()
+
+
+def replay_action(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Bulk action replaying one spooled record without overwriting a newer write."""
+    doc = record["doc"]
+    if not doc.get("date_crawl"):
+        # Nothing to compare with: a plain write, like the original one
+        return bulk_action(record["index"], record["id"], doc)
+    return {
+        "_op_type": "update",
+        "_index": record["index"],
+        "_id": record["id"],
+        "script": {
+            "source": REPLAY_SCRIPT,
+            "lang": "painless",
+            "params": {"doc": doc, "keep": first_seen_fields(doc)},
+        },
+        "scripted_upsert": True,
+        "upsert": {},
+    }
+
+
+# ============================================================================
+# CONVENIENCE FUNCTIONS
+# ============================================================================
+
+# Process-wide spool (one open segment and one drainer per process)
+_spool: Optional[Spool] = None
+_spool_lock = threading.Lock()
+
+
+def get_spool() -> Spool:
+    """Get or open the process-wide spool."""
+    global _spool
+    with _spool_lock:
+        if _spool is None:
+            _spool = Spool()
+            # The drainer is a daemon: a plain exit still hands the open segment over
+            atexit.register(close_spool)
+        return _spool
+
+
+def close_spool():
+    """Close the process-wide spool (its unacknowledged records stay on disk)."""
+    global _spool
+    with _spool_lock:
+        spool, _spool = _spool, None
+    if spool is not None:
+        spool.close()
+
+
+def spool_document(data: Dict[str, Any], index_name: str = None, index: str = None) -> bool:
+    """
+    Spool one document for a process that can write to Elasticsearch.
+
+    Sites fall back to this when insert2db (the Elasticsearch client) cannot
+    be imported; same arguments as insert_data_to_es.
+    """
+    if index_name is None:
+        index_name = index
+    if index_name is None:
+        raise ValueError("Either 'index_name' or 'index' must be provided")
+    if not (get_scraper_config().save_to_elasticsearch and get_spool_config().enabled
+            and get_elasticsearch_config().is_configured):
+        logger.warning(f"Elasticsearch not available, data for '{index_name}' not saved")
+        return False
+
+    index_name = ES_INDICES.get(index_name, index_name)
+    stamp_date_crawl(data)
+    if data.get("prix_unit") == "DA" and index_name == "voiture":
+        data["export"] = "false"
+    doc_id = data.get("url") or data.get("numero") or f"{index_name}_{datetime.now().timestamp()}"
+
+    spool = get_spool()
+    ticket = spool.append(index_name, str(doc_id), data)
+    # Nothing in this process will write it: hand it to the drainers
+    spool.nack(ticket)
+    return ticket is not None
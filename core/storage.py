@@ -2,47 +2,132 @@
 Kloufi-Scrape Data Storage
 
 Unified data storage interface for both local testing and production.
-- Local: Saves to JSON files in junk_test/
-- Production: Saves to Elasticsearch
+- Local: Saves to rolling JSONL segments in junk_test/<category>/<site>/
+- Production: Saves to Elasticsearch (buffered into bulk requests with ES_BULK=true)
+
+Every Elasticsearch write is logged to the write-ahead spool first (SPOOL=true):
+a write that fails, or is made while the cluster is down, is replayed by the
+spool's drainer instead of being lost.
+
+With SKIP_UNCHANGED_WRITES=true a document whose content hash matches its
+last full write is not reindexed: it gets a batched `date_verif` touch.
+
+Coroutines await `save_async()` / `save_batch_async()`: with ES_ASYNC=true they
+index through an AsyncElasticsearch pool shared by every storage on the event
+loop, otherwise the blocking save runs in a worker thread.
+
+Storages, the bulk writer and the segment writers are shared by every site of
+the process. A site run flushes only its own writes:
+
+    with track_site_writes() as writes:
+        await run_site(...)
+        writes.flush()
 """
 
+import asyncio
+import contextvars
 import json
-import os
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, Optional, List
-import re
+from typing import Dict, Any, Optional, List, Set, Tuple
+import threading
+import weakref
 
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from config import (
+    get_async_elasticsearch_config,
     get_environment,
     get_data_path,
+    get_bulk_writer_config,
+    get_content_hash_config,
     get_elasticsearch_config,
     get_scraper_config,
+    get_spool_config,
     ES_INDICES,
     Environment,
 )
 from scraper.utils.logger import get_logger
+from core.content_hash import close_content_hash_caches, content_hash, get_content_hash_cache, ContentHashCache
+from core.first_seen import bulk_action, first_seen_fields, upsert_body
+from core.bulk_writer import close_bulk_writer, flush_bulk_writer, get_bulk_writer, BulkWriter
+from core.revisit import count_saved_item
+from core.segments import close_segment_writers, flush_segment_writer, flush_segment_writers, get_segment_writer
+from core.spool import close_spool, get_spool, stamp_date_crawl, Spool, Ticket
 
 logger = get_logger("storage")
 
 # Optional Elasticsearch import
 try:
-    from elasticsearch import Elasticsearch
+    from elasticsearch import AsyncElasticsearch, Elasticsearch
+    from elasticsearch.helpers import async_streaming_bulk, bulk as bulk_request
     ES_AVAILABLE = True
 except ImportError:
     ES_AVAILABLE = False
     logger.warning("Elasticsearch not installed. Install with: pip install elasticsearch")
 
 
+class SiteWrites:
+    """Writes made inside one `track_site_writes()` block (a site run)."""
+    
+    def __init__(self):
+        self.storages: Set["DataStorage"] = set()   # Storages with touches to send
+        self.directories: Set[Path] = set()         # JSONL segment directories written to
+        self._pending = 0                           # Documents in the bulk writer, not acknowledged yet
+        self._lock = threading.Lock()
+    
+    def _started(self):
+        with self._lock:
+            self._pending += 1
+    
+    def _done(self):
+        with self._lock:
+            self._pending -= 1
+    
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return self._pending
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until this block's buffered documents and touches are written (not other sites')."""
+        for storage in list(self.storages):
+            storage.flush_touches()
+        for directory in list(self.directories):
+            flush_segment_writer(directory)
+        return flush_bulk_writer(timeout, until=lambda: not self.pending)
+
+
+_current_writes: contextvars.ContextVar[Optional[SiteWrites]] = contextvars.ContextVar("site_writes", default=None)
+
+
+@contextmanager
+def track_site_writes():
+    """
+    Track what storage writes inside this block (and tasks / threads started from it).
+    
+    Re-entrant: a nested block shares the outer tracker.
+    """
+    current = _current_writes.get()
+    if current is not None:
+        yield current
+        return
+    writes = SiteWrites()
+    token = _current_writes.set(writes)
+    try:
+        yield writes
+    finally:
+        _current_writes.reset(token)
+
+
 class DataStorage:
     """
     Unified storage interface.
     
     Automatically routes data to the correct storage based on environment:
-    - LOCAL: JSON files in junk_test/
+    - LOCAL: JSONL segments in junk_test/
     - PRODUCTION/DOCKER: Elasticsearch
     """
     
@@ -61,10 +146,25 @@ class DataStorage:
         
         # Elasticsearch client (lazy init)
         self._es_client: Optional[Elasticsearch] = None
+        self.bulk = get_bulk_writer_config().enabled
+        
+        # Write-ahead spool: only useful with a cluster to replay into
+        self.spool_enabled = get_spool_config().enabled and get_elasticsearch_config().is_configured
+        
+        # Skip-unchanged writes: date_verif touches queued for one bulk request
+        hash_config = get_content_hash_config()
+        self.skip_unchanged = hash_config.enabled
+        self.touch_batch_size = hash_config.touch_batch_size
+        self._touches: List[Dict[str, Any]] = []
+        self._touch_lock = threading.Lock()
         
         # Stats
         self._items_saved = 0
+        self._items_new = 0
         self._errors = 0
+        self._writes_full = 0
+        self._writes_skipped = 0  # Unchanged documents only touched
+        self._stats_lock = threading.Lock()
     
     @property
     def es_client(self) -> Optional[Elasticsearch]:
@@ -93,6 +193,35 @@ class DataStorage:
         
         return self._es_client
     
+    @property
+    def bulk_writer(self) -> Optional[BulkWriter]:
+        """Process-wide bulk writer, when ES_BULK is on and Elasticsearch is available."""
+        if not self.bulk or not self.es_client:
+            return None
+        return get_bulk_writer(self.es_client)
+    
+    @property
+    def spool(self) -> Optional[Spool]:
+        """Process-wide write-ahead spool (None with SPOOL=false or without Elasticsearch settings)."""
+        return get_spool() if self.spool_enabled else None
+    
+    def _spool(self, index_name: str, doc_id: str, data: Dict[str, Any]) -> Optional[Ticket]:
+        """Log a full write to the spool before sending it."""
+        spool = self.spool
+        return spool.append(index_name, doc_id, data) if spool is not None else None
+    
+    def _settle(self, ticket: Optional[Ticket], ok: bool, doc_id: str):
+        """Acknowledge a spooled write, or leave it to the drainer."""
+        if ticket is None:
+            return
+        if ok:
+            self.spool.ack(ticket)
+            return
+        self.spool.nack(ticket)
+        if self.skip_unchanged:
+            # The replay writes this content: the next save must not compare with the old one
+            self.content_hashes.discard(doc_id)
+    
     def _get_index_name(self) -> str:
         """Get the Elasticsearch index name for this category."""
         return ES_INDICES.get(self.category, self.category)
@@ -109,24 +238,6 @@ class DataStorage:
         path.mkdir(parents=True, exist_ok=True)
         return path
     
-    def _generate_filename(self, data: Dict[str, Any]) -> str:
-        """Generate a unique filename for JSON storage."""
-        # Try to extract an identifier
-        identifier = "item"
-        
-        if data.get("numero"):
-            identifier = re.sub(r"[^0-9A-Za-z_-]", "", str(data["numero"]))[:64]
-        elif data.get("url"):
-            # Extract last part of URL
-            url_part = os.path.basename(data["url"].rstrip("/"))
-            if url_part:
-                identifier = re.sub(r"[^0-9A-Za-z_-]", "", url_part)[:64]
-        elif data.get("titre"):
-            identifier = re.sub(r"[^0-9A-Za-z_-]", "", data["titre"].replace(" ", "-"))[:64]
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-        return f"{timestamp}_{identifier}.json"
-    
     def _get_document_id(self, data: Dict[str, Any]) -> str:
         """Get the document ID for Elasticsearch."""
         # Use URL as primary ID
@@ -142,22 +253,25 @@ class DataStorage:
     # SAVE METHODS
     # ========================================================================
     
-    def save_to_json_file(self, data: Dict[str, Any]) -> bool:
-        """Save data to a JSON file."""
+    def save_to_json_file(self, data: Dict[str, Any]) -> Tuple[bool, bool, bool]:
+        """
+        Append data to the category/site's open JSONL segment (core/segments.py).
+        
+        Returns (ok, created, buffered); a line per save, so every item counts as new.
+        """
         try:
-            path = self._get_json_path()
-            filename = self._generate_filename(data)
-            filepath = path / filename
+            writer = get_segment_writer(self._get_json_path())
+            writer.write(data)
+            writes = _current_writes.get()
+            if writes is not None:
+                writes.directories.add(writer.directory)
             
-            with open(filepath, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            
-            logger.debug(f"Saved to JSON: {filepath}")
-            return True
+            logger.debug(f"Saved to JSONL segment: {writer.directory}")
+            return True, True, False
             
         except Exception as e:
             logger.error(f"JSON save error: {e}")
-            return False
+            return False, False, False
     
     def save_to_jsonl(self, data: Dict[str, Any], filename: Optional[str] = None) -> bool:
         """Append data to a JSONL file (one JSON object per line)."""
@@ -180,42 +294,67 @@ class DataStorage:
             logger.error(f"JSONL save error: {e}")
             return False
     
-    def save_to_elasticsearch(self, data: Dict[str, Any]) -> bool:
-        """Save data to Elasticsearch."""
+    def save_to_elasticsearch(self, data: Dict[str, Any]) -> Tuple[bool, bool, bool]:
+        """
+        Save data to Elasticsearch.
+        
+        Returns (ok, created, buffered): a buffered document is only counted
+        once the bulk writer acknowledges it. The outcome is returned rather
+        than kept on the instance, which concurrent saves share.
+        """
+        index_name = self._get_index_name()
+        doc_id = self._get_document_id(data)
+        
+        # Handle voiture export field
+        if data.get("prix_unit") == "DA" and index_name == "voiture":
+            data["export"] = "false"
+        
         if not self.es_client:
+            # Replayed by the spool drainer once the cluster is reachable
+            if self.spool_enabled:
+                self._settle(self._spool(index_name, doc_id, data), False, doc_id)
             logger.warning("Elasticsearch not available, skipping ES save")
-            return False
+            return False, False, False
         
+        ticket = None
         try:
-            index_name = self._get_index_name()
-            doc_id = self._get_document_id(data)
+            if self._is_unchanged(doc_id, data):
+                if self._touch(index_name, doc_id, data):
+                    self.flush_touches()
+                return True, False, False
             
-            # Handle special cases (like Krello date_depot preservation)
-            if data.get("site_origine") == "Krello.net":
-                try:
-                    existing = self.es_client.get(index=index_name, id=doc_id, ignore=[404])
-                    if existing.get("found") and existing["_source"].get("date_depot"):
-                        data["date_depot"] = existing["_source"]["date_depot"]
-                except Exception:
-                    pass
+            ticket = self._spool(index_name, doc_id, data)
+            writer = self.bulk_writer
+            if writer is not None:
+                # Acknowledged later, from the writer thread
+                self._buffer(
+                    writer,
+                    bulk_action(index_name, doc_id, dict(data)),
+                    self._bulk_callback(doc_id, data, ticket),
+                )
+                logger.debug(f"Buffered for ES [{index_name}]: {doc_id}")
+                return True, False, True
             
-            # Handle voiture export field
-            if data.get("prix_unit") == "DA" and index_name == "voiture":
-                data["export"] = "false"
-            
-            # Index the document
-            result = self.es_client.index(
-                index=index_name,
-                id=doc_id,
-                document=data,
-            )
+            # Index the document (an upsert keeping first-seen fields like Krello's date_depot)
+            fields = first_seen_fields(data)
+            if fields:
+                result = self.es_client.update(index=index_name, id=doc_id, **upsert_body(data, fields))
+            else:
+                result = self.es_client.index(
+                    index=index_name,
+                    id=doc_id,
+                    document=data,
+                )
             
-            logger.debug(f"Saved to ES [{index_name}]: {doc_id}")
-            return True
+            self._settle(ticket, True, doc_id)
+            self._written(doc_id, data)
+            logger.debug(f"Saved to ES [{index_name}]: {doc_id} ({result['result']})")
+            return True, result["result"] == "created", False
             
         except Exception as e:
             logger.error(f"Elasticsearch save error: {e}")
-            return False
+            self._settle(ticket, False, doc_id)
+            return False, False, False
     
     def save(self, data: Dict[str, Any]) -> bool:
         """
@@ -223,38 +362,155 @@ class DataStorage:
         
         This is the main method to use for storing scraped data.
         """
-        success = False
+        outcome = (False, False, False)
         
         # Add metadata
-        if "date_crawl" not in data:
-            data["date_crawl"] = datetime.now().isoformat()
+        stamp_date_crawl(data)
         
         # Save to JSON if configured
         if self.config.save_to_json:
-            if self.save_to_json_file(data):
-                success = True
+            outcome = self.save_to_json_file(data)
         
-        # Save to Elasticsearch if configured
+        # Save to Elasticsearch if configured (its outcome wins when it succeeds)
         if self.config.save_to_elasticsearch:
-            if self.save_to_elasticsearch(data):
-                success = True
+            es_outcome = self.save_to_elasticsearch(data)
+            if es_outcome[0] or not outcome[0]:
+                outcome = es_outcome
+        success, created, buffered = outcome
         
-        # Track stats
-        if success:
-            self._items_saved += 1
-        else:
+        # Track stats (buffered documents are counted once the bulk writer acknowledges them)
+        if success and not buffered:
+            self._record_result(True, created)
+        elif not success:
             self._errors += 1
-            # Fallback: always save to JSON on ES failure
-            if not self.config.save_to_json:
+            # Fallback without the spool (which replays failed writes itself)
+            if not self.config.save_to_json and not self.spool_enabled:
                 self.save_to_jsonl(data, "failed_items.jsonl")
         
         return success
     
+    def _record_result(self, ok: bool, created: bool):
+        with self._stats_lock:
+            if ok:
+                self._items_saved += 1
+                if created:
+                    self._items_new += 1
+            else:
+                self._errors += 1
+        if ok:
+            count_saved_item(created)
+    
+    def _bulk_callback(self, doc_id: str, data: Dict[str, Any], ticket: Optional[Ticket] = None):
+        """Outcome handler for one buffered document, run in the caller's context (revisit counter)."""
+        context = contextvars.copy_context()
+        
+        def on_done(ok: bool, created: bool):
+            context.run(self._record_result, ok, created)
+            self._settle(ticket, ok, doc_id)
+            if ok:
+                self._written(doc_id, data)
+            elif not self.config.save_to_json and not self.spool_enabled:
+                self.save_to_jsonl(data, "failed_items.jsonl")
+        
+        return on_done
+    
+    def _buffer(self, writer: BulkWriter, action: Dict[str, Any], on_done):
+        """Hand one action to the bulk writer, counted as pending by the current site run."""
+        writes = _current_writes.get()
+        if writes is None:
+            writer.add(action, on_done=on_done)
+            return
+        
+        def done(ok: bool, created: bool):
+            try:
+                on_done(ok, created)
+            finally:
+                writes._done()
+        
+        writes._started()
+        try:
+            writer.add(action, on_done=done)
+        except Exception:
+            writes._done()
+            raise
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until buffered documents and touches are written (True at once without bulk mode)."""
+        self.flush_touches()
+        return flush_bulk_writer(timeout)
+    
+    # ========================================================================
+    # SKIP-UNCHANGED WRITES
+    # ========================================================================
+    
+    @property
+    def content_hashes(self) -> ContentHashCache:
+        """Content hashes of the last full writes to this storage's index."""
+        return get_content_hash_cache(self._get_index_name())
+    
+    def _is_unchanged(self, doc_id: str, data: Dict[str, Any]) -> bool:
+        """Stamp the document's `_content_hash`; True if its last full write had the same content."""
+        if not self.skip_unchanged:
+            return False
+        data["_content_hash"] = content_hash(data)
+        return self.content_hashes.get(doc_id) == data["_content_hash"]
+    
+    def _written(self, doc_id: str, data: Dict[str, Any]):
+        """Count a full write and remember its content."""
+        with self._stats_lock:
+            self._writes_full += 1
+        if self.skip_unchanged and data.get("_content_hash"):
+            self.content_hashes.set(doc_id, data["_content_hash"])
+    
+    def _touch(self, index_name: str, doc_id: str, data: Dict[str, Any]) -> bool:
+        """
+        Queue a date_verif update for an unchanged document.
+        
+        Returns True when the queue is full and should be flushed.
+        """
+        action = {
+            "_op_type": "update",
+            "_index": index_name,
+            "_id": doc_id,
+            "doc": {"date_verif": data.get("date_verif") or datetime.now().isoformat()},
+        }
+        with self._stats_lock:
+            self._writes_skipped += 1
+        logger.debug(f"Unchanged in ES [{index_name}]: {doc_id} (touched)")
+        
+        writer = self.bulk_writer
+        if writer is not None:
+            # Batched with the other writes; a failed touch (document gone) means a full write next time
+            self._buffer(writer, action, lambda ok, created: ok or self.content_hashes.discard(doc_id))
+            return False
+        writes = _current_writes.get()
+        if writes is not None:
+            writes.storages.add(self)
+        with self._touch_lock:
+            self._touches.append(action)
+            return len(self._touches) >= self.touch_batch_size
+    
+    def flush_touches(self):
+        """Send the queued date_verif touches in one bulk request."""
+        with self._touch_lock:
+            actions, self._touches = self._touches, []
+        if not actions or not self.es_client:
+            return
+        try:
+            _, errors = bulk_request(self.es_client, actions, raise_on_error=False, raise_on_exception=False)
+            failed = {next(iter(error.values()), {}).get("_id") for error in errors}
+        except Exception as e:
+            logger.warning(f"date_verif touches failed: {e}")
+            failed = {action["_id"] for action in actions}
+        # Missing documents (or unsent touches) get a full write on their next save
+        for doc_id in failed:
+            self.content_hashes.discard(doc_id)
+    
     def save_batch(self, items: List[Dict[str, Any]]) -> Dict[str, int]:
         """
         Save multiple items.
         
-        Returns dict with success/failure counts.
+        Returns dict with success/failure counts (in bulk mode: buffered / refused).
         """
         success_count = 0
         error_count = 0
@@ -270,21 +526,199 @@ class DataStorage:
             "errors": error_count,
         }
     
+    # ========================================================================
+    # ASYNC SAVE METHODS
+    # ========================================================================
+    
+    @property
+    def use_async_es(self) -> bool:
+        """Whether coroutines index through the shared AsyncElasticsearch pool."""
+        return (
+            ES_AVAILABLE
+            and self.config.save_to_elasticsearch
+            and not self.bulk
+            and get_async_elasticsearch_config().enabled
+            and get_elasticsearch_config().is_configured
+        )
+    
+    async def save_to_elasticsearch_async(self, data: Dict[str, Any]) -> Tuple[bool, bool, bool]:
+        """Index one document without blocking the loop. Returns (ok, created, buffered) like the sync save."""
+        index_name = self._get_index_name()
+        doc_id = self._get_document_id(data)
+        
+        # Handle voiture export field
+        if data.get("prix_unit") == "DA" and index_name == "voiture":
+            data["export"] = "false"
+        
+        client = await get_async_es_client()
+        if client is None:
+            if self.spool_enabled:
+                self._settle(self._spool(index_name, doc_id, data), False, doc_id)
+            logger.warning("Elasticsearch not available, skipping ES save")
+            return False, False, False
+        
+        ticket = None
+        try:
+            if self._is_unchanged(doc_id, data):
+                if self._touch(index_name, doc_id, data):
+                    await asyncio.to_thread(self.flush_touches)
+                return True, False, False
+            
+            ticket = self._spool(index_name, doc_id, data)
+            # An upsert keeping first-seen fields (like Krello's date_depot), else a plain index
+            fields = first_seen_fields(data)
+            async with _async_request_slot():
+                if fields:
+                    result = await client.update(index=index_name, id=doc_id, **upsert_body(data, fields))
+                else:
+                    result = await client.index(index=index_name, id=doc_id, document=data)
+            
+            self._settle(ticket, True, doc_id)
+            self._written(doc_id, data)
+            logger.debug(f"Saved to ES [{index_name}]: {doc_id} ({result['result']})")
+            return True, result["result"] == "created", False
+            
+        except Exception as e:
+            logger.error(f"Elasticsearch save error: {e}")
+            self._settle(ticket, False, doc_id)
+            return False, False, False
+    
+    async def save_async(self, data: Dict[str, Any]) -> bool:
+        """
+        Awaitable `save()`.
+        
+        Indexes through AsyncElasticsearch when ES_ASYNC is on; otherwise the
+        blocking save (JSON files, the sync client or the bulk buffer) runs in a
+        worker thread, so concurrent coroutines keep running either way.
+        """
+        if not self.use_async_es:
+            return await asyncio.to_thread(self.save, data)
+        
+        stamp_date_crawl(data)
+        
+        outcome = (False, False, False)
+        if self.config.save_to_json:
+            outcome = await asyncio.to_thread(self.save_to_json_file, data)
+        
+        es_outcome = await self.save_to_elasticsearch_async(data)
+        if es_outcome[0] or not outcome[0]:
+            outcome = es_outcome
+        success, created, _ = outcome
+        if success:
+            # A JSON-only save counts like a file save: new
+            self._record_result(True, created)
+            return True
+        
+        self._record_result(False, False)
+        if not self.config.save_to_json and not self.spool_enabled:
+            await asyncio.to_thread(self.save_to_jsonl, data, "failed_items.jsonl")
+        return False
+    
+    async def save_batch_async(self, items: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Awaitable `save_batch()`: one bulk request stream through AsyncElasticsearch.
+        
+        Returns dict with success/failure counts.
+        """
+        if not self.use_async_es:
+            return await asyncio.to_thread(self.save_batch, items)
+        
+        client = await get_async_es_client()
+        index_name = self._get_index_name()
+        if client is None:
+            for data in items:
+                if self.spool_enabled:
+                    doc_id = self._get_document_id(data)
+                    self._settle(self._spool(index_name, doc_id, data), False, doc_id)
+            return {"success": 0, "errors": len(items)}
+        
+        actions = []
+        written: Dict[str, Dict[str, Any]] = {}     # Document ID -> fully written document
+        tickets: Dict[str, Optional[Ticket]] = {}   # Document ID -> its spool record
+        touched = 0
+        flush_touches = False
+        for data in items:
+            stamp_date_crawl(data)
+            if data.get("prix_unit") == "DA" and index_name == "voiture":
+                data["export"] = "false"
+            doc_id = self._get_document_id(data)
+            if self._is_unchanged(doc_id, data):
+                flush_touches = self._touch(index_name, doc_id, data) or flush_touches
+                self._record_result(True, False)
+                touched += 1
+                continue
+            tickets[doc_id] = self._spool(index_name, doc_id, data)
+            actions.append(bulk_action(index_name, doc_id, data))
+            written[doc_id] = data
+        if flush_touches:
+            await asyncio.to_thread(self.flush_touches)
+        
+        success_count = touched
+        error_count = 0
+        acknowledged = set()
+        try:
+            async with _async_request_slot():
+                async for ok, info in async_streaming_bulk(
+                    client, actions, raise_on_error=False, raise_on_exception=False, max_retries=2,
+                ):
+                    result = next(iter(info.values()), {})
+                    if ok:
+                        success_count += 1
+                        acknowledged.add(result.get("_id"))
+                        self._settle(tickets.get(result.get("_id")), True, result.get("_id"))
+                        self._record_result(True, result.get("result") == "created")
+                        self._written(result.get("_id"), written.get(result.get("_id"), {}))
+                    else:
+                        error_count += 1
+                        self._record_result(False, False)
+        except Exception as e:
+            logger.error(f"Elasticsearch bulk error: {e}")
+            with self._stats_lock:
+                self._errors += len(items) - success_count - error_count
+            error_count = len(items) - success_count
+        
+        # Everything the cluster did not acknowledge: replayed from the spool, or the JSONL fallback
+        for doc_id, data in written.items():
+            if doc_id in acknowledged:
+                continue
+            if self.spool_enabled:
+                self._settle(tickets.get(doc_id), False, doc_id)
+            elif not self.config.save_to_json:
+                await asyncio.to_thread(self.save_to_jsonl, data, "failed_items.jsonl")
+        
+        return {
+            "success": success_count,
+            "errors": error_count,
+        }
+    
     # ========================================================================
     # STATS
     # ========================================================================
     
     @property
-    def stats(self) -> Dict[str, int]:
+    def stats(self) -> Dict[str, Any]:
         """Get storage statistics."""
-        return {
+        stats = {
             "items_saved": self._items_saved,
+            "items_new": self._items_new,
             "errors": self._errors,
         }
+        if self.skip_unchanged:
+            writes = self._writes_full + self._writes_skipped
+            stats["writes_full"] = self._writes_full
+            stats["writes_skipped"] = self._writes_skipped
+            stats["write_avoidance_rate"] = round(self._writes_skipped / writes, 3) if writes else 0.0
+        writer = self.bulk_writer if self._es_client else None
+        if writer is not None:
+            stats["bulk"] = writer.stats
+        if self.spool_enabled:
+            stats["spool"] = self.spool.stats
+        return stats
     
     def reset_stats(self):
         """Reset statistics."""
         self._items_saved = 0
+        self._items_new = 0
         self._errors = 0
 
 
@@ -310,6 +744,76 @@ def save_item(category: str, data: Dict[str, Any], site_name: Optional[str] = No
     return storage.save(data)
 
 
+def flush_storages(timeout: Optional[float] = None) -> bool:
+    """Wait until every buffered document and touch is written (end of a site run)."""
+    for storage in list(_storage_cache.values()):
+        storage.flush_touches()
+    flush_segment_writers()
+    return flush_bulk_writer(timeout)
+
+
+def close_storages(timeout: Optional[float] = None):
+    """Flush buffered documents and touches, stop the bulk writer and the spool (shutdown)."""
+    for storage in list(_storage_cache.values()):
+        storage.flush_touches()
+    close_bulk_writer(timeout)
+    # After the bulk writer: its last acknowledgements settle the open segment
+    close_spool()
+    close_segment_writers()
+    close_content_hash_caches()
+
+
+# AsyncElasticsearch clients are bound to the event loop they were created on:
+# one pool (and request limit) per loop, shared by every storage of that loop
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+_async_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+async def get_async_es_client() -> Optional["AsyncElasticsearch"]:
+    """Get or create the AsyncElasticsearch client of the running event loop."""
+    if not ES_AVAILABLE:
+        return None
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        es_config = get_elasticsearch_config()
+        async_config = get_async_elasticsearch_config()
+        if not es_config.is_configured:
+            return None
+        try:
+            client = AsyncElasticsearch(
+                [es_config.host],
+                basic_auth=(es_config.username, es_config.password),
+                verify_certs=es_config.verify_certs,
+                connections_per_node=async_config.max_connections,
+                request_timeout=async_config.request_timeout,
+            )
+        except Exception as e:
+            logger.error(f"Elasticsearch connection error: {e}")
+            return None
+        _async_clients[loop] = client
+        logger.info(f"AsyncElasticsearch pool ready: {es_config.host} ({async_config.max_connections} connections)")
+    return client
+
+
+def _async_request_slot() -> asyncio.Semaphore:
+    """Request limit of the running loop: callers wait for a free connection."""
+    loop = asyncio.get_running_loop()
+    slot = _async_slots.get(loop)
+    if slot is None:
+        slot = _async_slots[loop] = asyncio.Semaphore(get_async_elasticsearch_config().max_connections)
+    return slot
+
+
+async def close_async_es_client():
+    """Close the AsyncElasticsearch client of the running event loop (before the loop ends)."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.pop(loop, None)
+    _async_slots.pop(loop, None)
+    if client is not None:
+        await client.close()
+
+
 # ============================================================================
 # TESTING
 # ============================================================================
@@ -3,8 +3,12 @@ Kloufi-Scrape Elasticsearch Insert Module
 
 Handles inserting scraped data into Elasticsearch.
 Updated to use centralized configuration and storage.
+
+Coroutines should await insert_data_to_es_async / bulk_insert_to_es_async:
+the sync versions block the event loop for every request.
 """
 
+import asyncio
 import os
 import sys
 from pathlib import Path
@@ -33,6 +37,18 @@ try:
 except ImportError:
     ES_AVAILABLE = False
 
+# First-seen fields (Krello's date_depot) are kept by a scripted upsert
+try:
+    from core.first_seen import bulk_action, first_seen_fields, upsert_body
+except ImportError:
+    first_seen_fields = None
+
+# date_crawl as a full ISO timestamp, like core storage writes it (spool replays compare it)
+try:
+    from core.spool import stamp_date_crawl
+except ImportError:
+    stamp_date_crawl = None
+
 # Configuration
 es_host = os.getenv('ELASTICSEARCH_HOST', 'http://192.168.9.222:9200')
 es_username = os.getenv('ELASTICSEARCH_USERNAME', 'elastic')
@@ -89,7 +105,11 @@ def insert_data_to_es(data: Dict[str, Any], index_name: str = None, index: str =
         except Exception as e:
             print(f"Core storage error, falling back: {e}")
     
-    # Fallback to direct Elasticsearch insert
+    return _insert_direct(data, index_name)
+
+
+def _insert_direct(data: Dict[str, Any], index_name: str) -> bool:
+    """Insert through the direct Elasticsearch client (the core storage fallback)."""
     es = get_es_client()
     if not es:
         print("Elasticsearch not available, data not saved")
@@ -99,24 +119,19 @@ def insert_data_to_es(data: Dict[str, Any], index_name: str = None, index: str =
         # Determine document ID
         doc_id = data.get('url') or data.get('numero') or None
         
-        # Handle special cases
-        if data.get("site_origine") == "Krello.net":
-            try:
-                existing = es.get(index=index_name, id=doc_id, ignore=[404])
-                if existing.get('found'):
-                    # Preserve existing date_depot
-                    if "date_depot" in existing["_source"]:
-                        data["date_depot"] = existing["_source"]["date_depot"]
-            except Exception:
-                pass
-        
         # Handle voiture export field
         if data.get("prix_unit") == "DA" and index_name == "voiture":
             data["export"] = "false"
+        if stamp_date_crawl:
+            stamp_date_crawl(data)
         
-        # Insert document
-        result = es.index(index=index_name, id=doc_id, document=data)
-        print(f"Data inserted to {index_name}: {result.get('result', 'unknown')}")
+        # Insert document (an upsert keeping first-seen fields like Krello's date_depot)
+        fields = first_seen_fields(data) if first_seen_fields else []
+        if fields:
+            result = es.update(index=index_name, id=doc_id, **upsert_body(data, fields))
+        else:
+            result = es.index(index=index_name, id=doc_id, document=data)
+        print(f"Data inserted to {index_name}: {result['result']}")
         return True
         
     except Exception as e:
@@ -124,6 +139,31 @@ def insert_data_to_es(data: Dict[str, Any], index_name: str = None, index: str =
         return False
 
 
+async def insert_data_to_es_async(data: Dict[str, Any], index_name: str = None, index: str = None) -> bool:
+    """
+    Awaitable insert_data_to_es (AsyncElasticsearch pool with ES_ASYNC=true).
+    
+    Args:
+        data: Dictionary of data to insert
+        index_name: Elasticsearch index name (category)
+        index: Alias for index_name (for backward compatibility)
+        
+    Returns:
+        True if successful, False otherwise
+    """
+    if index_name is None and index is not None:
+        index_name = index
+    elif index_name is None and index is None:
+        raise ValueError("Either 'index_name' or 'index' must be provided")
+    if USE_CORE_STORAGE:
+        try:
+            return await get_storage(index_name).save_async(data)
+        except Exception as e:
+            print(f"Core storage error, falling back: {e}")
+    # Not insert_data_to_es: core storage has already failed this document
+    return await asyncio.to_thread(_insert_direct, data, index_name)
+
+
 def bulk_insert_to_es(docs: list, index_name: str) -> bool:
     """
     Bulk insert a list of documents into Elasticsearch.
@@ -137,14 +177,17 @@ def bulk_insert_to_es(docs: list, index_name: str) -> bool:
     if not es:
         print("Elasticsearch not available, data not saved")
         return False
-    actions = [
-        {
-            "_index": index_name,
-            "_id": doc.get('url') or doc.get('numero'),
-            "_source": doc
-        }
-        for doc in docs
-    ]
+    if first_seen_fields:
+        actions = [bulk_action(index_name, doc.get('url') or doc.get('numero'), doc) for doc in docs]
+    else:
+        actions = [
+            {
+                "_index": index_name,
+                "_id": doc.get('url') or doc.get('numero'),
+                "_source": doc
+            }
+            for doc in docs
+        ]
     try:
         success, _ = bulk(es, actions)
         print(f"Bulk inserted {success} documents to {index_name}")
@@ -154,6 +197,25 @@ def bulk_insert_to_es(docs: list, index_name: str) -> bool:
         return False
 
 
+async def bulk_insert_to_es_async(docs: list, index_name: str) -> bool:
+    """
+    Awaitable bulk_insert_to_es (one bulk stream through AsyncElasticsearch with ES_ASYNC=true).
+    Args:
+        docs: List of dictionaries to insert
+        index_name: Elasticsearch index name
+    Returns:
+        True if every document was inserted, False otherwise
+    """
+    if USE_CORE_STORAGE:
+        try:
+            result = await get_storage(index_name).save_batch_async(docs)
+            print(f"Bulk inserted {result['success']} documents to {index_name}")
+            return not result["errors"]
+        except Exception as e:
+            print(f"Core storage error, falling back: {e}")
+    return await asyncio.to_thread(bulk_insert_to_es, docs, index_name)
+
+
 # Alias for backward compatibility
 insert_to_elasticsearch = insert_data_to_es
 
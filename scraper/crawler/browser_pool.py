@@ -0,0 +1,436 @@
+"""
+Kloufi-Scrape Browser Pool
+
+Process-wide pool of warm crawl4ai browsers shared by all site scrapers.
+
+Launching Chromium is the most expensive part of a detail fetch, so instead of
+opening a fresh `AsyncWebCrawler` per page, sites lease an already started
+crawler from this pool and hand it back when done:
+
+    async with lease_crawler(browser_config) as crawler:
+        result = await crawler.arun(url=url, config=run_config)
+
+Browsers are grouped by browser type + a fingerprint of the BrowserConfig
+(user agent, proxy, headless, ...), so two sites only share a browser when
+they would have launched an identical one anyway. A browser is recycled once
+it has served `max_pages_per_browser` leases, when its process tree grows past
+`max_memory_mb`, or when a lease ends with an exception.
+
+Idle browsers of every key are closed after `idle_timeout`, and at most
+`max_idle_browsers` are kept across all keys (least recently used closed
+first): randomized user agents / viewports make most keys single-use.
+"""
+
+import asyncio
+import hashlib
+import json
+import sys
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from config import get_browser_pool_config, BrowserPoolConfig
+from scraper.crawler.budget import get_resource_budget
+from scraper.crawler.html_archive import archive_page
+from scraper.crawler.interception import set_crawler_interception, clear_crawler_interception
+from scraper.crawler.replay import get_replay_backend, ReplayCrawler
+from scraper.utils.logger import get_logger
+
+logger = get_logger("browser_pool")
+
+try:
+    from crawl4ai import AsyncWebCrawler, BrowserConfig
+    CRAWL4AI_AVAILABLE = True
+except ImportError:
+    AsyncWebCrawler = None
+    BrowserConfig = None
+    CRAWL4AI_AVAILABLE = False
+
+# Optional: per-browser memory accounting
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+
+def config_fingerprint(browser_config: Any) -> str:
+    """
+    Build a stable pool key for a BrowserConfig.
+
+    Two configs with the same key launch interchangeable browsers.
+    """
+    if browser_config is None:
+        return "default"
+
+    if hasattr(browser_config, "to_dict"):
+        raw = browser_config.to_dict()
+    else:
+        raw = dict(vars(browser_config))
+
+    browser_type = raw.get("browser_type", "chromium")
+    digest = hashlib.sha1(
+        json.dumps(raw, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()[:12]
+    return f"{browser_type}:{digest}"
+
+
+@dataclass
+class PooledBrowser:
+    """A started crawler plus the bookkeeping needed to decide when to recycle it."""
+    crawler: Any
+    key: str
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    pages_served: int = 0
+    pids: Set[int] = field(default_factory=set)
+
+    def rss_mb(self) -> float:
+        """Resident memory of the browser process tree, in MB (0 if unknown)."""
+        if not PSUTIL_AVAILABLE or not self.pids:
+            return 0.0
+
+        total = 0
+        seen: Set[int] = set()
+        for pid in self.pids:
+            try:
+                root = psutil.Process(pid)
+                for proc in [root] + root.children(recursive=True):
+                    if proc.pid in seen:
+                        continue
+                    seen.add(proc.pid)
+                    total += proc.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return total / (1024 * 1024)
+
+
+class _KeyPool:
+    """Idle browsers and capacity accounting for a single pool key."""
+
+    def __init__(self, max_size: int):
+        self.idle: List[PooledBrowser] = []
+        self.in_use = 0
+        self.capacity = asyncio.Semaphore(max_size)
+
+
+class BrowserPool:
+    """
+    Keeps N warm browsers per (browser type, config fingerprint) and leases them out.
+
+    A lease is exclusive: the crawler is not handed to anyone else until it
+    is returned, so sites can keep using per-crawler state between pages.
+    """
+
+    def __init__(self, config: Optional[BrowserPoolConfig] = None):
+        self.config = config or get_browser_pool_config()
+        self._pools: Dict[str, _KeyPool] = {}
+        self._launch_lock = asyncio.Lock()
+        self._closed = False
+
+        # Crawlers are bound to the event loop that started them
+        try:
+            self.loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+        except RuntimeError:
+            self.loop = None
+
+        # Stats
+        self._launched = 0
+        self._recycled = 0
+        self._leases = 0
+
+    def _get_key_pool(self, key: str) -> _KeyPool:
+        if key not in self._pools:
+            self._pools[key] = _KeyPool(self.config.max_browsers_per_key)
+        return self._pools[key]
+
+    # ========================================================================
+    # BROWSER LIFECYCLE
+    # ========================================================================
+
+    async def _launch(self, key: str, browser_config: Any) -> PooledBrowser:
+        """Start a new crawler and remember which processes belong to it."""
+        if not CRAWL4AI_AVAILABLE:
+            raise RuntimeError("crawl4ai is not installed. Install with: pip install crawl4ai")
+
+        # Launches are serialized so new child processes can be attributed
+        # to the browser that spawned them.
+        async with self._launch_lock:
+            before = self._child_pids()
+            crawler = AsyncWebCrawler(config=browser_config)
+            await crawler.start()
+            pids = self._child_pids() - before
+
+        self._launched += 1
+        logger.debug(f"Launched browser for {key} (pids={sorted(pids)})")
+        return PooledBrowser(crawler=crawler, key=key, pids=pids)
+
+    async def _close_browser(self, browser: PooledBrowser, reason: str):
+        """Close a crawler, ignoring errors from an already dead browser."""
+        logger.debug(
+            f"Closing browser {browser.key} after {browser.pages_served} pages ({reason})"
+        )
+        try:
+            await browser.crawler.close()
+        except Exception as e:
+            logger.debug(f"Error closing browser {browser.key}: {e}")
+
+    @staticmethod
+    def _child_pids() -> Set[int]:
+        if not PSUTIL_AVAILABLE:
+            return set()
+        try:
+            return {p.pid for p in psutil.Process().children(recursive=False)}
+        except psutil.Error:
+            return set()
+
+    def _needs_recycle(self, browser: PooledBrowser) -> Optional[str]:
+        """Return the reason a browser must be recycled, or None to keep it."""
+        if browser.pages_served >= self.config.max_pages_per_browser:
+            return "page budget"
+        if self.config.max_memory_mb and browser.rss_mb() > self.config.max_memory_mb:
+            return "memory budget"
+        return None
+
+    async def _reap_idle(self):
+        """Close idle browsers of every key past the idle timeout, then the LRU ones past the idle cap."""
+        now = time.monotonic()
+        expired = []
+        for key_pool in self._pools.values():
+            expired += [b for b in key_pool.idle if now - b.last_used > self.config.idle_timeout]
+        idle = sorted(
+            (b for p in self._pools.values() for b in p.idle if b not in expired),
+            key=lambda b: b.last_used,
+        )
+        overflow = idle[:max(len(idle) - self.config.max_idle_browsers, 0)]
+        await self._evict(expired, "idle timeout")
+        await self._evict(overflow, "idle cap")
+
+    async def _evict(self, browsers: List[PooledBrowser], reason: str):
+        for browser in browsers:
+            key_pool = self._pools.get(browser.key)
+            if key_pool is not None and browser in key_pool.idle:
+                key_pool.idle.remove(browser)
+                self._recycled += 1
+                await self._close_browser(browser, reason)
+
+    async def close_idle(self) -> int:
+        """Close every idle browser (memory pressure). Returns how many were closed."""
+        idle = [b for p in self._pools.values() for b in p.idle]
+        await self._evict(idle, "memory pressure")
+        return len(idle)
+
+    # ========================================================================
+    # LEASING
+    # ========================================================================
+
+    @asynccontextmanager
+    async def lease(
+        self,
+        browser_config: Any = None,
+        site: Optional[str] = None,
+        interception: Optional[str] = None,
+        hooks: Optional[Dict[str, Callable]] = None,
+    ):
+        """
+        Lease a started crawler matching `browser_config`.
+
+        Waits when all browsers for this key are busy. The crawler is returned
+        to the pool on exit, or closed if it is over budget or the lease failed.
+        `site`/`interception` select the request interception profile and
+        `hooks` ({hook name: fn}) are set on the crawler strategy for the
+        duration of the lease.
+        """
+        if self._closed:
+            raise RuntimeError("Browser pool is closed")
+
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+
+        key = config_fingerprint(browser_config)
+        key_pool = self._get_key_pool(key)
+
+        await key_pool.capacity.acquire()
+        browser: Optional[PooledBrowser] = None
+        failed = False
+        try:
+            await self._reap_idle()
+            browser = key_pool.idle.pop() if key_pool.idle else None
+            if browser is None:
+                browser = await self._launch(key, browser_config)
+
+            key_pool.in_use += 1
+            self._leases += 1
+            set_crawler_interception(browser.crawler, interception, site)
+            _set_hooks(browser.crawler, hooks)
+            yield browser.crawler
+
+        except BaseException:
+            failed = True
+            raise
+
+        finally:
+            if browser is not None:
+                clear_crawler_interception(browser.crawler)
+                _set_hooks(browser.crawler, dict.fromkeys(hooks or {}))
+                key_pool.in_use -= 1
+                browser.pages_served += 1
+                browser.last_used = time.monotonic()
+
+                reason = "lease failed" if failed else self._needs_recycle(browser)
+                if reason or self._closed:
+                    self._recycled += 1
+                    await self._close_browser(browser, reason or "pool closed")
+                else:
+                    key_pool.idle.append(browser)
+            key_pool.capacity.release()
+            if not self._closed:
+                await self._reap_idle()
+
+    async def close(self):
+        """Close every idle browser. Leased browsers are closed when returned."""
+        self._closed = True
+        for key_pool in self._pools.values():
+            for browser in key_pool.idle:
+                await self._close_browser(browser, "pool closed")
+            key_pool.idle = []
+        logger.info(f"Browser pool closed: {self.stats}")
+
+    # ========================================================================
+    # STATS
+    # ========================================================================
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Get pool statistics."""
+        return {
+            "keys": len(self._pools),
+            "idle": sum(len(p.idle) for p in self._pools.values()),
+            "in_use": sum(p.in_use for p in self._pools.values()),
+            "launched": self._launched,
+            "recycled": self._recycled,
+            "leases": self._leases,
+        }
+
+
+# ============================================================================
+# CONVENIENCE FUNCTIONS
+# ============================================================================
+
+# Process-wide pool instance
+_browser_pool: Optional[BrowserPool] = None
+
+
+def get_browser_pool() -> BrowserPool:
+    """Get or create the process-wide browser pool."""
+    global _browser_pool
+    if (
+        _browser_pool is None
+        or _browser_pool._closed
+        or (_browser_pool.loop is not None and _browser_pool.loop.is_closed())
+    ):
+        _browser_pool = BrowserPool()
+    return _browser_pool
+
+
+def _set_hooks(crawler: Any, hooks: Optional[Dict[str, Callable]]):
+    """Set (or, with None values, clear) crawl4ai strategy hooks."""
+    for name, fn in (hooks or {}).items():
+        try:
+            crawler.crawler_strategy.set_hook(name, fn)
+        except Exception as e:
+            logger.debug(f"Could not set hook {name}: {e}")
+
+
+def lease_crawler(
+    browser_config: Any = None,
+    site: Optional[str] = None,
+    interception: Optional[str] = None,
+    hooks: Optional[Dict[str, Callable]] = None,
+):
+    """
+    Async context manager yielding a started crawler for `browser_config`.
+
+    Drop-in replacement for `AsyncWebCrawler(config=browser_config)`. A fresh
+    crawler is used instead when the pool is disabled (BROWSER_POOL_ENABLED=false)
+    or when called from another event loop than the pool's (legacy sites that
+    call `asyncio.run()` per item from an executor thread).
+
+    `site` ("category/site") picks the site's request interception profile;
+    `interception` names one explicitly (see scraper/crawler/interception.py).
+    `hooks` maps crawl4ai hook names to callables for this lease only.
+
+    In replay mode (FETCH_REPLAY) a ReplayCrawler serving recorded pages is
+    returned instead and no browser is started.
+
+    Every lease holds a slot of the global browser budget (MAX_BROWSERS), and
+    the pages its `arun()` fetches go to the HTML archive (HTML_ARCHIVE_ENABLED).
+    """
+    replay = get_replay_backend()
+    if replay.enabled:
+        return _budgeted(ReplayCrawler(replay), archive=False)
+
+    pool = get_browser_pool()
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    if not pool.config.enabled or (pool.loop is not None and loop is not pool.loop):
+        crawler = AsyncWebCrawler(config=browser_config)
+        set_crawler_interception(crawler, interception, site)
+        _set_hooks(crawler, hooks)
+        return _budgeted(crawler, site=site)
+    return _budgeted(pool.lease(browser_config, site=site, interception=interception, hooks=hooks), site=site)
+
+
+class _ArchivingCrawler:
+    """A leased crawler whose successful pages are archived (everything else is delegated)."""
+
+    def __init__(self, crawler: Any, site: Optional[str]):
+        self._crawler = crawler
+        self._site = site
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._crawler, name)
+
+    async def arun(self, url: str, *args, **kwargs):
+        result = await self._crawler.arun(url, *args, **kwargs)
+        html = getattr(result, "html", None)
+        if getattr(result, "success", False) and isinstance(html, str):
+            archive_page(url, html, site=self._site, status=getattr(result, "status_code", None))
+        return result
+
+
+@asynccontextmanager
+async def _budgeted(crawler_cm, site: Optional[str] = None, archive: bool = True):
+    async with get_resource_budget().browser(relieve=close_idle_browsers):
+        async with crawler_cm as crawler:
+            yield _ArchivingCrawler(crawler, site) if archive else crawler
+
+
+async def close_idle_browsers() -> int:
+    """Close the pool's idle browsers (over the memory budget). Returns how many were closed."""
+    pool = _browser_pool
+    if pool is None or pool._closed:
+        return 0
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return 0
+    # Browsers of the pool belong to its loop
+    if pool.loop is not None and loop is not pool.loop:
+        return 0
+    return await pool.close_idle()
+
+
+async def close_browser_pool():
+    """Close the process-wide browser pool (called on dispatcher shutdown)."""
+    global _browser_pool
+    if _browser_pool is not None:
+        await _browser_pool.close()
+        _browser_pool = None
@@ -0,0 +1,229 @@
+"""
+Kloufi-Scrape Resource Budget
+
+Process-wide limits shared by everything that scrapes concurrently
+(categories running in parallel, sites inside a category, detail workers):
+
+- max_browsers:          browser leases in use at the same time
+- max_inflight_requests: page fetches (HTTP tier, Proxyium) in flight
+- max_rss_mb:            resident memory of the process tree (Chromium
+                         included); new browser leases close the pool's idle
+                         browsers, then wait while above it
+
+    budget = get_resource_budget()
+    async with budget.browser():
+        ...
+    await budget.wait_for_memory(shutdown_event)
+
+`lease_crawler()` and the tiered fetcher take their slots automatically.
+Slots are re-entrant per task: a task that already holds a slot does not
+wait for a second one, so nested leases cannot deadlock the budget. Tasks
+spawned inside a lease take slots of their own. A limit of 0 means unlimited.
+
+`request_shutdown()` (called by the dispatcher) releases every memory wait,
+including those of leases that have no shutdown event of their own.
+
+The limiter is thread-safe and not bound to an event loop, because legacy
+sites run their own loops in executor threads.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from config import get_budget_config, BudgetConfig
+from scraper.utils.logger import get_logger
+
+logger = get_logger("budget")
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+
+class Slots:
+    """Counting limiter usable from any thread / event loop."""
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self.in_use = 0
+        self.peak = 0
+        self.waits = 0
+        self._lock = threading.Lock()
+        # Slots held per task (re-entrancy); tasks are unique across loops / threads
+        self._held: Dict[asyncio.Task, int] = {}
+
+    def held(self) -> bool:
+        """True if the current task already holds a slot."""
+        task = asyncio.current_task()
+        with self._lock:
+            return task is not None and task in self._held
+
+    def _try_take(self, force: bool = False) -> bool:
+        with self._lock:
+            if not force and self.limit and self.in_use >= self.limit:
+                return False
+            self.in_use += 1
+            self.peak = max(self.peak, self.in_use)
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_use = max(self.in_use - 1, 0)
+
+    @asynccontextmanager
+    async def hold(self):
+        """Hold one slot (waits while the limit is reached, unless re-entrant)."""
+        task = asyncio.current_task()
+        if not self._try_take(force=self.held()):
+            self.waits += 1
+            while not self._try_take():
+                await asyncio.sleep(self.POLL_INTERVAL)
+        if task is not None:
+            with self._lock:
+                self._held[task] = self._held.get(task, 0) + 1
+        try:
+            yield
+        finally:
+            if task is not None:
+                with self._lock:
+                    self._held[task] -= 1
+                    if not self._held[task]:
+                        del self._held[task]
+            self.release()
+
+
+class ResourceBudget:
+    """Global browser / request / memory budget."""
+
+    RSS_SAMPLE_INTERVAL = 2.0
+
+    def __init__(self, config: Optional[BudgetConfig] = None):
+        self.config = config or get_budget_config()
+        self.browsers = Slots("browsers", self.config.max_browsers)
+        self.requests = Slots("requests", self.config.max_inflight_requests)
+        self._rss_mb = 0.0
+        self._rss_sampled_at = 0.0
+        self.peak_rss_mb = 0.0
+        self.memory_waits = 0
+        # Thread-safe: memory waits run in several event loops
+        self._shutdown = threading.Event()
+
+    def request_shutdown(self):
+        """Stop every memory wait (leases then proceed and their callers wind down)."""
+        self._shutdown.set()
+
+    def rss_mb(self) -> float:
+        """RSS of this process and all its children (sampled every few seconds)."""
+        if not PSUTIL_AVAILABLE:
+            return 0.0
+        now = time.monotonic()
+        if now - self._rss_sampled_at < self.RSS_SAMPLE_INTERVAL:
+            return self._rss_mb
+        self._rss_sampled_at = now
+        try:
+            proc = psutil.Process(os.getpid())
+            total = proc.memory_info().rss
+            for child in proc.children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    pass
+            self._rss_mb = total / (1024 * 1024)
+            self.peak_rss_mb = max(self.peak_rss_mb, self._rss_mb)
+        except Exception as e:
+            logger.debug(f"Could not read RSS: {e}")
+        return self._rss_mb
+
+    def over_memory(self) -> bool:
+        return bool(self.config.max_rss_mb) and self.rss_mb() > self.config.max_rss_mb
+
+    async def wait_for_memory(
+        self,
+        shutdown_event: Optional[asyncio.Event] = None,
+        poll: float = 5.0,
+        relieve: Optional[Callable[[], Awaitable[int]]] = None,
+    ) -> bool:
+        """
+        Wait until RSS is under budget. Returns False if shutdown was requested meanwhile.
+
+        `relieve` frees memory (e.g. closes idle browsers) and returns how much
+        it released; it is called before each wait.
+        """
+        if not self.over_memory():
+            return True
+        self.memory_waits += 1
+        logger.info(f"RSS {self.rss_mb():.0f} MB over budget ({self.config.max_rss_mb} MB), waiting")
+        while self.over_memory():
+            if self._shutdown.is_set() or (shutdown_event is not None and shutdown_event.is_set()):
+                return False
+            if relieve is not None:
+                try:
+                    if await relieve():
+                        # Sample again now instead of reusing the pre-release RSS
+                        self._rss_sampled_at = 0.0
+                        continue
+                except Exception as e:
+                    logger.debug(f"Memory relief failed: {e}")
+            await asyncio.sleep(poll)
+        return True
+
+    @asynccontextmanager
+    async def browser(
+        self,
+        shutdown_event: Optional[asyncio.Event] = None,
+        relieve: Optional[Callable[[], Awaitable[int]]] = None,
+    ):
+        """One browser lease (also waits for memory headroom when starting a new one)."""
+        if not self.browsers.held():
+            await self.wait_for_memory(shutdown_event, poll=1.0, relieve=relieve)
+        async with self.browsers.hold():
+            yield
+
+    @asynccontextmanager
+    async def request(self):
+        """One in-flight page fetch."""
+        async with self.requests.hold():
+            yield
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "browsers_in_use": self.browsers.in_use,
+            "browsers_peak": self.browsers.peak,
+            "browser_waits": self.browsers.waits,
+            "requests_in_flight": self.requests.in_use,
+            "requests_peak": self.requests.peak,
+            "request_waits": self.requests.waits,
+            "rss_mb": round(self.rss_mb(), 0),
+            "rss_peak_mb": round(self.peak_rss_mb, 0),
+            "memory_waits": self.memory_waits,
+        }
+
+
+# ============================================================================
+# CONVENIENCE FUNCTIONS
+# ============================================================================
+
+# Process-wide budget instance
+_budget: Optional[ResourceBudget] = None
+
+
+def get_resource_budget() -> ResourceBudget:
+    """Get or create the process-wide resource budget."""
+    global _budget
+    if _budget is None:
+        _budget = ResourceBudget()
+    return _budget
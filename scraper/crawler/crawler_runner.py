@@ -1,27 +1,35 @@
-from crawl4ai import AsyncWebCrawler, CrawlerRunConfig
+from crawl4ai import BrowserConfig, CrawlerRunConfig
+from scraper.crawler.browser_pool import lease_crawler
 from scraper.detection.captcha_detector import has_captcha
 
+def _browser_config(proxy, context, headless):
+    """Translate a fingerprint context (see scraper.browser.fingerprint) into a BrowserConfig."""
+    context = context or {}
+    options = {"headless": headless, "proxy": proxy}
+    if context.get("user_agent"):
+        options["user_agent"] = context["user_agent"]
+    if context.get("viewport"):
+        options["viewport_width"] = context["viewport"]["width"]
+        options["viewport_height"] = context["viewport"]["height"]
+    return BrowserConfig(**options)
+
 async def crawl(url, proxy, context, config=None, headless=True):
-    async with AsyncWebCrawler(
-        proxy=proxy,
-        browser_context=context,
-        headless=headless
-    ) as crawler:
+    # Browsers are leased from the shared pool instead of launched per page
+    async with lease_crawler(_browser_config(proxy, context, headless)) as crawler:
         # Use simple delay - this worked reliably before
         if config is None:
             config = CrawlerRunConfig(
                 delay_before_return_html=15.0  # 15 seconds for content to load
             )
-        
+
         result = await crawler.arun(
-            url=url, 
-            config=config, 
+            url=url,
+            config=config,
             magic=True,
             timeout=120000
         )
-        
+
         html = result.html
         if await has_captcha(html):
             raise Exception("CAPTCHA detected")
         return result
-
@@ -0,0 +1,299 @@
+"""
+Kloufi-Scrape HTML Archive
+
+Content-addressed store for raw fetched pages, so pages can be re-parsed
+offline (after a selector fix) without re-crawling the sites.
+
+Layout (data/archive/):
+
+    objects/3f/3fa9...c1.html.zst   one compressed file per distinct page body
+    index.jsonl                     url -> hash, site, time (a line per new body)
+
+A page is keyed by the SHA-256 of its HTML, so identical bodies (re-visits of
+unchanged listings, the same error page on many URLs) are stored once. The
+index is append-only; the latest line for a URL wins.
+
+Archiving is done by the fetch path when HTML_ARCHIVE_ENABLED=true: every
+successful `arun()` of a `lease_crawler()` crawler, the HTTP tier of the
+tiered fetcher and the Proxyium gateway. Pages fetched without a site key
+are filed under the site run in progress (`current_site`, set by the
+category runner):
+
+    archive = get_html_archive()
+    archive.put(url, html, site="immobilier/essekna", status=200)
+
+and pages are read back with:
+
+    html = archive.get(url)
+    for entry, html in archive.pages(site="immobilier/essekna"):
+        ...
+
+CLI:
+
+    python scraper/crawler/html_archive.py stats
+    python scraper/crawler/html_archive.py ls --site immobilier/essekna
+    python scraper/crawler/html_archive.py cat https://...
+    python scraper/crawler/html_archive.py export --site immobilier/essekna out_dir/
+
+zstd (`zstandard` package) is used when installed, gzip otherwise.
+"""
+
+import contextvars
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from config import get_archive_config, get_archive_path, ArchiveConfig
+from scraper.utils.logger import get_logger
+
+logger = get_logger("html_archive")
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+
+# "category/site" of the site run in progress, for pages fetched without a site key
+current_site: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("archive_site", default=None)
+
+ZSTD_SUFFIX = ".html.zst"
+GZIP_SUFFIX = ".html.gz"
+
+
+@dataclass
+class ArchiveEntry:
+    """One index line: a fetch of `url` that returned the body `hash`."""
+    url: str
+    hash: str
+    site: Optional[str] = None
+    status: Optional[int] = None
+    fetched_at: float = 0.0
+    size: int = 0                       # Uncompressed bytes
+
+
+def url_to_filename(url: str) -> str:
+    """Filesystem-safe name for a URL (used by `export` and replay fixture dirs)."""
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", url.split("://", 1)[-1])[:150] + ".html"
+
+
+class HtmlArchive:
+    """Hash-keyed compressed page store with a URL index."""
+
+    def __init__(self, directory: Optional[Path] = None, config: Optional[ArchiveConfig] = None):
+        self.config = config or get_archive_config()
+        self.directory = Path(directory) if directory else get_archive_path()
+        self.objects_dir = self.directory / "objects"
+        self.index_path = self.directory / "index.jsonl"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+
+        self._index: Optional[Dict[str, ArchiveEntry]] = None
+        self._compressor = zstandard.ZstdCompressor(level=self.config.compression_level) if ZSTD_AVAILABLE else None
+        self._decompressor = zstandard.ZstdDecompressor() if ZSTD_AVAILABLE else None
+        self._stats = {"pages": 0, "stored": 0, "deduplicated": 0, "bytes_in": 0, "bytes_written": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.enabled
+
+    # ------------------------------------------------------------------
+    # Objects
+    # ------------------------------------------------------------------
+
+    def _object_path(self, digest: str, suffix: str) -> Path:
+        return self.objects_dir / digest[:2] / f"{digest}{suffix}"
+
+    def _find_object(self, digest: str) -> Optional[Path]:
+        for suffix in (ZSTD_SUFFIX, GZIP_SUFFIX):
+            path = self._object_path(digest, suffix)
+            if path.exists():
+                return path
+        return None
+
+    def _write_object(self, digest: str, data: bytes) -> int:
+        if self._compressor is not None:
+            path, payload = self._object_path(digest, ZSTD_SUFFIX), self._compressor.compress(data)
+        else:
+            path, payload = self._object_path(digest, GZIP_SUFFIX), gzip.compress(data, compresslevel=6)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + f".{os.getpid()}.tmp")
+        tmp_path.write_bytes(payload)
+        os.replace(tmp_path, path)
+        return len(payload)
+
+    def read_object(self, digest: str) -> Optional[str]:
+        """HTML for a content hash, or None if it is not archived."""
+        path = self._find_object(digest)
+        if path is None:
+            return None
+        payload = path.read_bytes()
+        if path.name.endswith(ZSTD_SUFFIX):
+            if self._decompressor is None:
+                raise RuntimeError(f"{path.name} needs the zstandard package")
+            data = self._decompressor.decompress(payload)
+        else:
+            data = gzip.decompress(payload)
+        return data.decode("utf-8")
+
+    # ------------------------------------------------------------------
+    # Index
+    # ------------------------------------------------------------------
+
+    @property
+    def index(self) -> Dict[str, ArchiveEntry]:
+        """Latest entry per URL (loaded from index.jsonl on first use)."""
+        if self._index is None:
+            self._index = {}
+            if self.index_path.exists():
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            entry = ArchiveEntry(**json.loads(line))
+                        except (ValueError, TypeError):
+                            continue        # Torn last line after a crash
+                        self._index[entry.url] = entry
+        return self._index
+
+    def _append_index(self, entry: ArchiveEntry):
+        line = json.dumps(asdict(entry), ensure_ascii=False) + "\n"
+        # One write() per line on an O_APPEND file: safe with several writer processes
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(line)
+        self.index[entry.url] = entry
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def put(self, url: str, html: str, site: Optional[str] = None, status: Optional[int] = None) -> Optional[str]:
+        """Archive one fetched page. Returns its content hash."""
+        if not html:
+            return None
+        data = html.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        self._stats["pages"] += 1
+        self._stats["bytes_in"] += len(data)
+        try:
+            if self._find_object(digest) is None:
+                self._stats["bytes_written"] += self._write_object(digest, data)
+                self._stats["stored"] += 1
+            else:
+                self._stats["deduplicated"] += 1
+
+            previous = self.index.get(url)
+            if previous is None or previous.hash != digest:
+                self._append_index(ArchiveEntry(
+                    url=url, hash=digest, site=site, status=status,
+                    fetched_at=time.time(), size=len(data),
+                ))
+        except OSError as e:
+            logger.warning(f"Could not archive {url}: {e}")
+            return None
+        return digest
+
+    def get(self, url: str) -> Optional[str]:
+        """Latest archived HTML for `url`."""
+        entry = self.index.get(url)
+        return self.read_object(entry.hash) if entry else None
+
+    def entries(self, site: Optional[str] = None) -> Iterator[ArchiveEntry]:
+        for entry in list(self.index.values()):
+            if site is None or entry.site == site:
+                yield entry
+
+    def pages(self, site: Optional[str] = None) -> Iterator[Tuple[ArchiveEntry, str]]:
+        """(entry, html) for every archived URL, optionally for one "category/site"."""
+        for entry in self.entries(site):
+            html = self.read_object(entry.hash)
+            if html is not None:
+                yield entry, html
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "compression": "zstd" if ZSTD_AVAILABLE else "gzip",
+            "ratio": round(self._stats["bytes_in"] / self._stats["bytes_written"], 1) if self._stats["bytes_written"] else 0.0,
+        }
+
+
+# ============================================================================
+# CONVENIENCE FUNCTIONS
+# ============================================================================
+
+# Process-wide archive instance
+_archive: Optional[HtmlArchive] = None
+
+
+def get_html_archive() -> HtmlArchive:
+    """Get or create the process-wide HTML archive."""
+    global _archive
+    if _archive is None:
+        _archive = HtmlArchive()
+    return _archive
+
+
+def archive_page(url: str, html: str, site: Optional[str] = None, status: Optional[int] = None) -> Optional[str]:
+    """Archive a fetched page if HTML_ARCHIVE_ENABLED (no-op otherwise)."""
+    archive = get_html_archive()
+    if not archive.enabled:
+        return None
+    return archive.put(url, html, site=site or current_site.get(), status=status)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Raw HTML archive")
+    parser.add_argument("--dir", help="Archive directory (default: data/archive)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Count URLs, objects and disk usage")
+    ls_parser = sub.add_parser("ls", help="List archived URLs")
+    ls_parser.add_argument("--site", help='"category/site"')
+    cat_parser = sub.add_parser("cat", help="Print the archived HTML of a URL")
+    cat_parser.add_argument("url")
+    export_parser = sub.add_parser("export", help="Write archived pages as plain .html files")
+    export_parser.add_argument("out_dir")
+    export_parser.add_argument("--site", help='"category/site"')
+    args = parser.parse_args()
+
+    archive = HtmlArchive(directory=Path(args.dir) if args.dir else None)
+
+    if args.command == "stats":
+        objects = [p for p in archive.objects_dir.rglob("*") if p.is_file()]
+        sites: Dict[str, int] = {}
+        for entry in archive.entries():
+            sites[entry.site or "unknown"] = sites.get(entry.site or "unknown", 0) + 1
+        print(f"URLs:    {len(archive.index)}")
+        print(f"Objects: {len(objects)} ({sum(p.stat().st_size for p in objects) / 1_048_576:.1f} MB on disk)")
+        for site, count in sorted(sites.items()):
+            print(f"  {site:<35} {count}")
+    elif args.command == "ls":
+        for entry in archive.entries(args.site):
+            print(f"{entry.hash[:12]}  {entry.site or '-':<30} {entry.url}")
+    elif args.command == "cat":
+        html = archive.get(args.url)
+        if html is None:
+            sys.exit(f"Not archived: {args.url}")
+        print(html)
+    elif args.command == "export":
+        out_dir = Path(args.out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        manifest: Dict[str, str] = {}
+        for entry, html in archive.pages(args.site):
+            name = url_to_filename(entry.url)
+            (out_dir / name).write_text(html, encoding="utf-8")
+            manifest[entry.url] = name
+        # URL -> file map, so the directory can be used as a replay fixture set
+        (out_dir / "manifest.json").write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Exported {len(manifest)} pages to {out_dir}")
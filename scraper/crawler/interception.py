@@ -0,0 +1,256 @@
+"""
+Kloufi-Scrape Request Interception
+
+Named resource-blocking profiles for browser fetches. Extractors only need the
+HTML text and image *URLs*, so downloading image bytes, fonts or video over a
+(proxied) connection is wasted time and bandwidth.
+
+Profiles:
+
+- allow-all: nothing is blocked (historical behaviour)
+- no-media:  images, media and fonts are aborted; CSS/JS still load
+- text-only: no-media + stylesheets + known ad/analytics hosts
+
+A profile can be applied to a raw Playwright page or context:
+
+    await apply_interception(page, "no-media", site="immobilier/ouedkniss")
+
+or selected for a crawl4ai crawler leased from the browser pool:
+
+    async with lease_crawler(browser_config, site="voiture/djcar") as crawler:
+        ...
+
+Every aborted request is counted per site, together with an estimate of the
+bytes it would have downloaded (see `interception_stats()`).
+"""
+
+import re
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from config import get_browser_pool_config
+from scraper.utils.logger import get_logger
+
+logger = get_logger("interception")
+
+
+# ============================================================================
+# PROFILES
+# ============================================================================
+
+# Typical transfer size per Playwright resource type, used to estimate the
+# bandwidth saved by an aborted request (the real size is never downloaded).
+ESTIMATED_RESOURCE_BYTES: Dict[str, int] = {
+    "image": 60_000,
+    "media": 500_000,
+    "font": 40_000,
+    "stylesheet": 30_000,
+    "script": 50_000,
+    "other": 5_000,
+}
+
+# Ad / analytics hosts that never carry listing data
+TRACKER_PATTERN = (
+    r"(google-analytics\.com|googletagmanager\.com|doubleclick\.net|googlesyndication\.com"
+    r"|facebook\.net|connect\.facebook|hotjar\.com|clarity\.ms|adservice\.google)"
+)
+
+
+@dataclass(frozen=True)
+class InterceptionProfile:
+    """Resource types and URL patterns to abort."""
+    name: str
+    blocked_types: FrozenSet[str] = frozenset()
+    blocked_url_pattern: Optional[str] = None   # Regex matched against request URLs
+
+    @property
+    def blocks_anything(self) -> bool:
+        return bool(self.blocked_types or self.blocked_url_pattern)
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        if resource_type in self.blocked_types:
+            return True
+        if self.blocked_url_pattern and _compiled(self.blocked_url_pattern).search(url):
+            return True
+        return False
+
+
+INTERCEPTION_PROFILES: Dict[str, InterceptionProfile] = {
+    "allow-all": InterceptionProfile("allow-all"),
+    "no-media": InterceptionProfile(
+        "no-media",
+        blocked_types=frozenset({"image", "media", "font"}),
+    ),
+    "text-only": InterceptionProfile(
+        "text-only",
+        blocked_types=frozenset({"image", "media", "font", "stylesheet"}),
+        blocked_url_pattern=TRACKER_PATTERN,
+    ),
+}
+
+# Default profile per "category/site" (sites not listed use the configured
+# default, BROWSER_INTERCEPTION_PROFILE). Only sites whose parsers read image
+# URLs from attributes and do not rely on layout belong here.
+SITE_INTERCEPTION: Dict[str, str] = {
+    "immobilier/essekna": "text-only",
+    "immobilier/residencedz": "text-only",
+    "immobilier/ouedkniss": "no-media",
+    "voiture/cardias": "text-only",
+    "voiture/djcar": "text-only",
+    "voiture/algerieannonces": "text-only",
+}
+
+_pattern_cache: Dict[str, "re.Pattern"] = {}
+
+
+def _compiled(pattern: str) -> "re.Pattern":
+    if pattern not in _pattern_cache:
+        _pattern_cache[pattern] = re.compile(pattern, re.IGNORECASE)
+    return _pattern_cache[pattern]
+
+
+def resolve_profile(profile: Any = None, site: Optional[str] = None) -> InterceptionProfile:
+    """
+    Resolve a profile from an explicit name/profile, the site's default, or
+    the configured default - in that order. Unknown names fall back to allow-all.
+    """
+    if isinstance(profile, InterceptionProfile):
+        return profile
+    name = profile or SITE_INTERCEPTION.get(site or "") or get_browser_pool_config().interception_profile
+    resolved = INTERCEPTION_PROFILES.get(name)
+    if resolved is None:
+        logger.warning(f"Unknown interception profile '{name}', using allow-all")
+        resolved = INTERCEPTION_PROFILES["allow-all"]
+    return resolved
+
+
+# ============================================================================
+# STATS
+# ============================================================================
+
+@dataclass
+class InterceptionStats:
+    """Requests aborted for one site."""
+    requests_blocked: int = 0
+    requests_allowed: int = 0
+    bytes_saved_estimate: int = 0
+    blocked_by_type: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, resource_type: str, blocked: bool):
+        if not blocked:
+            self.requests_allowed += 1
+            return
+        self.requests_blocked += 1
+        self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+        self.bytes_saved_estimate += ESTIMATED_RESOURCE_BYTES.get(resource_type, ESTIMATED_RESOURCE_BYTES["other"])
+
+
+_stats: Dict[str, InterceptionStats] = {}
+
+
+def get_site_stats(site: Optional[str]) -> InterceptionStats:
+    key = site or "unknown"
+    if key not in _stats:
+        _stats[key] = InterceptionStats()
+    return _stats[key]
+
+
+def interception_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-site blocking counters."""
+    return {
+        site: {
+            "requests_blocked": s.requests_blocked,
+            "requests_allowed": s.requests_allowed,
+            "mb_saved_estimate": round(s.bytes_saved_estimate / 1_048_576, 2),
+            "blocked_by_type": dict(s.blocked_by_type),
+        }
+        for site, s in _stats.items()
+    }
+
+
+# ============================================================================
+# APPLYING PROFILES
+# ============================================================================
+
+def _make_handler(profile: InterceptionProfile, site: Optional[str]):
+    stats = get_site_stats(site)
+
+    async def _handle(route, request):
+        resource_type = request.resource_type
+        blocked = profile.should_block(resource_type, request.url)
+        stats.record(resource_type, blocked)
+        try:
+            if blocked:
+                await route.abort()
+            else:
+                await route.continue_()
+        except Exception:
+            # Page closed or request already handled
+            pass
+
+    return _handle
+
+
+async def apply_interception(target: Any, profile: Any = None, site: Optional[str] = None) -> InterceptionProfile:
+    """
+    Route all requests of a Playwright page or context through `profile`.
+
+    Safe to call repeatedly on the same target: the first profile sticks.
+    Returns the profile actually in effect.
+    """
+    resolved = resolve_profile(profile, site)
+    current = getattr(target, "_kloufi_interception", None)
+    if current is not None:
+        return current
+    if resolved.blocks_anything:
+        await target.route("**/*", _make_handler(resolved, site))
+    try:
+        target._kloufi_interception = resolved
+    except Exception:
+        pass
+    return resolved
+
+
+def crawl4ai_hook(profile: Any = None, site: Optional[str] = None):
+    """
+    Build an `on_page_context_created` hook for a crawl4ai crawler strategy.
+
+    Returns None when the resolved profile blocks nothing, so callers can skip
+    installing a hook at all.
+    """
+    resolved = resolve_profile(profile, site)
+    if not resolved.blocks_anything:
+        return None
+
+    async def on_page_context_created(page, context=None, **kwargs):
+        await apply_interception(page, resolved, site)
+        return page
+
+    return on_page_context_created
+
+
+def set_crawler_interception(crawler: Any, profile: Any = None, site: Optional[str] = None) -> bool:
+    """Install the interception hook for `profile`/`site` on a crawl4ai crawler."""
+    strategy = getattr(crawler, "crawler_strategy", None)
+    if strategy is None or not hasattr(strategy, "set_hook"):
+        return False
+    try:
+        strategy.set_hook("on_page_context_created", crawl4ai_hook(profile, site))
+        return True
+    except Exception as e:
+        logger.debug(f"Could not set interception hook: {e}")
+        return False
+
+
+def clear_crawler_interception(crawler: Any):
+    """Remove the interception hook (pooled crawlers are shared across sites)."""
+    strategy = getattr(crawler, "crawler_strategy", None)
+    if strategy is not None and hasattr(strategy, "set_hook"):
+        try:
+            strategy.set_hook("on_page_context_created", None)
+        except Exception:
+            pass
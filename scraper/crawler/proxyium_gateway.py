@@ -0,0 +1,321 @@
+"""
+Kloufi-Scrape Proxyium Gateway
+
+A long-lived Proxyium session for fetching detail pages through the
+proxyium.com web proxy. Launching a browser, loading proxyium.com and
+waiting for `networkidle` on every URL costs more than the page itself, so
+a gateway keeps one warmed browser page open and submits URLs through it
+back-to-back:
+
+    gateway = get_proxyium_gateway("HOT", wait_for="div.v-card-text.__description")
+    result = await gateway.fetch("https://www.ouedkniss.com/...-d48254269")
+    if result.success:
+        parse(result.html)
+    print(f"{result.elapsed:.1f}s via {result.via}")
+
+Once the first URL of an origin went through the form, following URLs of
+the same origin are opened directly on the proxied host (no form round
+trip). The gateway is restarted only after `max_failures` consecutive
+failures (or after `max_urls_per_session` URLs, to bound memory growth).
+
+One gateway per worker: a gateway serializes its fetches on a single page.
+"""
+
+import asyncio
+import base64
+import statistics
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Deque, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from config import get_proxyium_config, ProxyiumConfig
+from scraper.crawler.budget import get_resource_budget
+from scraper.crawler.html_archive import archive_page
+from scraper.crawler.interception import apply_interception
+from scraper.crawler.replay import get_replay_backend
+from scraper.detection.captcha_detector import has_captcha
+from scraper.utils.logger import get_logger
+
+logger = get_logger("proxyium_gateway")
+
+try:
+    from playwright.async_api import async_playwright
+    PLAYWRIGHT_AVAILABLE = True
+except ImportError:
+    PLAYWRIGHT_AVAILABLE = False
+
+try:
+    from playwright_stealth import Stealth
+except ImportError:
+    Stealth = None
+
+
+# Query parameter Proxyium (CroxyProxy engine) uses to carry the proxied origin
+ORIGIN_PARAM = "__cpo"
+
+
+@dataclass
+class GatewayResult:
+    """Outcome of one URL fetched through the gateway."""
+    url: str
+    html: str = ""
+    success: bool = False
+    elapsed: float = 0.0
+    via: str = ""                       # "direct" or "form"
+    error: Optional[str] = None
+
+
+def _origin(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+def _decode_origin(value: str) -> Optional[str]:
+    try:
+        return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)).decode("utf-8").rstrip("/")
+    except Exception:
+        return None
+
+
+class ProxyiumGateway:
+    """One warmed Proxyium browser page, reused for every URL of a worker."""
+
+    def __init__(
+        self,
+        name: str = "default",
+        wait_for: Optional[str] = None,
+        setup_js: Optional[str] = None,
+        site: Optional[str] = None,
+        config: Optional[ProxyiumConfig] = None,
+    ):
+        self.name = name
+        self.wait_for = wait_for            # Selector proving the proxied page rendered
+        self.setup_js = setup_js            # Evaluated once per session on the first proxied page
+        self.site = site
+        self.config = config or get_proxyium_config()
+
+        self._lock = asyncio.Lock()
+        self._playwright_cm = None
+        self._playwright = None
+        self._browser = None
+        self._page = None
+        self._proxied_hosts: Dict[str, str] = {}    # origin -> "https://eu1.proxyium.com" style host
+        self._origin_tokens: Dict[str, str] = {}    # origin -> __cpo value
+        self._setup_done = False
+        self._session_urls = 0
+        self._consecutive_failures = 0
+
+        self._latencies: Deque[float] = deque(maxlen=500)
+        self._stats = {"urls": 0, "succeeded": 0, "failed": 0, "direct": 0, "form": 0, "restarts": 0}
+
+    # ------------------------------------------------------------------
+    # Session lifecycle
+    # ------------------------------------------------------------------
+
+    @property
+    def started(self) -> bool:
+        return self._page is not None and not self._page.is_closed()
+
+    async def start(self):
+        if self.started:
+            return
+        if not PLAYWRIGHT_AVAILABLE:
+            raise RuntimeError("playwright is not installed")
+
+        start = time.monotonic()
+        self._playwright_cm = async_playwright()
+        if Stealth:
+            self._playwright_cm = Stealth().use_async(self._playwright_cm)
+        self._playwright = await self._playwright_cm.__aenter__()
+        self._browser = await self._playwright.chromium.launch(
+            headless=True,
+            args=["--disable-blink-features=AutomationControlled", "--no-sandbox"],
+        )
+        context = await self._browser.new_context(viewport={"width": 1920, "height": 1080})
+        if self.site:
+            await apply_interception(context, site=self.site)
+        self._page = await context.new_page()
+        await self._page.goto(self.config.url, wait_until="domcontentloaded",
+                              timeout=self.config.navigation_timeout * 1000)
+        self._setup_done = False
+        self._session_urls = 0
+        logger.info(f"[{self.name}] Proxyium session ready in {time.monotonic() - start:.1f}s")
+
+    async def close(self):
+        browser, playwright_cm = self._browser, self._playwright_cm
+        self._browser = self._page = self._playwright = self._playwright_cm = None
+        self._proxied_hosts.clear()
+        self._origin_tokens.clear()
+        if browser is not None:
+            try:
+                await browser.close()
+            except Exception:
+                pass
+        if playwright_cm is not None:
+            try:
+                await playwright_cm.__aexit__(None, None, None)
+            except Exception:
+                pass
+
+    async def restart(self, reason: str):
+        logger.info(f"[{self.name}] Restarting Proxyium session: {reason}")
+        self._stats["restarts"] += 1
+        await self.close()
+        await self.start()
+
+    # ------------------------------------------------------------------
+    # Navigation
+    # ------------------------------------------------------------------
+
+    def _direct_url(self, url: str) -> Optional[str]:
+        """Proxied URL for `url` when its origin already went through the form."""
+        origin = _origin(url)
+        host = self._proxied_hosts.get(origin)
+        token = self._origin_tokens.get(origin)
+        if not host or not token:
+            return None
+        parsed = urlparse(url)
+        query = parse_qsl(parsed.query, keep_blank_values=True) + [(ORIGIN_PARAM, token)]
+        return urlunparse(urlparse(host)._replace(path=parsed.path or "/", query=urlencode(query)))
+
+    def _learn(self, url: str):
+        """Remember how Proxyium rewrote `url`'s origin (from the current page URL)."""
+        current = urlparse(self._page.url)
+        token = dict(parse_qsl(current.query)).get(ORIGIN_PARAM)
+        if token and _decode_origin(token) == _origin(url):
+            self._proxied_hosts[_origin(url)] = f"{current.scheme}://{current.netloc}"
+            self._origin_tokens[_origin(url)] = token
+
+    async def _submit_form(self, url: str):
+        timeout = self.config.navigation_timeout * 1000
+        if urlparse(self._page.url).netloc != urlparse(self.config.url).netloc:
+            await self._page.goto(self.config.url, wait_until="domcontentloaded", timeout=timeout)
+        await self._page.fill('input[name="url"]', url)
+        async with self._page.expect_navigation(wait_until="domcontentloaded", timeout=timeout):
+            await self._page.click("button#btn-go")
+        self._learn(url)
+
+    async def _wait_rendered(self):
+        if self.wait_for:
+            await self._page.wait_for_selector(self.wait_for, timeout=self.config.navigation_timeout * 1000)
+
+    async def _load(self, url: str) -> str:
+        """Navigate to `url` through the proxy; returns how ("direct" / "form")."""
+        direct = self._direct_url(url)
+        if direct:
+            try:
+                await self._page.goto(direct, wait_until="domcontentloaded",
+                                      timeout=self.config.navigation_timeout * 1000)
+                await self._wait_rendered()
+                return "direct"
+            except Exception as e:
+                # Proxied host rotated or the token expired: go through the form again
+                logger.debug(f"[{self.name}] Direct proxied navigation failed ({e}), using the form")
+                self._proxied_hosts.pop(_origin(url), None)
+
+        await self._submit_form(url)
+        if self.setup_js and not self._setup_done:
+            await self._page.evaluate(self.setup_js)
+            await self._page.reload(wait_until="domcontentloaded")
+            self._setup_done = True
+        await self._wait_rendered()
+        return "form"
+
+    async def fetch(self, url: str) -> GatewayResult:
+        """Fetch one URL through the warmed session."""
+        replay = get_replay_backend()
+        if replay.enabled:
+            page = await replay.fetch(url)
+            return GatewayResult(url=url, html=page.html, success=page.success, via="replay",
+                                 error=page.error_message)
+
+        async with self._lock, get_resource_budget().request():
+            start = time.monotonic()
+            result = GatewayResult(url=url)
+            self._stats["urls"] += 1
+            try:
+                if self._session_urls >= self.config.max_urls_per_session:
+                    await self.restart(f"{self._session_urls} URLs served")
+                elif not self.started:
+                    await self.start()
+                self._session_urls += 1
+
+                result.via = await self._load(url)
+                result.html = await self._page.content()
+                if await has_captcha(result.html):
+                    raise RuntimeError("captcha on proxied page")
+                result.success = True
+                archive_page(url, result.html, site=self.site)
+            except Exception as e:
+                result.error = str(e)
+
+            result.elapsed = time.monotonic() - start
+            await self._record(result)
+            return result
+
+    async def _record(self, result: GatewayResult):
+        if result.success:
+            self._consecutive_failures = 0
+            self._stats["succeeded"] += 1
+            self._stats[result.via] += 1
+            self._latencies.append(result.elapsed)
+            logger.debug(f"[{self.name}] {result.url} in {result.elapsed:.1f}s ({result.via})")
+            return
+
+        self._stats["failed"] += 1
+        self._consecutive_failures += 1
+        logger.warning(f"[{self.name}] Proxyium fetch failed for {result.url}: {result.error}")
+        if self._consecutive_failures >= self.config.max_failures or not self.started:
+            # Next fetch starts a fresh session
+            self._consecutive_failures = 0
+            self._stats["restarts"] += 1
+            await self.close()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+        return {
+            **self._stats,
+            "latency_mean": round(statistics.mean(latencies), 2) if latencies else 0.0,
+            "latency_p50": round(latencies[len(latencies) // 2], 2) if latencies else 0.0,
+            "latency_p95": round(latencies[int(len(latencies) * 0.95) - 1], 2) if latencies else 0.0,
+        }
+
+
+# ============================================================================
+# CONVENIENCE FUNCTIONS
+# ============================================================================
+
+# One gateway per worker name
+_gateways: Dict[str, ProxyiumGateway] = {}
+
+
+def get_proxyium_gateway(worker: str = "default", **kwargs) -> ProxyiumGateway:
+    """
+    Get or create the gateway for `worker`.
+
+    Keyword arguments (wait_for, setup_js, site) only apply on creation.
+    """
+    gateway = _gateways.get(worker)
+    if gateway is None:
+        gateway = ProxyiumGateway(name=worker, **kwargs)
+        _gateways[worker] = gateway
+    return gateway
+
+
+def proxyium_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-worker gateway counters and latencies."""
+    return {name: gateway.stats for name, gateway in _gateways.items()}
+
+
+async def close_proxyium_gateways():
+    """Close every gateway browser."""
+    for gateway in list(_gateways.values()):
+        await gateway.close()
+    _gateways.clear()
@@ -0,0 +1,188 @@
+"""
+Kloufi-Scrape Page Readiness
+
+Decides when a page is "done" from per-site signals instead of a fixed
+`delay_before_return_html` sleep:
+
+- selector:     a required CSS selector is present
+- network idle: no resource finished loading for `network_idle_ms`
+- DOM stable:   no DOM mutation for `dom_stable_ms`
+- JSON payload: a fetch/XHR response whose URL matches `json_url_pattern` arrived
+
+Every profile also has a hard cap (`max_wait`, measured from navigation start)
+after which the page is returned as-is, so a missing signal never costs more
+than the old fixed delay.
+
+All signals are evaluated by a single JS predicate, so the same profile works
+with crawl4ai (`wait_for="js:..."`) and with raw Playwright pages
+(`page.wait_for_function`):
+
+    config = CrawlerRunConfig(
+        cache_mode=CacheMode.BYPASS,
+        **readiness_kwargs("voiture", "tonobiles", "detail", fallback_delay=10),
+    )
+"""
+
+import json
+import time
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from scraper.utils.logger import get_logger
+
+logger = get_logger("readiness")
+
+
+@dataclass
+class ReadinessProfile:
+    """Signals that mark a page as ready, plus a hard cap."""
+    selector: Optional[str] = None          # CSS selector that must be present
+    network_idle_ms: Optional[int] = None   # No resource finished for this long
+    dom_stable_ms: Optional[int] = None     # No DOM mutation for this long
+    json_url_pattern: Optional[str] = None  # Regex matched against fetch/XHR URLs
+    max_wait: float = 15.0                  # Hard cap (seconds since navigation start)
+    min_wait: float = 0.0                   # Never return before this (seconds)
+    mode: str = "all"                       # "all" signals or "any" signal
+
+    def to_js_predicate(self) -> str:
+        """Build the JS predicate that returns true once the page is ready."""
+        checks = []
+        if self.selector:
+            checks.append(f"!!document.querySelector({json.dumps(self.selector)})")
+        if self.network_idle_ms:
+            checks.append(
+                f"(document.readyState !== 'loading' && now - lastResource >= {int(self.network_idle_ms)})"
+            )
+        if self.dom_stable_ms:
+            checks.append(f"(now - st.lastMutation >= {int(self.dom_stable_ms)})")
+        if self.json_url_pattern:
+            checks.append(
+                "entries.some(e => (e.initiatorType === 'fetch' || e.initiatorType === 'xmlhttprequest')"
+                f" && e.responseEnd > 0 && new RegExp({json.dumps(self.json_url_pattern)}).test(e.name))"
+            )
+        if not checks:
+            checks.append("document.readyState === 'complete'")
+
+        joiner = " && " if self.mode == "all" else " || "
+        return f"""() => {{
+    const st = window.__kloufiReady || (window.__kloufiReady = (() => {{
+        const s = {{ lastMutation: performance.now(), capped: false }};
+        try {{ performance.setResourceTimingBufferSize(10000); }} catch (e) {{}}
+        new MutationObserver(() => {{ s.lastMutation = performance.now(); }})
+            .observe(document.documentElement, {{ childList: true, subtree: true, attributes: true, characterData: true }});
+        return s;
+    }})());
+    const now = performance.now();
+    if (now >= {int(self.max_wait * 1000)}) {{ st.capped = true; return true; }}
+    if (now < {int(self.min_wait * 1000)}) return false;
+    const entries = performance.getEntriesByType('resource');
+    const lastResource = entries.reduce((m, e) => Math.max(m, e.responseEnd), 0);
+    return {joiner.join(checks)};
+}}"""
+
+    def run_config_kwargs(self) -> Dict[str, Any]:
+        """CrawlerRunConfig keyword arguments implementing this profile."""
+        return {
+            "wait_for": f"js:{self.to_js_predicate()}",
+            # The predicate caps itself; the timeout only guards against a dead page
+            "wait_for_timeout": int((self.max_wait + 10) * 1000),
+            "delay_before_return_html": 0.1,
+        }
+
+
+@dataclass
+class ReadinessResult:
+    """Outcome of waiting for a page."""
+    elapsed: float
+    capped: bool
+
+
+async def wait_until_ready(page: Any, profile: ReadinessProfile) -> ReadinessResult:
+    """
+    Wait on a Playwright page until `profile` says it is ready.
+
+    Never raises on timeout: a capped wait returns with `capped=True`.
+    """
+    start = time.monotonic()
+    capped = False
+    try:
+        await page.wait_for_function(
+            profile.to_js_predicate(),
+            polling=100,
+            timeout=(profile.max_wait + 10) * 1000,
+        )
+        capped = await page.evaluate(
+            "() => !!(window.__kloufiReady && window.__kloufiReady.capped)"
+        )
+    except Exception as e:
+        logger.debug(f"Readiness wait ended early: {e}")
+        capped = True
+
+    result = ReadinessResult(elapsed=time.monotonic() - start, capped=capped)
+    if result.capped:
+        logger.debug(f"Page hit readiness cap after {result.elapsed:.1f}s")
+    return result
+
+
+# ============================================================================
+# SITE PROFILES
+# ============================================================================
+
+# Keyed by "category/site/page" where page is "listing" or "detail".
+# Sites without a profile keep their historical fixed delay.
+READINESS_PROFILES: Dict[str, ReadinessProfile] = {
+    # Infinite-scroll loader: ready once articles stop being appended
+    # (the loader itself gives up after ~3 rounds of 3.8s without growth)
+    "immobilier/krello/listing": ReadinessProfile(
+        selector="article a[href^='/listing-details/']",
+        dom_stable_ms=12000,
+        max_wait=90,
+    ),
+    "electromenager/webstar-electro/listing": ReadinessProfile(
+        selector="div.produit_logo_small > a, div.card-body > h3.produit_titre > a, div.card.box_offre a[href*='store=']",
+        network_idle_ms=1500,
+        max_wait=40,
+    ),
+    "voiture/tonobiles/detail": ReadinessProfile(
+        selector="h1.vehica-car-name",
+        dom_stable_ms=1000,
+        max_wait=10,
+    ),
+}
+
+
+def get_readiness_profile(category: str, site: str, page: str = "detail") -> Optional[ReadinessProfile]:
+    """Get the registered readiness profile for a site page, if any."""
+    return READINESS_PROFILES.get(f"{category}/{site}/{page}")
+
+
+def get_site_profiles(category: str, site: str) -> Dict[str, ReadinessProfile]:
+    """Get all registered profiles for a site, keyed by page kind."""
+    prefix = f"{category}/{site}/"
+    return {
+        key[len(prefix):]: profile
+        for key, profile in READINESS_PROFILES.items()
+        if key.startswith(prefix)
+    }
+
+
+def readiness_kwargs(
+    category: str,
+    site: str,
+    page: str = "detail",
+    fallback_delay: float = 5.0,
+) -> Dict[str, Any]:
+    """
+    CrawlerRunConfig kwargs for a site page.
+
+    Uses the registered profile when there is one, otherwise the site's old
+    fixed `delay_before_return_html`.
+    """
+    profile = get_readiness_profile(category, site, page)
+    if profile is None:
+        return {"delay_before_return_html": fallback_delay}
+    return profile.run_config_kwargs()
@@ -0,0 +1,223 @@
+"""
+Kloufi-Scrape Replay Backend
+
+Offline fetching: serves recorded pages instead of hitting live sites, so the
+whole dispatcher -> category -> site -> storage path can run on one machine
+with repeatable throughput numbers.
+
+Enable it with FETCH_REPLAY (or `--replay` on core/dispatcher.py):
+
+    FETCH_REPLAY=archive            # pages from the raw HTML archive (data/archive)
+    FETCH_REPLAY=tests/fixtures/    # a fixture directory
+    REPLAY_LATENCY_MS=300           # simulated network latency per page
+    REPLAY_JITTER_MS=100
+
+A fixture directory holds one .html file per page plus a `manifest.json`
+mapping URL -> file name (`html_archive.py export` writes exactly that).
+Without a manifest, files are matched by `url_to_filename(url)`.
+
+While replay is enabled:
+- `lease_crawler()` yields a ReplayCrawler (same `arun()` API as crawl4ai)
+- the tiered fetcher and the Proxyium gateway serve from the backend
+- a URL missing from the source comes back as a failed 404 result
+
+Raw Playwright sessions (Ouedkniss listing browsing) are not replayed.
+"""
+
+import asyncio
+import json
+import random
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import urldefrag
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from config import get_replay_config, ReplayConfig
+from scraper.crawler.html_archive import HtmlArchive, url_to_filename
+from scraper.utils.logger import get_logger
+
+logger = get_logger("replay")
+
+try:
+    from crawl4ai.models import CrawlResult
+    CRAWL4AI_AVAILABLE = True
+except ImportError:
+    CrawlResult = None
+    CRAWL4AI_AVAILABLE = False
+
+
+@dataclass
+class ReplayPage:
+    """A page served by the replay backend."""
+    url: str
+    html: str = ""
+    status_code: int = 200
+    success: bool = True
+    error_message: Optional[str] = None
+
+
+def _url_variants(url: str):
+    """Lookup keys for a URL: as given, without fragment, with/without trailing slash."""
+    base = urldefrag(url)[0]
+    yield url
+    yield base
+    yield base[:-1] if base.endswith("/") else base + "/"
+
+
+class ReplayBackend:
+    """Serves recorded pages from the archive or a fixture directory."""
+
+    def __init__(self, config: Optional[ReplayConfig] = None):
+        self.config = config or get_replay_config()
+        self._archive: Optional[HtmlArchive] = None
+        self._fixture_dir: Optional[Path] = None
+        self._manifest: Dict[str, str] = {}
+        self._started_at: Optional[float] = None
+        self._stats = {"hits": 0, "misses": 0, "bytes_served": 0}
+
+        if self.config.source == "archive":
+            self._archive = HtmlArchive()
+        elif self.config.source:
+            self._fixture_dir = Path(self.config.source)
+            manifest_path = self._fixture_dir / "manifest.json"
+            if manifest_path.exists():
+                self._manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+            elif not self._fixture_dir.is_dir():
+                logger.error(f"Replay fixture directory not found: {self._fixture_dir}")
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.enabled
+
+    def lookup(self, url: str) -> Optional[str]:
+        """Recorded HTML for `url`, or None."""
+        for key in _url_variants(url):
+            if self._archive is not None:
+                html = self._archive.get(key)
+            else:
+                name = self._manifest.get(key) or url_to_filename(key)
+                path = self._fixture_dir / name
+                html = path.read_text(encoding="utf-8") if path.is_file() else None
+            if html is not None:
+                return html
+        return None
+
+    async def _simulate_latency(self):
+        latency = self.config.latency_ms
+        if self.config.jitter_ms:
+            latency = random.uniform(latency - self.config.jitter_ms, latency + self.config.jitter_ms)
+        if latency > 0:
+            await asyncio.sleep(latency / 1000)
+
+    async def fetch(self, url: str) -> ReplayPage:
+        """Serve `url` after the configured latency."""
+        if self._started_at is None:
+            self._started_at = time.monotonic()
+        await self._simulate_latency()
+
+        html = self.lookup(url)
+        if html is None:
+            self._stats["misses"] += 1
+            logger.debug(f"Replay miss: {url}")
+            return ReplayPage(url=url, status_code=404, success=False,
+                              error_message=f"Not in replay source: {url}")
+
+        self._stats["hits"] += 1
+        self._stats["bytes_served"] += len(html)
+        return ReplayPage(url=url, html=html)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        served = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "source": self.config.source,
+            "elapsed": round(elapsed, 1),
+            "pages_per_sec": round(served / elapsed, 2) if elapsed else 0.0,
+        }
+
+
+class ReplayCrawler:
+    """
+    Stand-in for a crawl4ai AsyncWebCrawler backed by the replay backend.
+
+    Supports `arun()` and CSS/XPath extraction strategies (run on the
+    recorded HTML); js_code, waits and hooks are ignored.
+    """
+
+    def __init__(self, backend: "ReplayBackend"):
+        self.backend = backend
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+    async def start(self):
+        return self
+
+    async def close(self):
+        pass
+
+    async def arun(self, url: str, config: Any = None, **kwargs) -> Any:
+        page = await self.backend.fetch(url)
+        extracted = None
+        strategy = getattr(config, "extraction_strategy", None)
+        if page.success and strategy is not None and hasattr(strategy, "schema"):
+            try:
+                extracted = json.dumps(strategy.run(url, [page.html]), ensure_ascii=False)
+            except Exception as e:
+                logger.debug(f"Replay extraction failed for {url}: {e}")
+
+        fields = dict(
+            url=url,
+            html=page.html,
+            success=page.success,
+            status_code=page.status_code,
+            error_message=page.error_message,
+            extracted_content=extracted,
+        )
+        if CRAWL4AI_AVAILABLE:
+            return CrawlResult(**fields)
+        return ReplayPage(url=url, html=page.html, status_code=page.status_code,
+                          success=page.success, error_message=page.error_message)
+
+
+# ============================================================================
+# CONVENIENCE FUNCTIONS
+# ============================================================================
+
+# Process-wide backend instance
+_backend: Optional[ReplayBackend] = None
+
+
+def get_replay_backend() -> ReplayBackend:
+    """Get or create the process-wide replay backend."""
+    global _backend
+    if _backend is None:
+        _backend = ReplayBackend()
+    return _backend
+
+
+def replay_enabled() -> bool:
+    return get_replay_backend().enabled
+
+
+def configure_replay(source: str, latency_ms: Optional[float] = None, jitter_ms: Optional[float] = None) -> ReplayBackend:
+    """Switch the process to replay mode (used by the `--replay` CLI flags)."""
+    global _backend
+    config = get_replay_config()
+    config.source = source
+    if latency_ms is not None:
+        config.latency_ms = latency_ms
+    if jitter_ms is not None:
+        config.jitter_ms = jitter_ms
+    _backend = ReplayBackend(config)
+    logger.info(f"Replay mode: serving pages from '{source}' ({config.latency_ms:.0f}ms latency)")
+    return _backend
@@ -0,0 +1,343 @@
+"""
+Kloufi-Scrape Response Capture
+
+Structured-data extraction for SPA sites. Ouedkniss and Krello render their
+pages from XHR/GraphQL JSON; instead of waiting for the DOM to settle and
+re-parsing it, this layer records the matching JSON responses during
+navigation and hands them to a site-provided mapper that builds the records.
+
+A mapper declares which responses it wants and how to turn them into items:
+
+    class OuedknissDetailMapper(JsonMapper):
+        url_pattern = r"api\\.ouedkniss\\.com/graphql"
+        operations = {"AnnouncementGet"}
+
+        def map(self, responses):
+            return [to_record(r.data["data"]["announcement"]) for r in responses]
+
+It can be used on a raw Playwright page:
+
+    result = await capture_json(url, OuedknissDetailMapper(), page=page)
+
+or through a pooled crawl4ai browser:
+
+    result = await capture_json(url, KrelloDetailMapper(), browser_config=browser_config)
+
+`result.items` is empty when nothing matched, so sites keep their DOM parser
+as a fallback.
+"""
+
+import asyncio
+import json
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from scraper.crawler.browser_pool import lease_crawler
+from scraper.crawler.readiness import ReadinessProfile
+from scraper.utils.logger import get_logger
+
+logger = get_logger("response_capture")
+
+try:
+    from crawl4ai import CrawlerRunConfig, CacheMode
+    CRAWL4AI_AVAILABLE = True
+except ImportError:
+    CRAWL4AI_AVAILABLE = False
+
+
+# ============================================================================
+# DATA CLASSES
+# ============================================================================
+
+@dataclass
+class CapturedResponse:
+    """One JSON response recorded during navigation."""
+    url: str
+    status: int
+    data: Any
+    operation: Optional[str] = None     # GraphQL operationName, when present
+
+
+@dataclass
+class CaptureResult:
+    """Outcome of a capture run."""
+    url: str
+    items: List[Dict[str, Any]] = field(default_factory=list)
+    responses: List[CapturedResponse] = field(default_factory=list)
+    elapsed: float = 0.0
+    error: Optional[str] = None
+    html: Optional[str] = None          # Page HTML of a pool crawl (for a DOM fallback without a second load)
+
+    @property
+    def success(self) -> bool:
+        return bool(self.items)
+
+
+# ============================================================================
+# MAPPERS
+# ============================================================================
+
+class JsonMapper:
+    """
+    Base class for site mappers.
+
+    Subclasses set `url_pattern` (regex on the response URL), optionally
+    `operations` (GraphQL operation names to keep) and implement `map`.
+    """
+    url_pattern: str = r"$^"
+    operations: Optional[Set[str]] = None
+    timeout: float = 20.0               # Max seconds to wait for the responses
+    max_misses: int = 5                 # Consecutive empty captures before giving up for this process
+
+    def wants(self, url: str, operation: Optional[str]) -> bool:
+        if not re.search(self.url_pattern, url):
+            return False
+        if self.operations and operation not in self.operations:
+            return False
+        return True
+
+    def ready(self, responses: List[CapturedResponse]) -> bool:
+        """True once enough responses arrived to stop waiting."""
+        return bool(responses)
+
+    def map(self, responses: List[CapturedResponse]) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+
+# Consecutive empty captures per mapper class. A mapper that keeps missing
+# (site changed its API) is skipped so sites stop paying for a useless navigation.
+_misses: Dict[str, int] = {}
+
+
+def mapper_enabled(mapper: JsonMapper) -> bool:
+    return _misses.get(type(mapper).__name__, 0) < mapper.max_misses
+
+
+def _record_outcome(mapper: JsonMapper, result: "CaptureResult"):
+    name = type(mapper).__name__
+    if result.success:
+        _misses[name] = 0
+        return
+    _misses[name] = _misses.get(name, 0) + 1
+    if _misses[name] == mapper.max_misses:
+        logger.warning(f"{name}: {mapper.max_misses} empty captures in a row, JSON capture disabled")
+
+
+def find_dict(data: Any, predicate, max_depth: int = 8) -> Optional[Dict[str, Any]]:
+    """Depth-first search for the first dict matching `predicate`."""
+    if max_depth < 0:
+        return None
+    if isinstance(data, dict):
+        if predicate(data):
+            return data
+        children = data.values()
+    elif isinstance(data, list):
+        children = data
+    else:
+        return None
+    for child in children:
+        found = find_dict(child, predicate, max_depth - 1)
+        if found is not None:
+            return found
+    return None
+
+
+def dig(data: Any, *path: Any, default: Any = None) -> Any:
+    """Safe nested lookup: dig(d, "data", "search", "items", 0, "id")."""
+    for key in path:
+        try:
+            data = data[key]
+        except (KeyError, IndexError, TypeError):
+            return default
+        if data is None:
+            return default
+    return data
+
+
+# ============================================================================
+# CAPTURE
+# ============================================================================
+
+class ResponseCapture:
+    """Records JSON responses wanted by a mapper on a Playwright page."""
+
+    MAX_BODY_BYTES = 5 * 1024 * 1024
+
+    def __init__(self, mapper: JsonMapper):
+        self.mapper = mapper
+        self.responses: List[CapturedResponse] = []
+        self._pending: Set[asyncio.Task] = set()
+        self._event = asyncio.Event()
+        self._page = None
+
+    @staticmethod
+    def _operation(request: Any) -> Optional[str]:
+        try:
+            body = request.post_data
+        except Exception:
+            return None
+        if not body:
+            return None
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return None
+        if isinstance(payload, list):
+            payload = payload[0] if payload else {}
+        return payload.get("operationName") if isinstance(payload, dict) else None
+
+    def _on_response(self, response: Any):
+        request = response.request
+        if request.resource_type not in ("xhr", "fetch"):
+            return
+        operation = self._operation(request)
+        if not self.mapper.wants(response.url, operation):
+            return
+        task = asyncio.ensure_future(self._read(response, operation))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _read(self, response: Any, operation: Optional[str]):
+        try:
+            length = int(response.headers.get("content-length") or 0)
+            if length > self.MAX_BODY_BYTES:
+                return
+            data = await response.json()
+        except Exception as e:
+            logger.debug(f"Unreadable JSON from {response.url}: {e}")
+            return
+        self.responses.append(CapturedResponse(response.url, response.status, data, operation))
+        if self.mapper.ready(self.responses):
+            self._event.set()
+
+    def attach(self, page: Any):
+        self._page = page
+        page.on("response", self._on_response)
+
+    def detach(self):
+        if self._page is not None:
+            try:
+                self._page.remove_listener("response", self._on_response)
+            except Exception:
+                pass
+            self._page = None
+
+    async def drain(self):
+        """Wait for bodies that are still being read."""
+        if self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the mapper is satisfied. Returns False on timeout."""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout or self.mapper.timeout)
+            return True
+        except asyncio.TimeoutError:
+            await self.drain()
+            return self.mapper.ready(self.responses)
+
+    def result(self, url: str, start: float) -> CaptureResult:
+        result = CaptureResult(url=url, responses=list(self.responses), elapsed=time.monotonic() - start)
+        if not self.responses:
+            result.error = "no matching JSON response"
+            return result
+        try:
+            result.items = self.mapper.map(self.responses) or []
+        except Exception as e:
+            result.error = f"mapper failed: {e}"
+            logger.warning(f"{type(self.mapper).__name__} failed on {url}: {e}")
+        return result
+
+
+async def capture_json(
+    url: str,
+    mapper: JsonMapper,
+    page: Any = None,
+    browser_config: Any = None,
+    site: Optional[str] = None,
+    goto_kwargs: Optional[Dict[str, Any]] = None,
+) -> CaptureResult:
+    """
+    Navigate to `url` and return the items mapped from its JSON responses.
+
+    With `page` (Playwright) the page is navigated directly and left open.
+    Otherwise a crawler is leased from the browser pool and the crawl returns
+    as soon as the mapper is satisfied (`mapper.ready`) or its timeout hit.
+    Its HTML is kept in `result.html`, so a miss can fall back to the DOM
+    without loading the page again.
+
+    Without a page, nothing is fetched once the mapper has missed
+    `max_misses` times in a row (result.error says so).
+    """
+    if page is None and not mapper_enabled(mapper):
+        return CaptureResult(url=url, error=f"{type(mapper).__name__} disabled after repeated misses")
+    result = await _capture(url, mapper, page, browser_config, site, goto_kwargs)
+    _record_outcome(mapper, result)
+    if not result.success:
+        logger.debug(f"No JSON items for {url}: {result.error}")
+    return result
+
+
+async def _capture(
+    url: str,
+    mapper: JsonMapper,
+    page: Any,
+    browser_config: Any,
+    site: Optional[str],
+    goto_kwargs: Optional[Dict[str, Any]],
+) -> CaptureResult:
+    start = time.monotonic()
+    capture = ResponseCapture(mapper)
+
+    if page is not None:
+        capture.attach(page)
+        try:
+            await page.goto(url, **(goto_kwargs or {"wait_until": "commit", "timeout": 45000}))
+            await capture.wait()
+            await capture.drain()
+        except Exception as e:
+            result = capture.result(url, start)
+            result.error = result.error or str(e)
+            return result
+        finally:
+            capture.detach()
+        return capture.result(url, start)
+
+    if not CRAWL4AI_AVAILABLE:
+        return CaptureResult(url=url, error="crawl4ai not installed")
+
+    async def before_goto(page, context=None, url=None, **kwargs):
+        capture.attach(page)
+        return page
+
+    async def before_return_html(page, html=None, context=None, **kwargs):
+        # The URL match below only says a candidate arrived: the mapper decides
+        # (operations, ready()) with what is left of its timeout
+        await capture.wait(max(0.1, mapper.timeout - (time.monotonic() - start)))
+        await capture.drain()
+        capture.detach()
+        return page
+
+    # Hands over once a matching XHR/fetch finished (or the mapper timeout hit)
+    readiness = ReadinessProfile(json_url_pattern=mapper.url_pattern, max_wait=mapper.timeout)
+    run_config = CrawlerRunConfig(cache_mode=CacheMode.BYPASS, **readiness.run_config_kwargs())
+
+    hooks = {"before_goto": before_goto, "before_return_html": before_return_html}
+    try:
+        async with lease_crawler(browser_config, site=site, hooks=hooks) as crawler:
+            crawl = await crawler.arun(url=url, config=run_config)
+    except Exception as e:
+        result = capture.result(url, start)
+        result.error = result.error or str(e)
+        return result
+
+    result = capture.result(url, start)
+    if getattr(crawl, "success", False):
+        result.html = crawl.html
+    return result
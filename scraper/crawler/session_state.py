@@ -0,0 +1,214 @@
+"""
+Kloufi-Scrape Session State Cache
+
+Per-domain cache of Playwright `storage_state` (cookies + localStorage), so
+one-time page setup - cookie consent, locale selection - is done once and
+then preloaded into every new browser context for that domain.
+
+Raw Playwright:
+
+    cache = get_session_state_cache()
+    context = await browser.new_context(**options, **cache.context_kwargs("ouedkniss.com"))
+    if not cache.has("ouedkniss.com"):
+        ...  # locale + consent
+        await cache.save("ouedkniss.com", context)
+
+crawl4ai sites use `SiteSession`, which skips the consent JS when a state is
+cached and saves the state after the first successful page:
+
+    session = SiteSession("emploitic.com", browser_config, js_code=consent_js)
+    async with lease_crawler(session.browser_config, hooks=session.hooks) as crawler:
+        result = await crawler.arun(url=url, config=CrawlerRunConfig(js_code=session.js_code, ...))
+    await session.check(result)
+
+A saved state is dropped as soon as a block or captcha is seen with it, and
+expires after `SESSION_STATE_MAX_AGE_HOURS`.
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from config import get_session_state_config, get_state_path, SessionStateConfig
+from scraper.detection.block_detector import is_blocked
+from scraper.detection.captcha_detector import has_captcha
+from scraper.utils.logger import get_logger
+
+logger = get_logger("session_state")
+
+
+def domain_of(url_or_domain: str) -> str:
+    """Normalize a URL or host to a cache key ("https://www.x.com/a" -> "x.com")."""
+    host = urlparse(url_or_domain).netloc if "://" in url_or_domain else url_or_domain
+    host = host.split(":")[0].lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class SessionStateCache:
+    """Storage states on disk, one JSON file per domain."""
+
+    def __init__(self, directory: Optional[Path] = None, config: Optional[SessionStateConfig] = None):
+        self.config = config or get_session_state_config()
+        self.directory = directory or get_state_path() / "storage_state"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._memory: Dict[str, Dict[str, Any]] = {}
+        self._stats = {"hits": 0, "misses": 0, "saves": 0, "invalidations": 0}
+
+    def _path(self, domain: str) -> Path:
+        return self.directory / f"{domain_of(domain)}.json"
+
+    def load(self, domain: str) -> Optional[Dict[str, Any]]:
+        """Get the saved storage state for a domain, if present and fresh."""
+        if not self.config.enabled:
+            return None
+        key = domain_of(domain)
+        entry = self._memory.get(key)
+        if entry is None:
+            try:
+                entry = json.loads(self._path(key).read_text(encoding="utf-8"))
+            except (FileNotFoundError, ValueError):
+                entry = None
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+
+        age_hours = (time.time() - entry.get("saved_at", 0)) / 3600
+        if age_hours > self.config.max_age_hours:
+            self.invalidate(key, f"expired ({age_hours:.1f}h old)")
+            self._stats["misses"] += 1
+            return None
+
+        self._memory[key] = entry
+        self._stats["hits"] += 1
+        return entry["state"]
+
+    def has(self, domain: str) -> bool:
+        return self.load(domain) is not None
+
+    def store(self, domain: str, state: Dict[str, Any]):
+        """Persist a storage state dict (atomic write)."""
+        if not self.config.enabled:
+            return
+        key = domain_of(domain)
+        entry = {"saved_at": time.time(), "state": state}
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp")
+        try:
+            tmp_path.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Could not save session state for {key}: {e}")
+            return
+        self._memory[key] = entry
+        self._stats["saves"] += 1
+        logger.info(f"Saved session state for {key} ({len(state.get('cookies', []))} cookies)")
+
+    async def save(self, domain: str, context: Any):
+        """Save the storage state of a Playwright browser context."""
+        if not self.config.enabled:
+            return
+        try:
+            state = await context.storage_state()
+        except Exception as e:
+            logger.debug(f"Could not read storage state for {domain_of(domain)}: {e}")
+            return
+        self.store(domain, state)
+
+    def invalidate(self, domain: str, reason: str = ""):
+        """Forget the saved state (next context redoes consent/locale setup)."""
+        key = domain_of(domain)
+        existed = self._memory.pop(key, None) is not None
+        try:
+            self._path(key).unlink()
+            existed = True
+        except FileNotFoundError:
+            pass
+        if existed:
+            self._stats["invalidations"] += 1
+            logger.info(f"Invalidated session state for {key}{': ' + reason if reason else ''}")
+
+    async def check(self, domain: str, status: Optional[int], html: str) -> bool:
+        """Invalidate the domain's state if the response looks blocked. Returns True if blocked."""
+        html = html or ""
+        if await is_blocked(status, html) or await has_captcha(html):
+            self.invalidate(domain, f"block detected (status {status})")
+            return True
+        return False
+
+    def context_kwargs(self, domain: str) -> Dict[str, Any]:
+        """`browser.new_context` kwargs preloading the saved state (empty when none)."""
+        state = self.load(domain)
+        return {"storage_state": state} if state else {}
+
+    def browser_config(self, browser_config: Any, domain: str) -> Any:
+        """crawl4ai BrowserConfig with the saved state preloaded (unchanged when none)."""
+        state = self.load(domain)
+        if not state or browser_config is None or not hasattr(browser_config, "clone"):
+            return browser_config
+        return browser_config.clone(storage_state=state)
+
+    def save_hook(self, domain: str) -> Callable:
+        """crawl4ai `before_return_html` hook saving the page's context state."""
+        async def before_return_html(page, html=None, context=None, **kwargs):
+            if context is not None and not await has_captcha(html or ""):
+                await self.save(domain, context)
+            return page
+        return before_return_html
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return dict(self._stats)
+
+
+class SiteSession:
+    """
+    Session setup for one crawl4ai fetch.
+
+    With a cached state: preloads it and drops the setup JS. Without one: runs
+    the setup JS and saves the resulting state when the page comes back.
+    """
+
+    def __init__(self, domain: str, browser_config: Any, js_code: Optional[List[str]] = None):
+        self.domain = domain_of(domain)
+        self.cache = get_session_state_cache()
+        state = self.cache.load(self.domain)
+        self.cached = state is not None
+        self.browser_config = browser_config
+        if self.cached and hasattr(browser_config, "clone"):
+            self.browser_config = browser_config.clone(storage_state=state)
+        self.js_code = None if self.cached else js_code
+        self.hooks = {} if self.cached or not self.cache.config.enabled else {
+            "before_return_html": self.cache.save_hook(self.domain)
+        }
+
+    async def check(self, result: Any) -> bool:
+        """Invalidate the state on a blocked result. Returns True if blocked."""
+        if result is None:
+            return False
+        return await self.cache.check(
+            self.domain,
+            getattr(result, "status_code", None),
+            getattr(result, "html", "") or "",
+        )
+
+
+# ============================================================================
+# CONVENIENCE FUNCTIONS
+# ============================================================================
+
+# Process-wide cache instance
+_session_state_cache: Optional[SessionStateCache] = None
+
+
+def get_session_state_cache() -> SessionStateCache:
+    """Get or create the process-wide session state cache."""
+    global _session_state_cache
+    if _session_state_cache is None:
+        _session_state_cache = SessionStateCache()
+    return _session_state_cache
@@ -0,0 +1,434 @@
+"""
+Kloufi-Scrape Tiered Fetcher
+
+HTTP-first page fetching with automatic browser fallback.
+
+Many detail pages are server-rendered and do not need Chromium at all. For a
+registered site the fetcher first tries a plain request on a shared aiohttp
+connection pool and checks the response against the site's "content present"
+selector. Only when that check fails, or a block/captcha is detected, does it
+escalate to a pooled crawl4ai browser:
+
+    result = await fetch_page(
+        url,
+        "immobilier/essekna",
+        browser_config,
+        CrawlerRunConfig(cache_mode=CacheMode.BYPASS, delay_before_return_html=10),
+    )
+    soup = BeautifulSoup(result.html, "html.parser")
+
+The outcome of every fetch is remembered per site (data/state/fetch_tiers.json),
+so a site whose pages need JavaScript goes straight to the browser on later
+runs. Pinned sites are re-probed over HTTP every `tier_probe_interval` fetches
+in case the site changes.
+
+Sites without a registered profile always use the browser, exactly as before.
+
+Successful pages from either tier are stored in the raw HTML archive when
+HTML_ARCHIVE_ENABLED=true (see html_archive.py). With FETCH_REPLAY set, pages
+are served from recorded HTML instead (see replay.py).
+"""
+
+import asyncio
+import json
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from bs4 import BeautifulSoup
+
+from config import get_fetch_config, get_state_path, FetchConfig
+from scraper.crawler.browser_pool import lease_crawler
+from scraper.crawler.budget import get_resource_budget
+from scraper.crawler.html_archive import archive_page
+from scraper.crawler.replay import get_replay_backend
+from scraper.detection.block_detector import is_blocked
+from scraper.detection.captcha_detector import has_captcha
+from scraper.utils.logger import get_logger
+
+logger = get_logger("tiered_fetcher")
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+TIER_HTTP = "http"
+TIER_BROWSER = "browser"
+TIER_REPLAY = "replay"
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/124.0 Safari/537.36"
+)
+
+
+# ============================================================================
+# SITE PROFILES
+# ============================================================================
+
+@dataclass
+class FetchProfile:
+    """How to tell that a plain HTTP response already holds the page content."""
+    content_selector: str                       # CSS selector present on a complete page
+    headers: Dict[str, str] = field(default_factory=dict)
+    encoding: Optional[str] = None              # Force a charset when the server lies
+
+
+# Keyed by "category/site". Only server-rendered pages belong here.
+FETCH_PROFILES: Dict[str, FetchProfile] = {
+    "immobilier/essekna": FetchProfile("div.heading-properties"),
+    "immobilier/residencedz": FetchProfile("h1.entry-title"),
+    "voiture/cardias": FetchProfile("div.field--name-title"),
+    "voiture/djcar": FetchProfile("h2.car-title"),
+    "voiture/algerieannonces": FetchProfile("div.description h1, ul.info-holder"),
+}
+
+
+def get_fetch_profile(site_key: str) -> Optional[FetchProfile]:
+    """Get the registered fetch profile for "category/site", if any."""
+    return FETCH_PROFILES.get(site_key)
+
+
+# ============================================================================
+# RESULT
+# ============================================================================
+
+@dataclass
+class FetchResult:
+    """
+    Page fetch outcome.
+
+    Exposes the same attributes sites read from a crawl4ai CrawlResult
+    (`success`, `html`, `status_code`, `error_message`), plus the tier used.
+    """
+    url: str
+    html: str = ""
+    success: bool = False
+    status_code: Optional[int] = None
+    error_message: Optional[str] = None
+    tier: str = TIER_BROWSER
+    elapsed: float = 0.0
+
+
+# ============================================================================
+# TIER MEMORY
+# ============================================================================
+
+class TierMemory:
+    """Persistent per-site record of which fetch tier works."""
+
+    SAVE_EVERY = 20  # Records between writes to disk
+
+    def __init__(self, path: Optional[Path] = None, config: Optional[FetchConfig] = None):
+        self.config = config or get_fetch_config()
+        self.path = path or get_state_path() / "fetch_tiers.json"
+        self._dirty = 0
+        try:
+            self.data: Dict[str, Dict[str, Any]] = json.loads(self.path.read_text())
+        except (FileNotFoundError, ValueError):
+            self.data = {}
+
+    def _site(self, site_key: str) -> Dict[str, Any]:
+        return self.data.setdefault(site_key, {
+            "tier": TIER_HTTP,
+            "http_ok": 0,
+            "http_fail": 0,
+            "http_fail_streak": 0,
+            "browser_ok": 0,
+            "browser_fail": 0,
+            "since_probe": 0,
+            "updated": None,
+        })
+
+    def preferred_tier(self, site_key: str) -> str:
+        """Tier to try first for a site (HTTP unless pinned to the browser)."""
+        s = self._site(site_key)
+        if s["tier"] == TIER_BROWSER and s["since_probe"] >= self.config.tier_probe_interval:
+            s["since_probe"] = 0
+            logger.debug(f"{site_key}: re-probing HTTP tier")
+            return TIER_HTTP
+        return s["tier"]
+
+    def record(self, site_key: str, tier: str, success: bool):
+        s = self._site(site_key)
+        if tier == TIER_HTTP:
+            if success:
+                s["http_ok"] += 1
+                s["http_fail_streak"] = 0
+                if s["tier"] != TIER_HTTP:
+                    logger.info(f"{site_key}: HTTP tier works again, un-pinning browser")
+                s["tier"] = TIER_HTTP
+            else:
+                s["http_fail"] += 1
+                s["http_fail_streak"] += 1
+                if s["tier"] == TIER_BROWSER or s["http_fail_streak"] >= self.config.http_fail_threshold:
+                    if s["tier"] != TIER_BROWSER:
+                        logger.info(f"{site_key}: pinned to browser tier after {s['http_fail_streak']} HTTP misses")
+                    s["tier"] = TIER_BROWSER
+                    s["since_probe"] = 0
+        else:
+            s["browser_ok" if success else "browser_fail"] += 1
+            if s["tier"] == TIER_BROWSER:
+                s["since_probe"] += 1
+
+        s["updated"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self._dirty += 1
+        if self._dirty >= self.SAVE_EVERY:
+            self.save()
+
+    def save(self):
+        if not self._dirty:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps(self.data, indent=2))
+            self._dirty = 0
+        except Exception as e:
+            logger.warning(f"Could not save fetch tiers: {e}")
+
+
+# ============================================================================
+# FETCHER
+# ============================================================================
+
+class TieredFetcher:
+    """HTTP-first fetcher with crawl4ai fallback and per-site tier memory."""
+
+    def __init__(self, config: Optional[FetchConfig] = None, memory: Optional[TierMemory] = None):
+        self.config = config or get_fetch_config()
+        self.memory = memory or TierMemory(config=self.config)
+        self._session: Optional["aiohttp.ClientSession"] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._counters: Dict[str, int] = {
+            "http_hits": 0,
+            "http_misses": 0,
+            "http_blocked": 0,
+            "browser_fetches": 0,
+            "browser_skipped_http": 0,
+        }
+
+    async def _get_session(self) -> "aiohttp.ClientSession":
+        """Shared session, recreated when used from another event loop."""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.config.http_max_connections,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.config.http_timeout),
+            )
+            self._session_loop = loop
+        return self._session
+
+    @staticmethod
+    def _content_present(html: str, selector: str) -> bool:
+        try:
+            return BeautifulSoup(html, "html.parser").select_one(selector) is not None
+        except Exception:
+            return False
+
+    async def fetch_http(
+        self,
+        url: str,
+        profile: FetchProfile,
+        user_agent: Optional[str] = None,
+        proxy: Optional[str] = None,
+    ) -> FetchResult:
+        """Single plain HTTP attempt, validated against the site profile."""
+        start = time.monotonic()
+        headers = {
+            "User-Agent": user_agent or DEFAULT_USER_AGENT,
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            "Accept-Language": "fr-FR,fr;q=0.9,en;q=0.8",
+            **profile.headers,
+        }
+        result = FetchResult(url=url, tier=TIER_HTTP)
+        try:
+            session = await self._get_session()
+            async with session.get(url, headers=headers, proxy=proxy, allow_redirects=True) as resp:
+                result.status_code = resp.status
+                result.html = await resp.text(encoding=profile.encoding, errors="replace")
+        except Exception as e:
+            result.error_message = f"HTTP tier failed: {e}"
+            result.elapsed = time.monotonic() - start
+            return result
+
+        result.elapsed = time.monotonic() - start
+        if await is_blocked(result.status_code, result.html) or await has_captcha(result.html):
+            self._counters["http_blocked"] += 1
+            result.error_message = f"HTTP tier blocked (status {result.status_code})"
+        elif result.status_code >= 400:
+            result.error_message = f"HTTP tier got status {result.status_code}"
+        elif not self._content_present(result.html, profile.content_selector):
+            result.error_message = f"HTTP tier missing content ({profile.content_selector})"
+        else:
+            result.success = True
+        return result
+
+    async def fetch_browser(
+        self,
+        url: str,
+        browser_config: Any,
+        run_config: Any,
+        site_key: Optional[str] = None,
+    ) -> FetchResult:
+        """Fetch through a pooled crawl4ai browser."""
+        start = time.monotonic()
+        self._counters["browser_fetches"] += 1
+        try:
+            async with lease_crawler(browser_config, site=site_key) as crawler:
+                crawl = await crawler.arun(url=url, config=run_config)
+            return FetchResult(
+                url=url,
+                html=crawl.html or "",
+                success=crawl.success,
+                status_code=getattr(crawl, "status_code", None),
+                error_message=crawl.error_message,
+                tier=TIER_BROWSER,
+                elapsed=time.monotonic() - start,
+            )
+        except Exception as e:
+            return FetchResult(
+                url=url,
+                error_message=str(e),
+                tier=TIER_BROWSER,
+                elapsed=time.monotonic() - start,
+            )
+
+    async def fetch(
+        self,
+        url: str,
+        site_key: str,
+        browser_config: Any = None,
+        run_config: Any = None,
+        proxy: Optional[str] = None,
+    ) -> FetchResult:
+        """
+        Fetch a page for "category/site", using the cheapest tier that works.
+
+        Falls back to the browser when the site has no profile, HTTP-first is
+        disabled, aiohttp is missing, or the HTTP response fails the check.
+        """
+        replay = get_replay_backend()
+        if replay.enabled:
+            page = await replay.fetch(url)
+            return FetchResult(
+                url=url,
+                html=page.html,
+                success=page.success,
+                status_code=page.status_code,
+                error_message=page.error_message,
+                tier=TIER_REPLAY,
+            )
+
+        profile = get_fetch_profile(site_key)
+        use_http = (
+            profile is not None
+            and self.config.http_first
+            and AIOHTTP_AVAILABLE
+        )
+
+        if use_http and self.memory.preferred_tier(site_key) == TIER_HTTP:
+            user_agent = getattr(browser_config, "user_agent", None)
+            result = await self.fetch_http(url, profile, user_agent=user_agent, proxy=proxy)
+            self.memory.record(site_key, TIER_HTTP, result.success)
+            if result.success:
+                self._counters["http_hits"] += 1
+                logger.debug(f"{site_key}: HTTP tier OK in {result.elapsed:.2f}s - {url}")
+                archive_page(url, result.html, site=site_key, status=result.status_code)
+                return result
+            self._counters["http_misses"] += 1
+            logger.debug(f"{site_key}: {result.error_message}, escalating to browser - {url}")
+        elif use_http:
+            self._counters["browser_skipped_http"] += 1
+
+        # Archived by the leased crawler
+        result = await self.fetch_browser(url, browser_config, run_config, site_key=site_key)
+        if profile is not None:
+            self.memory.record(site_key, TIER_BROWSER, result.success)
+        return result
+
+    async def close(self):
+        """Close the HTTP session and flush tier memory."""
+        self.memory.save()
+        if self._session is not None and not self._session.closed:
+            try:
+                await self._session.close()
+            except Exception as e:
+                logger.debug(f"Error closing HTTP session: {e}")
+        self._session = None
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._counters,
+            "sites": {k: v["tier"] for k, v in self.memory.data.items()},
+        }
+
+
+# ============================================================================
+# CONVENIENCE FUNCTIONS
+# ============================================================================
+
+# Process-wide fetcher instance
+_fetcher: Optional[TieredFetcher] = None
+
+
+def get_fetcher() -> TieredFetcher:
+    """Get or create the process-wide tiered fetcher."""
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = TieredFetcher()
+    return _fetcher
+
+
+async def fetch_page(
+    url: str,
+    site_key: str,
+    browser_config: Any = None,
+    run_config: Any = None,
+    proxy: Optional[str] = None,
+) -> FetchResult:
+    """Fetch `url` for "category/site" through the process-wide fetcher."""
+    async with get_resource_budget().request():
+        return await get_fetcher().fetch(url, site_key, browser_config, run_config, proxy=proxy)
+
+
+async def close_fetcher():
+    """Close the process-wide fetcher (called on dispatcher shutdown)."""
+    global _fetcher
+    if _fetcher is not None:
+        await _fetcher.close()
+        _fetcher = None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Tiered fetch test")
+    parser.add_argument("url")
+    parser.add_argument("site_key", help='e.g. "immobilier/essekna"')
+    args = parser.parse_args()
+
+    async def _demo():
+        from crawl4ai import BrowserConfig, CrawlerRunConfig, CacheMode
+        result = await fetch_page(
+            args.url,
+            args.site_key,
+            BrowserConfig(headless=True),
+            CrawlerRunConfig(cache_mode=CacheMode.BYPASS),
+        )
+        print(f"tier={result.tier} success={result.success} status={result.status_code} "
+              f"bytes={len(result.html)} elapsed={result.elapsed:.2f}s error={result.error_message}")
+        await close_fetcher()
+
+    asyncio.run(_demo())
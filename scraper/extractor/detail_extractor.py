@@ -1,13 +1,81 @@
 from playwright.async_api import Page
 import re
+import json
 import random
 from scraper.utils.human_behavior import human_delay, simulate_reading, human_scroll, human_mouse_move
+from scraper.crawler.interception import apply_interception
+
+# Field map for the single-evaluate extraction mode:
+# name -> (selectors tried in order, attribute to read or None for text, default)
+FIELD_MAP = {
+    "title": (["h1"], None, "No Title"),
+    "price": (['.text-primary.text-h6 [dir="ltr"]', ".text-primary.text-h6"], None, "Price on request"),
+    "description": ([".announcement-details .__description"], None, ""),
+    "og_image": (['meta[property="og:image"]'], "content", ""),
+}
+
+# Spec rows: key cell selector and value cell selector (relative to the key's parent row)
+SPEC_NAME_SELECTOR = ".o-announ-specs .spec-name"
+SPEC_VALUE_SELECTOR = ".v-col-sm-9, .v-col-7"
+PHONE_SELECTOR = 'a[href^="tel:"]'
+
+
+def build_extraction_script(field_map: dict = FIELD_MAP) -> str:
+    """
+    Compile the field map into a single JS function for `page.evaluate`.
+
+    The function returns every field, the spec rows and the phone links as one
+    JSON object, so a whole record costs a single browser round trip.
+    """
+    return """() => {
+    const fields = %s;
+    const text = el => (el && el.textContent ? el.textContent.trim() : "");
+    const out = {};
+    for (const [name, [selectors, attr, dflt]] of Object.entries(fields)) {
+        let value = dflt;
+        for (const sel of selectors) {
+            const el = document.querySelector(sel);
+            if (!el) continue;
+            const v = attr ? (el.getAttribute(attr) || "").trim() : text(el);
+            if (v) { value = v; break; }
+        }
+        out[name] = value;
+    }
+    const specs = {};
+    for (const nameEl of document.querySelectorAll(%s)) {
+        const key = text(nameEl).split(":").join("");
+        const valueEl = nameEl.parentElement && nameEl.parentElement.querySelector(%s);
+        if (valueEl) specs[key] = text(valueEl);
+    }
+    out.specs = specs;
+    const phones = [];
+    for (const a of document.querySelectorAll(%s)) {
+        const phone = (a.getAttribute("href") || "").replace("tel:", "").trim();
+        if (phone && !phones.includes(phone)) phones.push(phone);
+    }
+    out.phones = phones;
+    return out;
+}""" % (
+        json.dumps({name: list(spec) for name, spec in field_map.items()}, ensure_ascii=False),
+        json.dumps(SPEC_NAME_SELECTOR),
+        json.dumps(SPEC_VALUE_SELECTOR),
+        json.dumps(PHONE_SELECTOR),
+    )
+
+
+EXTRACTION_SCRIPT = build_extraction_script()
+
 
 class DetailExtractor:
     """Extracts detailed information from a single Ouedkniss announcement page."""
     
-    def __init__(self, page: Page):
+    def __init__(self, page: Page, interception: str = None, site: str = "immobilier/ouedkniss", mode: str = "evaluate"):
         self.page = page
+        # "evaluate": one page.evaluate round trip, falls back to "locator" on error
+        self.mode = mode
+        # Interception profile name (allow-all, no-media, text-only); None = site default
+        self.interception = interception
+        self.site = site
 
     async def extract(self, url: str) -> dict:
         """
@@ -16,8 +84,8 @@ class DetailExtractor:
         """
         page = self.page # Use the injected page
         try:
-            # Block heavy resources to speed up loading
-            # await page.route("**/*.{png,jpg,jpeg,webp,gif,css,woff,woff2}", lambda route: route.abort())
+            # Block heavy resources to speed up loading (images are read from og:image)
+            await apply_interception(page, self.interception, site=self.site)
             
             print(f"  Fetching details: {url}")
             await page.goto(url, wait_until='domcontentloaded', timeout=45000)
@@ -30,7 +98,7 @@ class DetailExtractor:
             if random.random() < 0.5:
                 await human_scroll(page, max_scrolls=2)
 
-            data = await self._scrape_data(page)
+            data = await self.scrape(page)
             data['url'] = url
             # Extract ID from URL (last segment after dash)
             if '-' in url:
@@ -65,8 +133,31 @@ class DetailExtractor:
             return None
         # Finally block removed: we do NOT close the page here, the caller does.
 
+    async def scrape(self, page: Page) -> dict:
+        """Extract the record from an already loaded page using the configured mode."""
+        if self.mode == "evaluate":
+            try:
+                return await self._scrape_data_evaluate(page)
+            except Exception as e:
+                print(f"  [WARN] Single-evaluate extraction failed ({e}), using locators")
+        return await self._scrape_data(page)
+
+    async def _scrape_data_evaluate(self, page: Page) -> dict:
+        """Extract the whole record with a single page.evaluate call."""
+        raw = await page.evaluate(EXTRACTION_SCRIPT)
+        specs = raw.get("specs") or {}
+        return {
+            "title": raw.get("title") or "No Title",
+            "price": raw.get("price") or "Price on request",
+            "description": raw.get("description") or "",
+            "specs": specs,
+            "date": specs.get('التاريخ', "Unknown"),
+            "phones": raw.get("phones") or [],
+            "images": [raw["og_image"]] if raw.get("og_image") else [],
+        }
+
     async def _scrape_data(self, page: Page) -> dict:
-        """Internal method to extract data from the page object."""
+        """Internal method to extract data from the page object (one locator call per field)."""
         
         # 1. Title
         title = await page.locator('h1').first.text_content()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Detail Extraction Benchmark
+
+Compares DetailExtractor's two extraction modes on sample_detail.html:
+- locator:  one Playwright locator call (IPC round trip) per field / spec row
+- evaluate: the whole record in a single page.evaluate call
+
+The page is loaded offline (all network requests aborted), so only the
+extraction itself is measured.
+
+Usage:
+    python scripts/bench_detail_extraction.py
+    python scripts/bench_detail_extraction.py --iterations 50 --html other.html
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from playwright.async_api import async_playwright
+from scraper.extractor.detail_extractor import DetailExtractor
+import argparse
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark DetailExtractor modes")
+    parser.add_argument(
+        "--html",
+        default=str(project_root / "sample_detail.html"),
+        help="Saved detail page (default: sample_detail.html)"
+    )
+    parser.add_argument(
+        "--iterations", "-n",
+        type=int,
+        default=20,
+        help="Extractions per mode (default: 20)"
+    )
+    return parser.parse_args()
+
+
+async def time_mode(page, mode: str, iterations: int):
+    """Run one extraction mode `iterations` times, return (timings_ms, last_result)."""
+    extractor = DetailExtractor(page, interception="allow-all", mode=mode)
+    scrape = extractor._scrape_data if mode == "locator" else extractor._scrape_data_evaluate
+
+    # Warm-up (JIT, selector engine)
+    result = await scrape(page)
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = await scrape(page)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, result
+
+
+async def main():
+    args = parse_args()
+    html = Path(args.html).read_text(encoding="utf-8")
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+        await page.route("**/*", lambda route: route.abort())
+        await page.set_content(html, wait_until="domcontentloaded")
+
+        results = {}
+        print(f"\nBenchmarking {Path(args.html).name} ({len(html) / 1024:.0f} KB), {args.iterations} iterations\n")
+        print(f"{'mode':<10} {'mean ms':>10} {'median ms':>10} {'min ms':>10}")
+        print("-" * 43)
+        for mode in ("locator", "evaluate"):
+            timings, results[mode] = await time_mode(page, mode, args.iterations)
+            print(
+                f"{mode:<10} {statistics.mean(timings):>10.1f} "
+                f"{statistics.median(timings):>10.1f} {min(timings):>10.1f}"
+            )
+
+        await browser.close()
+
+    locator, evaluate = results["locator"], results["evaluate"]
+    mismatched = [key for key in locator if locator[key] != evaluate.get(key)]
+    print()
+    if mismatched:
+        print(f"⚠ Modes disagree on: {', '.join(mismatched)}")
+        for key in mismatched:
+            print(f"  {key}:\n    locator:  {locator[key]!r}\n    evaluate: {evaluate.get(key)!r}")
+    else:
+        print(f"✓ Both modes extracted identical records ({len(locator['specs'])} specs)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
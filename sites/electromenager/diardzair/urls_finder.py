@@ -5,6 +5,12 @@ from bs4 import BeautifulSoup
 from scrape_details import extract_product_details # Changed function name
 from urllib.parse import urljoin
 
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
 # Global list to collect detail page URLs
 all_urls = []
 
@@ -31,7 +37,7 @@ async def scrape_listing_pages():
         )
         print(f"▶ Loading listing page {page}: {url}")
         
-        async with AsyncWebCrawler(config=browser_config) as crawler:
+        async with lease_crawler(browser_config) as crawler:
             result = await crawler.arun(
                 url=url,
                 config=CrawlerRunConfig(
@@ -5,6 +5,13 @@ from bs4 import BeautifulSoup
 from crawl4ai import AsyncWebCrawler, CrawlerRunConfig, CacheMode, BrowserConfig
 from crawl4ai.extraction_strategy import JsonCssExtractionStrategy
 from scrape_details import scrape_product_details
+
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
 sys.setrecursionlimit(10000)
 
 async def scrape_main_page(url):
@@ -58,7 +65,7 @@ async def scrape_main_page(url):
         delay_before_return_html=5,
     )
 
-    async with AsyncWebCrawler(config=browser_config) as crawler:
+    async with lease_crawler(browser_config) as crawler:
         all_data = []
         current_page_url = url
         page_number = 1
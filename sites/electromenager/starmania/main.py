@@ -6,6 +6,13 @@ from crawl4ai import AsyncWebCrawler, CrawlerRunConfig, CacheMode, BrowserConfig
 from crawl4ai.extraction_strategy import JsonCssExtractionStrategy
 from datetime import datetime
 from scrape_details import scrape_product_details
+
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
 sys.setrecursionlimit(10000)
 
 async def scrape_main_page():
@@ -64,7 +71,7 @@ async def scrape_main_page():
         delay_before_return_html=5,
     )
 
-    async with AsyncWebCrawler(config=browser_config) as crawler:
+    async with lease_crawler(browser_config) as crawler:
         all_data = []
         base_url = "https://starmania.dz/fr/produits/?category=21"
         current_page_url = base_url
@@ -6,6 +6,12 @@ from crawl4ai.extraction_strategy import JsonCssExtractionStrategy
 from datetime import datetime
 from scrape_details import extract_multimedia_details
 
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
 async def scrape_main_page():
     # Define the extraction schema for WebSoog product listings
     schema = {
@@ -66,7 +72,7 @@ async def scrape_main_page():
         delay_before_return_html=5  # Ensures JavaScript-rendered content loads
     )
 
-    async with AsyncWebCrawler(config=browser_config) as crawler:
+    async with lease_crawler(browser_config) as crawler:
         all_data = []
         base_url = "https://www.websoog.com/fr/99-electromenager"
         current_page_url = base_url
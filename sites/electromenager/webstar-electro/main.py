@@ -8,6 +8,18 @@ from scrape_details import extract_product_details
 from urllib.parse import urljoin
 import uuid
 
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
+try:
+    from scraper.crawler.readiness import readiness_kwargs
+except ImportError:
+    def readiness_kwargs(category, site, page="detail", fallback_delay=5.0):
+        return {"delay_before_return_html": fallback_delay}
+
 # Global lists to collect URLs
 category_urls_list = []
 product_urls_list = []
@@ -27,12 +39,12 @@ async def scrape_category_pages():
     
     print(f"▶ Loading category page: {base_url}")
     
-    async with AsyncWebCrawler(config=browser_config) as crawler:
+    async with lease_crawler(browser_config) as crawler:
         result = await crawler.arun(
             url=base_url,
             config=CrawlerRunConfig(
                 cache_mode=CacheMode.BYPASS,
-                delay_before_return_html=40,
+                **readiness_kwargs("electromenager", "webstar-electro", "listing", fallback_delay=40),
                 magic=True,
                 simulate_user=True,
                 override_navigator=True,
@@ -82,12 +94,12 @@ async def scrape_listing_pages(category_urls):
     for url in category_urls:
         print(f"▶ Loading listing page: {url}")
         
-        async with AsyncWebCrawler(config=browser_config) as crawler:
+        async with lease_crawler(browser_config) as crawler:
             result = await crawler.arun(
                 url=url,
                 config=CrawlerRunConfig(
                     cache_mode=CacheMode.BYPASS,
-                    delay_before_return_html=40,
+                    **readiness_kwargs("electromenager", "webstar-electro", "listing", fallback_delay=40),
                     magic=True,
                     simulate_user=True,
                     override_navigator=True,
@@ -145,12 +157,12 @@ async def scrape_seller_urls(product_urls):
     for url in product_urls:
         print(f"▶ Loading product page for seller URLs: {url}")
         
-        async with AsyncWebCrawler(config=browser_config) as crawler:
+        async with lease_crawler(browser_config) as crawler:
             result = await crawler.arun(
                 url=url,
                 config=CrawlerRunConfig(
                     cache_mode=CacheMode.BYPASS,
-                    delay_before_return_html=40,
+                    **readiness_kwargs("electromenager", "webstar-electro", "listing", fallback_delay=40),
                     magic=True,
                     simulate_user=True,
                     override_navigator=True,
@@ -16,8 +16,18 @@ from utils.electromenager import ElectromenagerUtils
 try:
     from insert2db.insert_scrape import insert_data_to_es
 except ImportError:
-    def insert_data_to_es(data, index):
-        print(f"[Mock] Inserting data to ES index '{index}'")
+    try:
+        # No Elasticsearch client here: spool the document for a process that has one
+        from core.spool import spool_document as insert_data_to_es
+    except ImportError:
+        def insert_data_to_es(data, index):
+            print(f"[Mock] Inserting data to ES index '{index}'")
+
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
 
 
 async def extract_product_details(url):
@@ -30,7 +40,7 @@ async def extract_product_details(url):
         browser_type="chromium",
     )
 
-    async with AsyncWebCrawler(config=browser_config) as crawler:
+    async with lease_crawler(browser_config) as crawler:
         result = await crawler.arun(
             url=url,
             javascript_enabled=True,
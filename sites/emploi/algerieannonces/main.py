@@ -5,6 +5,12 @@ from bs4 import BeautifulSoup
 from scrape_details import extract_job_details  # Assumes this function is implemented in scrape_details.py
 from urllib.parse import urljoin
 
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
 # Global list to collect detail page URLs
 all_urls = []
 
@@ -24,7 +30,7 @@ async def scrape_listing_pages():
         url = fr"https://www.algerieannonces.com/categorie/309/Offres-emploi/{page}.html"
         print(f"Loading listing page: {url}")
         
-        async with AsyncWebCrawler(config=browser_config) as crawler:
+        async with lease_crawler(browser_config) as crawler:
             result = await crawler.arun(
                 url=url,
                 config=CrawlerRunConfig(
@@ -7,6 +7,12 @@ from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
 import locale
 
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
 all_results = []
 
 def format_date(date_str):
@@ -49,7 +55,7 @@ async def get_total_pages():
         browser_type="chromium",
     )
 
-    async with AsyncWebCrawler(config=browser_config) as crawler:
+    async with lease_crawler(browser_config) as crawler:
         result = await crawler.arun(
             url=url,
             config=CrawlerRunConfig(
@@ -98,7 +104,7 @@ async def scrape_page(page_number):
         browser_type="chromium",
     )
 
-    async with AsyncWebCrawler(config=browser_config) as crawler:
+    async with lease_crawler(browser_config) as crawler:
         # Scrape the page for name, location, and URL
         result = await crawler.arun(
             url=url,
@@ -6,6 +6,12 @@ from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
 import sys
 
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
 sys.setrecursionlimit(10000)
 
 # ====================== DATE PARSING ======================
@@ -131,7 +137,7 @@ async def scrape_all_jobs_with_infinite_scroll():
     )
 
     try:
-        async with AsyncWebCrawler(config=browser_config) as crawler:
+        async with lease_crawler(browser_config) as crawler:
             result = await crawler.arun(
                 url=url,
                 config=CrawlerRunConfig(
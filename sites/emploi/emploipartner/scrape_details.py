@@ -13,8 +13,18 @@ from utils.emploi import EmploiUtils
 try:
     from insert2db.insert_scrape import insert_data_to_es
 except ImportError:
-    def insert_data_to_es(data, index):
-        print(f"[Mock] Inserted into '{index}' -> {data['titre']}")
+    try:
+        # No Elasticsearch client here: spool the document for a process that has one
+        from core.spool import spool_document as insert_data_to_es
+    except ImportError:
+        def insert_data_to_es(data, index):
+            print(f"[Mock] Inserted into '{index}' -> {data['titre']}")
+
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
 
 # ====================== SITE-SPECIFIC HELPER FUNCTIONS ======================
 
@@ -245,7 +255,7 @@ async def scrape_single_url_with_crawl4ai_and_bs4(url):
         delay_before_return_html=15
     )
 
-    async with AsyncWebCrawler(config=browser_config) as crawler:
+    async with lease_crawler(browser_config) as crawler:
         result = await crawler.arun(url=url, config=config)
         if not result.success:
             print(f"Failed to load {url}: {result.error_message}")
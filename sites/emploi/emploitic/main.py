@@ -7,6 +7,25 @@ from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
 import locale
 import sys
+
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config, **kwargs):
+        return AsyncWebCrawler(config=browser_config)
+
+try:
+    from scraper.crawler.session_state import SiteSession
+except ImportError:
+    class SiteSession:
+        def __init__(self, domain, browser_config, js_code=None):
+            self.browser_config = browser_config
+            self.js_code = js_code
+            self.hooks = {}
+
+        async def check(self, result):
+            return False
+
 sys.setrecursionlimit(10000)
 
 # Global list if needed, but since we insert directly, maybe not necessary
@@ -52,15 +71,18 @@ async def get_total_pages(max_retries=3):
 
     for attempt in range(1, max_retries + 1):
         try:
-            async with AsyncWebCrawler(config=browser_config) as crawler:
+            # Consent JS only runs until the cookie state is cached
+            session = SiteSession("emploitic.com", browser_config, js_code=js_commands)
+            async with lease_crawler(session.browser_config, hooks=session.hooks) as crawler:
                 result = await crawler.arun(
                     url=url,
                     config=CrawlerRunConfig(
                         cache_mode=CacheMode.BYPASS,
-                        js_code=js_commands,
+                        js_code=session.js_code,
                         delay_before_return_html=10
                     )
                 )
+                await session.check(result)
 
                 if result.success:
                     print("Successfully scraped the first page!")
@@ -105,15 +127,18 @@ async def scrape_page(page_number, max_retries=3):
 
     for attempt in range(1, max_retries + 1):
         try:
-            async with AsyncWebCrawler(config=browser_config) as crawler:
+            # Consent JS only runs until the cookie state is cached
+            session = SiteSession("emploitic.com", browser_config, js_code=js_commands)
+            async with lease_crawler(session.browser_config, hooks=session.hooks) as crawler:
                 result = await crawler.arun(
                     url=url,
                     config=CrawlerRunConfig(
                         cache_mode=CacheMode.BYPASS,
-                        js_code=js_commands,
+                        js_code=session.js_code,
                         delay_before_return_html=10
                     )
                 )
+                await session.check(result)
 
                 if result.success:
                     print(f"Successfully scraped page {page_number}!")
@@ -12,10 +12,35 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 from utils.emploi import EmploiUtils
 
 try:
-    from insert2db.insert_scrape import insert_data_to_es
+    from scraper.crawler.browser_pool import lease_crawler
 except ImportError:
-    def insert_data_to_es(data, index):
-        print(f"[Mock] Inserted into '{index}' -> {data['titre']}")
+    def lease_crawler(browser_config, **kwargs):
+        return AsyncWebCrawler(verbose=False, config=browser_config)
+
+try:
+    from scraper.crawler.session_state import SiteSession
+except ImportError:
+    class SiteSession:
+        def __init__(self, domain, browser_config, js_code=None):
+            self.browser_config = browser_config
+            self.js_code = js_code
+            self.hooks = {}
+
+        async def check(self, result):
+            return False
+
+try:
+    from insert2db.insert_scrape import insert_data_to_es, insert_data_to_es_async
+except ImportError:
+    try:
+        # No Elasticsearch client here: spool the document for a process that has one
+        from core.spool import spool_document as insert_data_to_es
+    except ImportError:
+        def insert_data_to_es(data, index):
+            print(f"[Mock] Inserted into '{index}' -> {data['titre']}")
+
+    async def insert_data_to_es_async(*args, **kwargs):
+        return await asyncio.to_thread(insert_data_to_es, *args, **kwargs)
 
 # ====================== MAIN SCRAPING FUNCTION ======================
 
@@ -29,14 +54,17 @@ async def scrape_single_url_with_crawl4ai_and_bs4(url, date_depot, employeur, po
         "await new Promise(r => setTimeout(r, 3000));",
     ]
 
+    # Consent JS only runs until the cookie state is cached
+    session = SiteSession("emploitic.com", browser_config, js_code=js_commands)
     config = CrawlerRunConfig(
         cache_mode=CacheMode.BYPASS,
-        js_code=js_commands,
+        js_code=session.js_code,
         delay_before_return_html=12
     )
 
-    async with AsyncWebCrawler(verbose=False, config=browser_config) as crawler:
+    async with lease_crawler(session.browser_config, hooks=session.hooks) as crawler:
         result = await crawler.arun(url=url, config=config)
+        await session.check(result)
 
         if not result.success:
             print(f"Failed to load {url}: {result.error_message}")
@@ -147,4 +175,4 @@ async def scrape_single_url_with_crawl4ai_and_bs4(url, date_depot, employeur, po
         }
 
         print(json.dumps(job, indent=2, ensure_ascii=False))
-        insert_data_to_es(job, "emploi")
\ No newline at end of file
+        await insert_data_to_es_async(job, "emploi")
\ No newline at end of file
@@ -14,6 +14,12 @@ except ImportError:
     print("Error: Could not import extract_job_details from scrape_details.py")
     sys.exit(1)
 
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
 async def scrape_listing_page(url="https://globaljobd-dz.com/offres"):
     """Scrape job listing page to extract all job URLs"""
     browser_config = BrowserConfig(
@@ -40,7 +46,7 @@ async def scrape_listing_page(url="https://globaljobd-dz.com/offres"):
         """
     ]
     
-    async with AsyncWebCrawler(config=browser_config) as crawler:
+    async with lease_crawler(browser_config) as crawler:
         result = await crawler.arun(
             url=url,
             config=CrawlerRunConfig(
@@ -4,6 +4,12 @@ from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
 from bs4 import BeautifulSoup
 from scrape_details import extract_job_details
 
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
 # Global list for detail page URLs
 all_urls = []
 
@@ -19,7 +25,7 @@ async def scrape_listing_pages():
     # Step 1: Load the parent page to get the iframe URL
     parent_url = "https://halkorb-rh.com/offre-demploi"
     print(f"Loading parent listing page: {parent_url}")
-    async with AsyncWebCrawler(config=browser_config) as crawler:
+    async with lease_crawler(browser_config) as crawler:
         parent_result = await crawler.arun(
             url=parent_url,
             config=CrawlerRunConfig(
@@ -49,7 +55,7 @@ async def scrape_listing_pages():
     ]
     
     print(f"Loading listing page: {listing_url}")
-    async with AsyncWebCrawler(config=browser_config) as crawler:
+    async with lease_crawler(browser_config) as crawler:
         result = await crawler.arun(
             url=listing_url,
             config=CrawlerRunConfig(
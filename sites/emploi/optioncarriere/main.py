@@ -4,6 +4,12 @@ from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
 from bs4 import BeautifulSoup
 from scrape_details import extract_job_details
 
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
 # Global list to collect {url, location} dicts
 job_entries = []
 
@@ -18,7 +24,7 @@ async def scrape_listing_pages():
     while True:
         listing_url = f"https://www.optioncarriere.dz/emploi?s=&l=Alg%C3%A9rie&p={page}"
         print(f"Loading listing page: {listing_url}")
-        async with AsyncWebCrawler(config=browser_config) as crawler:
+        async with lease_crawler(browser_config) as crawler:
             result = await crawler.arun(
                 url=listing_url,
                 config=CrawlerRunConfig(
@@ -17,6 +17,12 @@ from scraper.crawler.crawler_runner import crawl
 from scraper.browser.fingerprint import build_context
 from scraper.utils.logger import get_logger
 
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
 # ========================= CONFIG =========================
 log = get_logger("main_scraper_emploi_demandes")
 
@@ -78,7 +84,7 @@ async def scrape_listing_page(page_num, sem, proxy_manager):
         )
 
         try:
-            async with AsyncWebCrawler(config=browser_config) as crawler:
+            async with lease_crawler(browser_config) as crawler:
                 result = await crawler.arun(
                     url=url,
                     config=CrawlerRunConfig(
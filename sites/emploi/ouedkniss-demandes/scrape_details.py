@@ -6,7 +6,7 @@ import json
 import asyncio
 import sys
 import re
-from insert2db.insert_scrape import insert_data_to_es
+from insert2db.insert_scrape import insert_data_to_es_async
 
 def traitement_prix(prix_dec, prix_unit):
     conversion = {"Millions": 10000, "Milliards": 10000000}
@@ -398,7 +398,7 @@ async def scrape_single_url(target_url, max_retries=3, retry_delay=5):
 
                 if not is_essential_data_empty(emploi_data):
                     print(json.dumps(emploi_data, indent=2))
-                    insert_data_to_es(emploi_data, index_name="emploi")
+                    await insert_data_to_es_async(emploi_data, index_name="emploi")
                     return
 
         await asyncio.sleep(retry_delay)
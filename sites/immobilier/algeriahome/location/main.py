@@ -4,6 +4,12 @@ from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
 from bs4 import BeautifulSoup
 from scrape_details import extract_property_details
 
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
 # Global list to collect detail page URLs
 all_urls = []
 
@@ -18,7 +24,7 @@ async def scrape_listing_pages():
     while True:
         url = f"https://www.algeriahome.com/a-louer/{page}"
         print(f"Loading listing page: {url}")
-        async with AsyncWebCrawler(config=browser_config) as crawler:
+        async with lease_crawler(browser_config) as crawler:
             result = await crawler.arun(
                 url=url,
                 config=CrawlerRunConfig(
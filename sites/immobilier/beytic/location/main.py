@@ -5,6 +5,13 @@ from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
 from scrape_details import extract_property_details
 from bs4 import BeautifulSoup
 import sys
+
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
 sys.setrecursionlimit(10000)
 
 location_results = []
@@ -25,7 +32,7 @@ async def get_total_pages(transaction):
         browser_type="chromium",
     )
 
-    async with AsyncWebCrawler(config=browser_config) as crawler:
+    async with lease_crawler(browser_config) as crawler:
         result = await crawler.arun(
             url=url,
             config=CrawlerRunConfig(
@@ -72,7 +79,7 @@ async def scrape_page(page_number, transaction):
         browser_type="chromium",
     )
 
-    async with AsyncWebCrawler(config=browser_config) as crawler:
+    async with lease_crawler(browser_config) as crawler:
         # Scrape the page for name, location, and URL
         result = await crawler.arun(
             url=url,
@@ -13,8 +13,19 @@ from utils.immobilier import ImmobilierUtils
 try:
     from insert2db.insert_scrape import insert_data_to_es
 except ImportError:
-    def insert_data_to_es(data, index):
-        print(f"[Mock] Inserting data to ES index '{index}'")
+    try:
+        # No Elasticsearch client here: spool the document for a process that has one
+        from core.spool import spool_document as insert_data_to_es
+    except ImportError:
+        def insert_data_to_es(data, index):
+            print(f"[Mock] Inserting data to ES index '{index}'")
+
+try:
+    from scraper.crawler.tiered_fetcher import fetch_page
+except ImportError:
+    async def fetch_page(url, site_key, browser_config=None, run_config=None, proxy=None):
+        async with AsyncWebCrawler(config=browser_config) as crawler:
+            return await crawler.arun(url=url, config=run_config)
 
 def parse_address(address_text):
     parts = address_text.split(",")
@@ -46,14 +57,15 @@ async def extract_property_details(url):
         text_mode=False
     )
     
-    async with AsyncWebCrawler(config=browser_config) as crawler:
-        result = await crawler.arun(
-            url=url,
-            config=CrawlerRunConfig(
-                cache_mode=CacheMode.BYPASS,
-                delay_before_return_html=10
-            )
-        )
+    result = await fetch_page(
+        url,
+        "immobilier/essekna",
+        browser_config,
+        CrawlerRunConfig(
+            cache_mode=CacheMode.BYPASS,
+            delay_before_return_html=10,
+        ),
+    )
     
     if not result.success:
         raise Exception(f"Failed to load detail page: {result.error_message}")
@@ -6,6 +6,13 @@ from crawl4ai import AsyncWebCrawler, CrawlerRunConfig, CacheMode, BrowserConfig
 from crawl4ai.extraction_strategy import JsonCssExtractionStrategy
 from scrape_details import extract_property_details
 import sys
+
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
 sys.setrecursionlimit(10000)
 
 async def scrape_main_page():
@@ -79,7 +86,7 @@ async def scrape_main_page():
         verbose=True,
         browser_type="chromium",
     )
-    async with AsyncWebCrawler(config=browser_config) as crawler:
+    async with lease_crawler(browser_config) as crawler:
         all_data = []  # Initialize a list to collect data from all pages
         url = "https://www.hebdoimmobilier-dz.com/search-results/?type%5B0%5D&status%5B0%5D&states%5B0%5D&location%5B0%5D&keyword="  # Starting URL
 
@@ -5,6 +5,18 @@ from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
 from bs4 import BeautifulSoup
 from .scrape_details import extract_property_details
 
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
+try:
+    from scraper.crawler.readiness import readiness_kwargs
+except ImportError:
+    def readiness_kwargs(category, site, page="detail", fallback_delay=5.0):
+        return {"delay_before_return_html": fallback_delay}
+
 # ===================== OUTPUT CONFIG =====================
 OUTPUT_DIR = "immobilier/krello"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -84,7 +96,7 @@ async def scrape_all_listings():
         )
     )
 
-    async with AsyncWebCrawler(config=browser_config) as crawler:
+    async with lease_crawler(browser_config) as crawler:
         print("🚀 Opening browser and loading all Krello listings...\n")
 
         result = await crawler.arun(
@@ -92,7 +104,7 @@ async def scrape_all_listings():
             config=CrawlerRunConfig(
                 cache_mode=CacheMode.BYPASS,
                 js_code=[js_load_all],
-                delay_before_return_html=90,
+                **readiness_kwargs("immobilier", "krello", "listing", fallback_delay=90),
                 page_timeout=120_000,  # allow long JS execution
             )
         )
@@ -1,4 +1,5 @@
 import asyncio
+import base64
 from datetime import datetime
 from urllib.parse import unquote
 from bs4 import BeautifulSoup
@@ -12,10 +13,28 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 from utils.immobilier import ImmobilierUtils
 
 try:
-    from insert2db.insert_scrape import insert_data_to_es
+    from insert2db.insert_scrape import insert_data_to_es, insert_data_to_es_async
 except ImportError:
-    def insert_data_to_es(data, index_name):
-        print(f"[Mock ES] Saved to '{index_name}' → {data.get('titre', 'No title')[:70]}...")
+    try:
+        # No Elasticsearch client here: spool the document for a process that has one
+        from core.spool import spool_document as insert_data_to_es
+    except ImportError:
+        def insert_data_to_es(data, index_name):
+            print(f"[Mock ES] Saved to '{index_name}' → {data.get('titre', 'No title')[:70]}...")
+
+    async def insert_data_to_es_async(*args, **kwargs):
+        return await asyncio.to_thread(insert_data_to_es, *args, **kwargs)
+
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
+try:
+    from scraper.crawler.response_capture import JsonMapper, capture_json, find_dict
+except ImportError:
+    JsonMapper, capture_json, find_dict = object, None, None
 
 def convert_property_type(raw_key):
     valid_types = {
@@ -37,6 +56,106 @@ def convert_property_type(raw_key):
 
     return ""
 
+# ===================== JSON CAPTURE =====================
+# Krello is a Next.js front-end: listing data arrives as JSON from its API /
+# `_next/data` routes. When the listing of the requested URL is captured, the
+# record is built from it; otherwise the DOM of the same page load is parsed.
+#
+# Detail URLs end with the listing ID in base64
+# (".../oum-el-bouaghi-ain-fekroun-1000-dzd-MTI0NzY=" -> "12476"): only the
+# object carrying that `id` is mapped, never a "similar listings" entry. The
+# mapper reads one key per field and requires `id`, `title` and `price`; a
+# payload without them is a miss, not something to guess from.
+
+LISTING_KEYS = ("id", "title", "price")
+
+
+def listing_id_from_url(url):
+    """Listing ID encoded at the end of a Krello detail URL (None if absent)."""
+    slug = unquote(url.split("?", 1)[0].split("#", 1)[0].rstrip("/").rsplit("/", 1)[-1])
+    token = slug.rsplit("-", 1)[-1]
+    try:
+        decoded = base64.b64decode(token + "=" * (-len(token) % 4), validate=True).decode("ascii")
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return decoded if decoded.isdigit() else None
+
+
+def listing_json_to_property(data, url):
+    """Build the same dict as the DOM parser from a Krello listing object."""
+    now_iso = datetime.now().isoformat()
+    titre = str(data["title"]).strip()
+
+    transaction = "Location" if str(data.get("transactionType") or "").lower() == "rent" else "Vente"
+    bien = ImmobilierUtils.convert_property_type(str(data.get("propertyType") or ""))
+
+    price = data["price"]
+    price_dec = float(price) if isinstance(price, (int, float)) else 0
+    price_text = f"{price_dec:,.0f} DZD".replace(",", " ") if price_dec else ""
+
+    commune = str(data.get("commune") or "")
+    wilaya = str(data.get("wilaya") or "")
+    images = [img for img in data.get("images") or [] if isinstance(img, str)]
+    surface = data.get("surface")
+
+    return {
+        "titre": titre,
+        "url": url,
+        "site_origine": "Krello.net",
+        "date_crawl": now_iso,
+        "numero": "",
+        # First-seen field: kept from the stored document on later writes
+        "date_depot": data.get("createdAt") or now_iso,
+        "transaction": transaction,
+        "category": "immobilier",
+        "bien": bien,
+        "superficie": float(surface) if isinstance(surface, (int, float)) else "",
+        "superficie_unit": "m²",
+        "no_pieces": str(data.get("rooms") or ""),
+        "description": str(data.get("description") or "").strip(),
+        "prix": price_text,
+        "prix_dec": price_dec,
+        "prix_unit": "DA",
+        "images": images,
+        "adresse": ", ".join(p for p in (commune, wilaya) if p),
+        "wilaya": wilaya,
+        "commune": commune,
+        "etage": str(data.get("floor") or ""),
+        "status": 200,
+        "date_verif": now_iso,
+        "as_photo": "Avec photo" if images else "Sans photo",
+        "as_prix": "Avec prix" if price_dec else "Sans prix",
+    }
+
+
+class KrelloListingMapper(JsonMapper):
+    """Maps the listing JSON of a Krello detail page."""
+    url_pattern = r"(?:api\.krello\.net/|krello\.net/(?:[a-z]{2}/)?(?:api|_next/data)/)"
+    timeout = 15.0
+
+    def __init__(self, url):
+        self.url = url
+        self.listing_id = listing_id_from_url(url)
+
+    def _listing(self, response):
+        if self.listing_id is None:
+            return None
+        return find_dict(
+            response.data,
+            lambda d: all(key in d for key in LISTING_KEYS) and str(d["id"]) == self.listing_id,
+        )
+
+    def ready(self, responses):
+        return any(self._listing(response) for response in responses)
+
+    def map(self, responses):
+        for response in responses:
+            listing = self._listing(response)
+            if listing:
+                return [listing_json_to_property(listing, self.url)]
+        return []
+
+
 async def extract_property_details(url):
     browser_config = BrowserConfig(
         headless=True,
@@ -45,19 +164,42 @@ async def extract_property_details(url):
         user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
     )
 
-    async with AsyncWebCrawler(config=browser_config) as crawler:
-        result = await crawler.arun(
-            url=url,
-            config=CrawlerRunConfig(
-                cache_mode=CacheMode.BYPASS,
-                delay_before_return_html=8
-            )
-        )
+    property_details = None
+    captured = None
+    if capture_json is not None:
+        captured = await capture_json(url, KrelloListingMapper(url), browser_config=browser_config)
+        if captured.items:
+            property_details = captured.items[0]
+
+    if property_details is None:
+        if captured is not None and captured.html:
+            # No listing JSON: the page loaded for the capture is parsed instead
+            html = captured.html
+        else:
+            async with lease_crawler(browser_config) as crawler:
+                result = await crawler.arun(
+                    url=url,
+                    config=CrawlerRunConfig(
+                        cache_mode=CacheMode.BYPASS,
+                        delay_before_return_html=8
+                    )
+                )
+            if not result.success:
+                raise Exception(f"Failed to load detail page: {result.error_message}")
+            html = result.html
+        property_details = property_from_html(html, url)
+
+    try:
+        await insert_data_to_es_async(property_details, index_name="immobilier")
+    except Exception as e:
+        print(f"[ES] Failed to insert: {e}")
 
-    if not result.success:
-        raise Exception(f"Failed to load detail page: {result.error_message}")
+    return property_details
 
-    soup = BeautifulSoup(result.html, "html.parser")
+
+def property_from_html(html, url):
+    """Parse a rendered Krello detail page."""
+    soup = BeautifulSoup(html, "html.parser")
 
     # Initialize
     titre = ""
@@ -287,10 +429,4 @@ async def extract_property_details(url):
         "as_prix": as_prix
     }
 
-    
-    try:
-        insert_data_to_es(property_details, index_name="immobilier")
-    except Exception as e:
-        print(f"[ES] Failed to insert: {e}")
-
     return property_details
\ No newline at end of file
@@ -7,6 +7,25 @@ from datetime import datetime
 import sys
 from insert2db.insert_scrape import insert_data_to_es
 import sys
+
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config, **kwargs):
+        return AsyncWebCrawler(config=browser_config)
+
+try:
+    from scraper.crawler.session_state import SiteSession
+except ImportError:
+    class SiteSession:
+        def __init__(self, domain, browser_config, js_code=None):
+            self.browser_config = browser_config
+            self.js_code = js_code
+            self.hooks = {}
+
+        async def check(self, result):
+            return False
+
 sys.setrecursionlimit(10000)
 
 all_results = []
@@ -146,7 +165,7 @@ async def get_total_pages():
         browser_type="chromium",
     )
 
-    async with AsyncWebCrawler(config=browser_config) as crawler:
+    async with lease_crawler(browser_config) as crawler:
         result = await crawler.arun(
             url=url,
             config=CrawlerRunConfig(
@@ -197,16 +216,19 @@ async def scrape_page(page_number):
         browser_type="chromium",
     )
 
-    async with AsyncWebCrawler(config=browser_config) as crawler:
+    # Consent JS only runs until the cookie state is cached
+    session = SiteSession("lkeria.com", browser_config, js_code=js_commands)
+    async with lease_crawler(session.browser_config, hooks=session.hooks) as crawler:
         # Scrape the page for name, location, and URL
         result = await crawler.arun(
             url=url,
             config=CrawlerRunConfig(
                 cache_mode=CacheMode.BYPASS,
-                js_code=js_commands,  # Inject the JS code to accept cookies
+                js_code=session.js_code,  # Inject the JS code to accept cookies
                 delay_before_return_html=10  # Wait for the page to settle
             )
         )
+        await session.check(result)
 
         if result.success:
 
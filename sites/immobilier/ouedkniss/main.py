@@ -8,10 +8,14 @@ This implements the three-zone architecture described in:
   - COLD zone           → full crawl at low frequency (backfill)
 
 Key ideas:
-  - All zones run concurrently, each with its own workers and schedule.
-  - All zones share a global URL‑ID deduplication cache stored in
-    `scraped_urls_cache.json` in this directory.
+  - All zones run concurrently, each on its own schedule (core/frontier.py).
+  - All zones share a global URL‑ID deduplication store
+    (core/seen_store.py, namespace "immobilier/ouedkniss"). The old
+    `scraped_urls_cache.json` in this directory is imported on first run.
   - Detail pages are fetched through Proxyium (see `scrape_details.py`).
+  - Visible ad cards (title, price, date) are fingerprinted in the card index
+    (core/card_index.py): an already scraped ad whose card changed (e.g. a
+    price drop) is opened again, an unchanged one is skipped.
 
 The goal is to keep this file very explicit and debuggable, with
 plenty of prints and comments so developers can reason about the flow.
@@ -19,14 +23,11 @@ plenty of prints and comments so developers can reason about the flow.
 
 import argparse
 import asyncio
-import json
 import os
 import re
 import random
 import sys
-from dataclasses import dataclass
-from datetime import datetime
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Dict, List, Optional, Tuple
 
 # Add the project root to sys.path
 # This script is in sites/immobilier/ouedkniss/, so root is 3 levels up
@@ -46,6 +47,11 @@ from scraper.utils.human_behavior import (
 )
 from scraper.proxy.proxy_sources import fetch_and_validate_proxies
 from scraper.proxy.proxy_manager import ProxyManager
+from scraper.crawler.session_state import get_session_state_cache
+from scraper.crawler.proxyium_gateway import close_proxyium_gateways, proxyium_stats
+from core.card_index import Card, CardChange
+from core.frontier import Frontier, Zone
+from core.seen_store import SeenStore, close_seen_stores, get_seen_store
 from scrape_details import scrape_single_url
 
 # ========================= GLOBAL CONFIG =========================
@@ -53,78 +59,79 @@ from scrape_details import scrape_single_url
 # Base listing URL for immobilier category.
 TARGET_URL_BASE = "https://www.ouedkniss.com/immobilier/"
 
-# Where we persist the deduplication cache
+# Legacy deduplication cache (JSON array), imported once into the seen-ID store
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DEDUP_CACHE_PATH = os.path.join(BASE_DIR, "scraped_urls_cache.json")
 
 # How many listing pages to fetch in one batch per zone cycle.
 LISTING_BATCH_SIZE = 5
 
-@dataclass
-class ZoneConfig:
-    """Static configuration for a single scraping zone."""
-    name: str                 # human readable name (e.g. "HOT")
-    internal_name: str        # internal tag (e.g. "REALTIME")
-    start_page: int           # first listing page to consider
-    end_page: Optional[int]   # last page (None = "until empty")
-    interval_seconds: int     # delay between runs in continuous mode
-    detail_workers: int       # concurrent detail scrapers for this zone (unused in behavioral)
-    listing_concurrency: int  # (unused in behavioral)
-    max_retries: int          # max retries per detail URL
-    retry_delay: float        # delay between retries (seconds)
-    throttle_delay: float     # delay between detail requests
-
-# Default zone configuration tuned for behavioral scraping.
-ZONES: Dict[str, ZoneConfig] = {
+# Zone tuning for behavioral scraping. The schedule itself (intervals, COLD
+# runs standing in for WARM) is handled by core.frontier.Frontier.
+ZONES: Dict[str, Zone] = {
     # 🔥 HOT / REALTIME zone: focus on the first page, very frequent.
-    "hot": ZoneConfig(
+    "hot": Zone(
         name="HOT",
-        internal_name="REALTIME",
         start_page=1,
         end_page=1,
-        interval_seconds=60,
-        detail_workers=1,
-        listing_concurrency=1,
-        max_retries=2,
+        interval=60,
+        retries=2,
         retry_delay=1.0,
-        throttle_delay=5.0,
+        throttle=5.0,
     ),
     # 🌤 WARM zone: full crawl, moderate pace.
-    "warm": ZoneConfig(
+    "warm": Zone(
         name="WARM",
-        internal_name="WARM",
         start_page=1,
         end_page=None,
-        interval_seconds=7200,
-        detail_workers=1,
-        listing_concurrency=1,
-        max_retries=3,
+        interval=7200,
+        retries=3,
         retry_delay=3.0,
-        throttle_delay=10.0,
+        throttle=10.0,
     ),
     # ❄ COLD zone: full backfill, slow and patient.
-    "cold": ZoneConfig(
+    "cold": Zone(
         name="COLD",
-        internal_name="COLD",
         start_page=1,
         end_page=None,
-        interval_seconds=604800,
-        detail_workers=1,
-        listing_concurrency=1,
-        max_retries=5,
+        interval=604800,
+        retries=5,
         retry_delay=5.0,
-        throttle_delay=20.0,
+        throttle=20.0,
     ),
 }
 
 class BehavioralBrowsingSession:
     """Encapsulates a human-like browsing session for a specific zone run."""
-    def __init__(self, zone: ZoneConfig, global_seen_ids: Set[str], proxy_manager: ProxyManager, max_ads_override: Optional[int] = None):
+    def __init__(self, zone: Zone, frontier: Frontier, proxy_manager: ProxyManager, max_ads_override: Optional[int] = None):
         self.zone = zone
-        self.global_seen_ids = global_seen_ids
+        # Zones run concurrently: IDs are claimed through the frontier so two
+        # sessions never open the same ad, and only saved ads are marked seen
+        self.frontier = frontier
+        self.global_seen_ids: SeenStore = frontier.seen
         self.proxy_manager = proxy_manager
         self.new_ads_scraped = 0
+        self.changed_ads_scraped = 0
         self.max_ads_per_session = max_ads_override or (15 if zone.name == "HOT" else 30)
+        self._settled: set = set()  # IDs whose card needs nothing this session
+
+    async def _eligible(self, card_el, href: str, listing_id: str) -> Optional[Tuple[Card, Optional[CardChange]]]:
+        """The visible card and its change, or None when the ad needs no detail fetch."""
+        if listing_id in self._settled or listing_id in self.frontier.in_flight:
+            return None
+        card = Card(url=href, **await card_el.evaluate(CARD_FIELDS_JS))
+        if card.fingerprint is None:
+            # Nothing to compare: the seen-ID store alone decides
+            return None if listing_id in self.global_seen_ids else (card, None)
+        change = self.frontier.cards.check(listing_id, card)
+        if change.status == "new" and listing_id in self.global_seen_ids:
+            # Scraped before the index knew it: the current card is the baseline
+            self.frontier.cards.record(listing_id, card, change)
+            change = CardChange("unchanged", change.fingerprint)
+        if change.status == "unchanged":
+            self._settled.add(listing_id)
+            return None
+        return card, change
 
     async def run(self):
         print(f"\n  [{self.zone.name}] Starting Behavioral Browsing Session...")
@@ -149,7 +156,10 @@ class BehavioralBrowsingSession:
                 context_options["proxy"] = {"server": proxy}
                 print(f"  [{self.zone.name}] Using proxy: {proxy}")
             
-            context = await browser.new_context(**context_options)
+            # Preload the saved locale/consent state (cookies + localStorage)
+            session_cache = get_session_state_cache()
+            session_state = session_cache.context_kwargs("ouedkniss.com")
+            context = await browser.new_context(**context_options, **session_state)
             page = await context.new_page()
             
             try:
@@ -157,18 +167,25 @@ class BehavioralBrowsingSession:
                 target_url = TARGET_URL_BASE if self.zone.start_page == 1 else f"{TARGET_URL_BASE}{self.zone.start_page}"
                 print(f"  [{self.zone.name}] Navigating directly to {target_url}...")
                 
-                await page.goto(f"{target_url}{'&' if '?' in target_url else '?'}lang=fr", wait_until='domcontentloaded')
+                response = await page.goto(f"{target_url}{'&' if '?' in target_url else '?'}lang=fr", wait_until='domcontentloaded')
                 
-                # Locale handling
-                await page.evaluate("""() => {
-                    localStorage.setItem('ok-auth-frame', JSON.stringify({ locale: 'fr' }));
-                    document.cookie = 'ok-locale=fr; path=/; domain=.ouedkniss.com';
-                }""")
-                
-                # Check for consent banner
-                try:
-                    await page.locator('button.fc-button.fc-cta-consent.fc-primary-button').click(timeout=5000)
-                except: pass
+                if session_state:
+                    # Drop the saved state if this context got blocked with it
+                    if await session_cache.check("ouedkniss.com", response.status if response else None, await page.content()):
+                        print(f"  [{self.zone.name}] Blocked with cached session state (invalidated)")
+                else:
+                    # Locale handling
+                    await page.evaluate("""() => {
+                        localStorage.setItem('ok-auth-frame', JSON.stringify({ locale: 'fr' }));
+                        document.cookie = 'ok-locale=fr; path=/; domain=.ouedkniss.com';
+                    }""")
+                    
+                    # Check for consent banner
+                    try:
+                        await page.locator('button.fc-button.fc-cta-consent.fc-primary-button').click(timeout=5000)
+                    except: pass
+                    
+                    await session_cache.save("ouedkniss.com", context)
                 
                 await simulate_reading(page, 3)
                 
@@ -190,14 +207,16 @@ class BehavioralBrowsingSession:
                         await human_scroll(page, 3)
                         continue
 
-                    # Find an interesting NEW ad
+                    # Find an interesting NEW (or changed) ad
                     eligible_cards = []
                     for card in cards:
                         href = await card.get_attribute('href')
                         if href:
                             listing_id = extract_listing_id_from_url(href)
-                            if listing_id and listing_id not in self.global_seen_ids:
-                                eligible_cards.append((card, href, listing_id))
+                            if listing_id:
+                                eligible = await self._eligible(card, href, listing_id)
+                                if eligible:
+                                    eligible_cards.append((card, href, listing_id, *eligible))
                     
                     if not eligible_cards:
                         # Check if we should move to next page or if we are at the end
@@ -214,28 +233,43 @@ class BehavioralBrowsingSession:
                         continue
 
                     # Pick an ad
-                    target_card, target_href, target_id = random.choice(eligible_cards[:5])
-                    
-                    print(f"  [{self.zone.name}] [Human] Interesting ad found: {target_id}")
-                    await target_card.scroll_into_view_if_needed()
-                    await human_delay(1, 2)
-                    await target_card.click()
-                    
-                    # Now on detail page
-                    await simulate_reading(page, random.randint(4, 9))
-                    
-                    real_ad_url = f"https://www.ouedkniss.com{target_href}" if target_href.startswith('/') else target_href
+                    target_card, target_href, target_id, target_fields, change = random.choice(eligible_cards[:5])
+                    refetch = change is not None and change.status == "changed"
+                    if not self.frontier.claim(target_id, refetch=refetch):
+                        continue  # Another zone took it meanwhile
                     
-                    # Call the detail scraper (Proxyium Mode: don't pass 'page')
-                    await scrape_single_url(
-                        real_ad_url,
-                        zone_name=self.zone.name,
-                        # page=page, # REMOVED: triggers separate Proxyium run
-                        proxy_manager=self.proxy_manager
-                    )
+                    saved = False
+                    try:
+                        print(f"  [{self.zone.name}] [Human] Interesting ad found: {target_id}")
+                        await target_card.scroll_into_view_if_needed()
+                        await human_delay(1, 2)
+                        await target_card.click()
+                        
+                        # Now on detail page
+                        await simulate_reading(page, random.randint(4, 9))
+                        
+                        real_ad_url = f"https://www.ouedkniss.com{target_href}" if target_href.startswith('/') else target_href
+                        
+                        # Call the detail scraper (Proxyium Mode: don't pass 'page')
+                        saved = await scrape_single_url(
+                            real_ad_url,
+                            zone_name=self.zone.name,
+                            # page=page, # REMOVED: triggers separate Proxyium run
+                            proxy_manager=self.proxy_manager
+                        )
+                    finally:
+                        # Unsaved ads stay eligible for the next pass
+                        self.frontier.release(target_id, scraped=saved)
                     
-                    self.global_seen_ids.add(target_id)
-                    self.new_ads_scraped += 1
+                    if saved:
+                        if change is not None:
+                            # Recorded only once saved: a failed ad is retried next pass
+                            self.frontier.cards.record(target_id, target_fields, change)
+                        if refetch:
+                            self.changed_ads_scraped += 1
+                        else:
+                            self.new_ads_scraped += 1
+                    self._settled.add(target_id)
                     ads_in_this_session += 1
                     
                     # Go back
@@ -255,13 +289,34 @@ class BehavioralBrowsingSession:
                 print(f"  [{self.zone.name}] Session Error: {e}")
             finally:
                 await browser.close()
-                print(f"  [{self.zone.name}] Session closed. Scraped {self.new_ads_scraped} new ads.")
+                self.frontier.cards.save()
+                print(
+                    f"  [{self.zone.name}] Session closed. Scraped {self.new_ads_scraped} new ads, "
+                    f"{self.changed_ads_scraped} changed."
+                )
 
         return self.new_ads_scraped
 
 
 # ========================= DEDUPLICATION =========================
 
+# Fingerprinted fields of an `a.o-announ-card-content` ad card. The displayed
+# date is relative ("il y a 3 heures") and would change every pass: only the
+# machine-readable <time datetime> is used.
+CARD_FIELDS_JS = """(el) => {
+    const text = (selector) => {
+        const node = el.querySelector(selector);
+        const value = node && node.innerText.trim();
+        return value || null;
+    };
+    const time = el.querySelector('time[datetime]');
+    return {
+        title: text('.o-announ-card-title') || text('h2') || text('h3'),
+        price: text('.o-announ-card-price') || text('.price'),
+        date: time ? (time.getAttribute('datetime').trim() || null) : null,
+    };
+}"""
+
 def extract_listing_id_from_url(url: str) -> Optional[str]:
     """
     Extract the unique numeric listing ID from an Ouedkniss URL.
@@ -286,77 +341,18 @@ def extract_listing_id_from_url(url: str) -> Optional[str]:
     return None
 
 
-def load_scraped_ids() -> Set[str]:
-    """Load previously scraped listing IDs from disk into a set."""
-    if not os.path.exists(DEDUP_CACHE_PATH):
-        print(f"[DEDUPE] No existing cache found at {DEDUP_CACHE_PATH} → starting fresh.")
-        return set()
-
-    try:
-        with open(DEDUP_CACHE_PATH, "r", encoding="utf-8") as f:
-            raw = json.load(f)
-        ids = {str(x) for x in raw}
-        print(f"[DEDUPE] Loaded {len(ids)} IDs from cache.")
-        return ids
-    except Exception as e:
-        print(f"[DEDUPE] Failed to load cache ({e}) → starting with empty set.")
-        return set()
-
-
-def save_scraped_ids(ids: Set[str]) -> None:
-    """Persist the dedup cache to disk as a JSON array of IDs."""
-    try:
-        tmp_path = DEDUP_CACHE_PATH + ".tmp"
-        with open(tmp_path, "w", encoding="utf-8") as f:
-            json.dump(sorted(ids), f, ensure_ascii=False)
-        os.replace(tmp_path, DEDUP_CACHE_PATH)
-        print(f"[DEDUPE] Saved {len(ids)} IDs to cache at {DEDUP_CACHE_PATH}.")
-    except Exception as e:
-        print(f"[DEDUPE] Failed to save cache: {e}")
-
-
 # ========================= LISTING SCRAPING =========================
 
-async def run_zone(
-    zone_key: str,
-    global_seen_ids: Set[str],
-    proxy_manager: ProxyManager,
-    continuous: bool,
-    max_ads_override: Optional[int] = None
-) -> None:
+def make_zone_runner(proxy_manager: ProxyManager, max_ads_override: Optional[int] = None):
     """
-    Execute a single zone using a human-like behavioral session.
+    Frontier `run_zone` callback: one human-like behavioral session per zone run.
     """
-    zone = ZONES[zone_key]
-    run_index = 0
-
-    while True:
-        run_index += 1
-        run_started_at = datetime.now()
-        print(
-            f"\n========== [{zone.name}] RUN #{run_index} STARTED "
-            f"at {run_started_at.isoformat()} =========="
-        )
+    async def run_zone(zone: Zone, frontier: Frontier) -> int:
+        # IDs are persisted as they are released (frontier.seen is the seen-ID store)
+        session = BehavioralBrowsingSession(zone, frontier, proxy_manager, max_ads_override)
+        return await session.run()
 
-        session = BehavioralBrowsingSession(zone, global_seen_ids, proxy_manager, max_ads_override)
-        new_ids = await session.run()
-
-        run_ended_at = datetime.now()
-        elapsed = (run_ended_at - run_started_at).total_seconds()
-        print(
-            f"========== [{zone.name}] RUN #{run_index} FINISHED "
-            f"in {elapsed:.1f}s (new ads scraped: {new_ids}) =========="
-        )
-
-        # Persist dedup cache after each run
-        save_scraped_ids(global_seen_ids)
-
-        if not continuous:
-            break
-
-        sleep_for = max(zone.interval_seconds - elapsed, 0)
-        print(f"[{zone.name}] Sleeping {sleep_for:.1f}s before next run...")
-        await asyncio.sleep(sleep_for)
+    return run_zone
 
 
 # ========================= CLI & ENTRYPOINT =========================
@@ -444,27 +440,38 @@ async def async_main(args: argparse.Namespace) -> None:
         )
         print(
             f"  - {z.name} "
-            f"(internal={z.internal_name}, pages={pages_desc}, "
-            f"workers={z.detail_workers}, interval={z.interval_seconds}s)"
+            f"(pages={pages_desc}, interval={z.interval}s)"
         )
 
-    # Load dedup cache shared across all zones.
-    global_seen_ids = load_scraped_ids()
+    # Dedup store shared across all zones (and other processes scraping this site).
+    global_seen_ids = get_seen_store("immobilier/ouedkniss", legacy_path=DEDUP_CACHE_PATH)
+    print(f"[DEDUPE] {len(global_seen_ids)} IDs already scraped.")
 
-    # Launch each selected zone as its own async task.
-    zone_tasks = [
-        asyncio.create_task(run_zone(zone_key, global_seen_ids, manager, args.continuous, args.max_ads))
-        for zone_key in selected_zone_keys
-    ]
+    frontier = Frontier(
+        "immobilier/ouedkniss",
+        run_zone=make_zone_runner(manager, args.max_ads),
+        zones={key: ZONES[key] for key in selected_zone_keys},
+        seen=global_seen_ids,
+    )
 
     try:
-        await asyncio.gather(*zone_tasks)
+        if args.continuous:
+            # Each zone on its own interval (a due COLD run also counts as WARM)
+            await frontier.run_forever()
+        else:
+            await asyncio.gather(*[frontier.run_zone(key) for key in selected_zone_keys])
     except asyncio.CancelledError:
         # Propagate cancellation so KeyboardInterrupt can bubble up correctly.
         raise
     finally:
-        # Attempt one last save of dedup cache on shutdown.
-        save_scraped_ids(global_seen_ids)
+        # Compact the dedup store if due and release its files.
+        close_seen_stores()
+        for worker, stats in proxyium_stats().items():
+            print(
+                f"[PROXYIUM] {worker}: {stats['succeeded']}/{stats['urls']} URLs, "
+                f"p50={stats['latency_p50']}s p95={stats['latency_p95']}s, {stats['restarts']} restarts"
+            )
+        await close_proxyium_gateways()
         print("OuedKniss Hybrid Multi-Pass Scraper STOPPED.")
 
 
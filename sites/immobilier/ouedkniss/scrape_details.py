@@ -8,12 +8,6 @@ import random
 from typing import Dict, List, Optional, Set, Tuple, Any
 from bs4 import BeautifulSoup
 
-# Try to import crawl4ai for Proxyium-based scraping
-try:
-    from crawl4ai import AsyncWebCrawler, CrawlerRunConfig, CacheMode, BrowserConfig
-except ImportError:
-    AsyncWebCrawler = None
-
 # Ensure project root is on sys.path, then import the shared modules.
 # Script is in sites/immobilier/ouedkniss/, so root is 3 levels up.
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
@@ -23,6 +17,10 @@ if ROOT_DIR not in sys.path:
 from scraper.utils.human_behavior import human_delay, human_scroll, simulate_reading, human_mouse_move
 from scraper.proxy.proxy_manager import ProxyManager
 from scraper.extractor.detail_extractor import DetailExtractor
+from scraper.crawler.interception import apply_interception
+from scraper.crawler.response_capture import JsonMapper, capture_json, dig
+from scraper.crawler.session_state import get_session_state_cache
+from scraper.crawler.proxyium_gateway import get_proxyium_gateway
 from playwright.async_api import async_playwright
 try:
     from playwright_stealth import Stealth
@@ -46,15 +44,32 @@ debugging easier for developers:
 # don't want to generate local debug JSON files under the `junk_test` folder.
 # When True:
 #   - One JSONL line per listing is appended to `junk_test/scraped_ouedkniss.jsonl`
-#   - One pretty JSON file per listing is created in `junk_test/`
+#   - Each listing is appended to a rolling JSONL segment in `junk_test/immobilier/ouedkniss/`
 #
 DEBUG_SAVE_LOCAL = True
 
+#
+# JSON CAPTURE MODE
+# -----------------
+# The Ouedkniss front-end loads each announcement from its GraphQL API. When
+# True, the direct (custom proxy) path records that response and builds the
+# listing from it - no reading delays, no HTML parsing. If nothing usable is
+# captured, the page is read and parsed from the DOM as before.
+#
+USE_JSON_CAPTURE = True
+
 try:
-    from insert2db.insert_scrape import insert_data_to_es
+    from insert2db.insert_scrape import insert_data_to_es, insert_data_to_es_async
 except ImportError:
-    def insert_data_to_es(data, index):
-        print(f"[Mock] there is a problem in saving data '{index}'")
+    try:
+        # No Elasticsearch client here: spool the document for a process that has one
+        from core.spool import spool_document as insert_data_to_es
+    except ImportError:
+        def insert_data_to_es(data, index):
+            print(f"[Mock] there is a problem in saving data '{index}'")
+
+    async def insert_data_to_es_async(*args, **kwargs):
+        return await asyncio.to_thread(insert_data_to_es, *args, **kwargs)
 
 try:
     # Shared real-estate helpers (normalization, saving, etc.).
@@ -228,10 +243,13 @@ async def scrape_single_url(
     zone_name: str = "UNKNOWN",
     page: Optional[Any] = None, # Allow passing an existing page
     proxy_manager: Optional[ProxyManager] = None, # Allow passing a proxy manager
-) -> None:
+) -> bool:
     """
     Scrape a single Ouedkniss detail page through Proxyium.
 
+    Returns True once the listing is saved, so the caller only marks saved
+    IDs as scraped.
+
     Parameters
     ----------
     target_url : str
@@ -255,62 +273,29 @@ async def scrape_single_url(
             await simulate_reading(page, random.randint(3, 7))
             await human_scroll(page, random.randint(1, 4))
             content = await page.content()
-            await _parse_and_save(content, target_url, zone_name)
-            return
+            return await _parse_and_save(content, target_url, zone_name)
         except Exception as e:
             print(f"  [ERROR] Manual detail scrape failed: {e}")
-            return
+            return False
 
-    # Proxyium Mode: Use crawl4ai or Playwright to navigate via Proxyium
+    # Proxyium Mode: submit the URL through this zone's warmed Proxyium session
     print(f"[DETAIL][{zone_name}] Proxyium Mode: Scraping {target_url} via Proxyium")
-    
-    # Proxyium URL where we "input" the target URL
-    proxyium_url = "https://proxyium.com/"
-    
-    # Navigation script for Proxyium
-    js_commands = [
-        f"await page.fill('input[name=\"url\"]', '{target_url}');",
-        "await page.click('button#btn-go');",
-        "await page.waitForNavigation({ waitUntil: 'networkidle' });",
-        # Locale handling inside Proxyium
-        "await page.evaluate(() => { localStorage.setItem('ok-auth-frame', JSON.stringify({ locale: 'fr' })); document.cookie = 'ok-locale=fr; path=/; domain=.ouedkniss.com'; });",
-        "await page.reload({ waitUntil: 'networkidle' });"
-    ]
+    gateway = get_proxyium_gateway(
+        zone_name,
+        wait_for="div.v-card-text.__description",  # Wait for a key element
+        # Locale handling inside Proxyium (once per session)
+        setup_js="() => { localStorage.setItem('ok-auth-frame', JSON.stringify({ locale: 'fr' })); document.cookie = 'ok-locale=fr; path=/; domain=.ouedkniss.com'; }",
+        site="immobilier/ouedkniss",
+    )
 
     for attempt in range(1, max_retries + 1):
-        try:
-            if AsyncWebCrawler is not None:
-                # Use crawl4ai if available
-                async with AsyncWebCrawler() as crawler:
-                    result = await crawler.arun(
-                        url=proxyium_url,
-                        config=CrawlerRunConfig(
-                            cache_mode=CacheMode.BYPASS,
-                            js_code=js_commands,
-                            wait_for="div.v-card-text.__description", # Wait for a key element
-                        )
-                    )
-                    if result.success:
-                        await _parse_and_save(result.html, target_url, zone_name)
-                        return # Success
-            else:
-                # Fallback to pure Playwright via Proxyium
-                async with async_playwright() as p:
-                    browser = await p.chromium.launch(headless=True)
-                    context = await browser.new_context()
-                    page_obj = await context.new_page()
-                    await page_obj.goto(proxyium_url)
-                    await page_obj.fill('input[name="url"]', target_url)
-                    await page_obj.click('button#btn-go')
-                    await page_obj.wait_for_load_state('networkidle')
-                    content = await page_obj.content()
-                    await _parse_and_save(content, target_url, zone_name)
-                    await browser.close()
-                    return # Success
-        except Exception as e:
-            print(f"  [Attempt {attempt}] Proxyium scrape failed: {e}")
-            if attempt < max_retries:
-                await asyncio.sleep(retry_delay)
+        result = await gateway.fetch(target_url)
+        if result.success:
+            print(f"  [{zone_name}] Proxyium page loaded in {result.elapsed:.1f}s ({result.via})")
+            return await _parse_and_save(result.html, target_url, zone_name)
+        print(f"  [Attempt {attempt}] Proxyium scrape failed: {result.error}")
+        if attempt < max_retries:
+            await asyncio.sleep(retry_delay)
                 
     print(f"[DETAIL][{zone_name}] Proxyium FAILED. Falling back to Custom Proxy...")
     
@@ -335,29 +320,55 @@ async def scrape_single_url(
             context_options["proxy"] = {"server": proxy}
             print(f"  [{zone_name}] [Fallback] Using custom proxy: {proxy}")
             
-        context = await browser.new_context(**context_options)
+        # Preload the saved locale/consent state (cookies + localStorage)
+        session_cache = get_session_state_cache()
+        session_state = session_cache.context_kwargs("ouedkniss.com")
+        context = await browser.new_context(**context_options, **session_state)
         page_obj = await context.new_page()
+        # Proxy bandwidth is precious: don't download images/fonts/media
+        await apply_interception(page_obj, site="immobilier/ouedkniss")
         
         try:
-            await page_obj.goto(f"{target_url}{'&' if '?' in target_url else '?'}lang=fr", wait_until='domcontentloaded')
-            # Locale & Consent
-            await page_obj.evaluate("() => { localStorage.setItem('ok-auth-frame', JSON.stringify({ locale: 'fr' })); document.cookie = 'ok-locale=fr; path=/; domain=.ouedkniss.com'; }")
-            try: await page_obj.locator('button.fc-button.fc-cta-consent.fc-primary-button').click(timeout=3000)
-            except: pass
+            localized_url = f"{target_url}{'&' if '?' in target_url else '?'}lang=fr"
+            if USE_JSON_CAPTURE:
+                captured = await capture_json(
+                    localized_url,
+                    OuedknissAnnouncementMapper(target_url),
+                    page=page_obj,
+                    goto_kwargs={"wait_until": "domcontentloaded", "timeout": 45000},
+                )
+                if captured.items and not is_essential_data_empty(captured.items[0]):
+                    print(f"  [{zone_name}] [Fallback] Captured announcement JSON in {captured.elapsed:.1f}s")
+                    saved = await _save_property(captured.items[0], zone_name)
+                    print(f"  [{zone_name}] [Fallback] SUCCESS via Custom Proxy (JSON)!")
+                    return saved
+                print(f"  [{zone_name}] [Fallback] JSON capture empty ({captured.error}), parsing DOM")
+            else:
+                await page_obj.goto(localized_url, wait_until='domcontentloaded')
+            if not session_state:
+                # Locale & Consent
+                await page_obj.evaluate("() => { localStorage.setItem('ok-auth-frame', JSON.stringify({ locale: 'fr' })); document.cookie = 'ok-locale=fr; path=/; domain=.ouedkniss.com'; }")
+                try: await page_obj.locator('button.fc-button.fc-cta-consent.fc-primary-button').click(timeout=3000)
+                except: pass
+                await session_cache.save("ouedkniss.com", context)
             
             await simulate_reading(page_obj, 5)
             await human_scroll(page_obj, 3)
             
             content = await page_obj.content()
-            await _parse_and_save(content, target_url, zone_name)
+            if session_state and await session_cache.check("ouedkniss.com", None, content):
+                print(f"  [{zone_name}] [Fallback] Blocked with cached session state (invalidated)")
+            saved = await _parse_and_save(content, target_url, zone_name)
             print(f"  [{zone_name}] [Fallback] SUCCESS via Custom Proxy!")
+            return saved
         except Exception as fallback_e:
             print(f"  [{zone_name}] [Fallback] FAILED: {fallback_e}")
+            return False
         finally:
             await browser.close()
 
-async def _parse_and_save(html: str, target_url: str, zone_name: str) -> None:
-    """Helper to parse HTML and save to DB/JSON."""
+async def _parse_and_save(html: str, target_url: str, zone_name: str) -> bool:
+    """Helper to parse HTML and save to DB/JSON (True once saved)."""
     soup = BeautifulSoup(html, "html.parser")
 
     title = extract_text_or_default(soup, "h1.text-h5.text-capitalize")
@@ -746,33 +757,179 @@ async def _parse_and_save(html: str, target_url: str, zone_name: str) -> None:
         "as_prix": "Avec prix" if price_value else "Sans prix",
     }
 
-    if not is_essential_data_empty(property_data):
+    return await _save_property(property_data, zone_name)
+
+
+async def _save_property(property_data: dict, zone_name: str) -> bool:
+    """Save a parsed listing (local debug files + Elasticsearch). True once Elasticsearch has it."""
+    if is_essential_data_empty(property_data):
+        return False
+    print(
+        f"[DETAIL][{zone_name}] Successfully parsed listing → "
+        f"{property_data['titre'][:80]!r}"
+    )
+    # Optional local debug saves (JSONL + rolling segment) in `junk_test/`.
+    # Toggle with DEBUG_SAVE_LOCAL at the top of this file.
+    if DEBUG_SAVE_LOCAL:
+        save_to_json(property_data)
+        if ImmobilierUtils is not None:
+            try:
+                ImmobilierUtils.save_listing_file(property_data)
+            except Exception as e:
+                print(f"[DETAIL][{zone_name}] Failed to save listing file: {e}")
+
+    # Send to Elasticsearch immediately.
+    try:
+        # Interface aligned with documentation: insert_data_to_es(data, index)
+        saved = bool(await insert_data_to_es_async(property_data, index="immobilier"))
+    except Exception as e:
         print(
-            f"[DETAIL][{zone_name}] Successfully parsed listing → "
+            f"[DETAIL][{zone_name}] [ES] Failed to insert document: {e}"
+        )
+        return False
+    if saved:
+        print(
+            f"[DETAIL][{zone_name}] [ES] Inserted → "
             f"{property_data['titre'][:80]!r}"
         )
-        # Optional local debug saves (JSONL + pretty JSON) in `junk_test/`.
-        # Toggle with DEBUG_SAVE_LOCAL at the top of this file.
-        if DEBUG_SAVE_LOCAL:
-            save_to_json(property_data)
-            if ImmobilierUtils is not None:
-                try:
-                    ImmobilierUtils.save_listing_file(property_data)
-                except Exception as e:
-                    print(f"[DETAIL][{zone_name}] Failed to save listing file: {e}")
-
-        # Send to Elasticsearch immediately.
-        try:
-            # Interface aligned with documentation: insert_data_to_es(data, index)
-            insert_data_to_es(property_data, index="immobilier")
-            print(
-                f"[DETAIL][{zone_name}] [ES] Inserted → "
-                f"{property_data['titre'][:80]!r}"
-            )
-        except Exception as e:
-            print(
-                f"[DETAIL][{zone_name}] [ES] Failed to insert document: {e}"
-            )
+    return saved
+
+
+# ==================== JSON CAPTURE MAPPER ====================
+
+# API price units → the units used on the rendered page
+PRICE_UNITS = {"MILLION": "Millions", "BILLION": "Milliards", "MILLIARD": "Milliards"}
+
+
+def _spec_values(announcement: dict) -> Dict[str, Any]:
+    """Flatten announcement specs into {label: value} (label lower-cased)."""
+    values = {}
+    for spec in announcement.get("specs") or []:
+        label = dig(spec, "specification", "label") or spec.get("label") or ""
+        value = spec.get("valueText") or spec.get("value")
+        if label:
+            values[label.strip().lower()] = value
+    return values
+
+
+def _spec(values: Dict[str, Any], *labels: str) -> Any:
+    for wanted in labels:
+        for label, value in values.items():
+            if wanted in label:
+                return value
+    return ""
+
+
+def _as_list(value: Any) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, list):
+        return [str(v) for v in value if v]
+    return [str(value)]
+
+
+def announcement_to_property(ann: dict, target_url: str) -> dict:
+    """Build the same listing dict as `_parse_and_save` from a GraphQL announcement."""
+    now_iso = datetime.now().isoformat()
+    title = (ann.get("title") or "").strip()
+
+    description = ann.get("description") or ""
+    if "<" in description:
+        description = BeautifulSoup(description, "html.parser").get_text(separator="\n", strip=True)
+
+    price = ann.get("price")
+    price_value = f"{price:g}" if isinstance(price, (int, float)) else (str(price) if price else "")
+    price_unit = PRICE_UNITS.get(str(ann.get("priceUnit") or "").upper(), "")
+    price_dec = traitement_prix(price_value, price_unit or "DA") if price_value else ""
+
+    # "immobilier-vente-appartement" → transaction=Vente, bien=Appartement
+    slug_parts = (dig(ann, "category", "slug") or "").split("-")
+    slug_transaction = slug_parts[1].capitalize() if len(slug_parts) > 1 else ""
+    slug_bien = convert_property_type(" ".join(slug_parts[2:])) if len(slug_parts) > 2 else ""
+
+    city = (ann.get("cities") or [{}])[0] or {}
+    wilaya = dig(city, "region", "name") or ""
+    commune = city.get("name") or ""
+
+    images = []
+    for media in ann.get("medias") or []:
+        media_url = media.get("mediaUrl") if isinstance(media, dict) else media
+        if media_url and media_url not in images:
+            images.append(media_url)
+    if not images and dig(ann, "defaultMedia", "mediaUrl"):
+        images.append(dig(ann, "defaultMedia", "mediaUrl"))
+
+    specs = _spec_values(ann)
+    superficie = str(_spec(specs, "superficie") or "")
+    user_id = dig(ann, "user", "id")
+    phones = []
+    for phone in ann.get("phones") or []:
+        number = re.sub(r"\D", "", phone.get("phone", "") if isinstance(phone, dict) else str(phone))
+        if len(number) >= 9 and number not in phones:
+            phones.append(number)
+
+    created = ann.get("createdAt") or ""
+
+    return {
+        "titre": title,
+        "url": target_url,
+        "id": f"{target_url}|{now_iso}",
+        "site_origine": "Ouedkniss.com",
+        "categorie": "immobilier",
+        "category": "immobilier",
+        "date_crawl": now_iso,
+        "prix": f"{price_value} {price_unit}" if price_value and price_unit else "",
+        "prix_unit": "DA",
+        "prix_value": price_value,
+        "prix_dec": price_dec,
+        "description": description,
+        "bien": slug_bien or convert_property_type(str(_spec(specs, "type"))),
+        "numero": str(ann.get("id") or ""),
+        "date_depot": created.replace("Z", "") if created else "",
+        "nombre_vues": str(ann.get("views") or ""),
+        "nb_pieces": normalize_pieces(str(_spec(specs, "pièces", "pieces"))),
+        "superficie": superficie.split(" ")[0] if superficie else "",
+        "superficie_unit": superficie.split(" ")[-1] if " " in superficie else ("m²" if superficie else ""),
+        "papiers": _as_list(_spec(specs, "papiers")),
+        "specifications": _as_list(_spec(specs, "spécifications", "specifications")),
+        "images": images,
+        "etage": str(_spec(specs, "etage", "étage") or ""),
+        "transaction": slug_transaction or detect_transaction_from_title(title) or "Non spécifié",
+        "payment": _as_list(_spec(specs, "conditions de paiement")),
+        "adresse": ann.get("street_name") or ann.get("streetName") or "",
+        "wilaya": wilaya.strip(),
+        "commune": commune.strip(),
+        "status": "200",
+        "contact": {
+            "name": dig(ann, "user", "displayName") or dig(ann, "user", "username"),
+            "profile_link": f"https://www.ouedkniss.com/membre/{user_id}" if user_id else None,
+            "email": [],
+            "phones": phones,
+            "whatsapp": [],
+            "telegram": [],
+            "viber": [],
+        },
+        "as_photo": "Avec photo" if images else "Sans photo",
+        "date_verif": now_iso,
+        "as_prix": "Avec prix" if price_value else "Sans prix",
+    }
+
+
+class OuedknissAnnouncementMapper(JsonMapper):
+    """Maps the `AnnouncementGet` GraphQL response of a detail page to a listing."""
+    url_pattern = r"api\.ouedkniss\.com/graphql"
+    operations = {"AnnouncementGet"}
+    timeout = 20.0
+
+    def __init__(self, target_url: str):
+        self.target_url = target_url
+
+    def map(self, responses):
+        for response in responses:
+            announcement = dig(response.data, "data", "announcement")
+            if isinstance(announcement, dict) and announcement.get("title"):
+                return [announcement_to_property(announcement, self.target_url)]
+        return []
 
 
 # Manual test example (uncomment to debug a single URL):
@@ -13,8 +13,19 @@ from utils.immobilier import ImmobilierUtils
 try:
     from insert2db.insert_scrape import insert_data_to_es
 except ImportError:
-    def insert_data_to_es(data, index_name):
-        print(f"[Mock] Would insert into index '{index_name}': {data.get('titre', 'No title')}")
+    try:
+        # No Elasticsearch client here: spool the document for a process that has one
+        from core.spool import spool_document as insert_data_to_es
+    except ImportError:
+        def insert_data_to_es(data, index_name):
+            print(f"[Mock] Would insert into index '{index_name}': {data.get('titre', 'No title')}")
+
+try:
+    from scraper.crawler.tiered_fetcher import fetch_page
+except ImportError:
+    async def fetch_page(url, site_key, browser_config=None, run_config=None, proxy=None):
+        async with AsyncWebCrawler(config=browser_config) as crawler:
+            return await crawler.arun(url=url, config=run_config)
 
 def parse_address(address_details):
     adresse = ""
@@ -47,14 +58,15 @@ async def extract_property_details(url):
         user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
     )
     
-    async with AsyncWebCrawler(config=browser_config) as crawler:
-        result = await crawler.arun(
-            url=url,
-            config=CrawlerRunConfig(
-                cache_mode=CacheMode.BYPASS,
-                delay_before_return_html=5  # Reduced for speed; increase if page not fully loaded
-            )
-        )
+    result = await fetch_page(
+        url,
+        "immobilier/residencedz",
+        browser_config,
+        CrawlerRunConfig(
+            cache_mode=CacheMode.BYPASS,
+            delay_before_return_html=5,  # Reduced for speed; increase if page not fully loaded
+        ),
+    )
     
     if not result.success:
         raise Exception(f"Failed to load detail page: {result.error_message}")
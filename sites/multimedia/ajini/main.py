@@ -6,6 +6,12 @@ from bs4 import BeautifulSoup
 from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
 from scrape_details import scrape_product_details
 
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
 # Configuration
 BASE_URL = "https://www.ajini.com/product-category/tv-audio/"
 CSS_SELECTOR = "[class^='xs-product-wraper text-center']"
@@ -22,7 +28,7 @@ async def scrape_listing_page():
     
     product_urls = []
     
-    async with AsyncWebCrawler(config=browser_config) as crawler:
+    async with lease_crawler(browser_config) as crawler:
         result = await crawler.arun(
             url=BASE_URL,
             config=CrawlerRunConfig(
@@ -16,6 +16,12 @@ from crawl4ai.async_configs import LlmConfig
 from models.tv import Tv
 from utils.data_utils import is_complete_tv, is_duplicate_tv
 
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
 load_dotenv()
 
 
@@ -83,7 +89,7 @@ async def crawl_tv_product_page(url: str) -> dict:
     """Crawl a single TV product page and extract the image and other data."""
     browser_config = get_browser_config()
 
-    async with AsyncWebCrawler(config=browser_config) as crawler:
+    async with lease_crawler(browser_config) as crawler:
         # Adjust the CSS_SELECTOR_PRODUCT to match the image URL extraction
         result = await crawler.arun(
             url=url,
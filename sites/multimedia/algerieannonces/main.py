@@ -5,6 +5,12 @@ from bs4 import BeautifulSoup
 from scrape_details import extract_item_details
 from urllib.parse import quote
 
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
 # Global list to collect detail page URLs and their corresponding dates
 all_urls_with_dates = []
 
@@ -20,7 +26,7 @@ async def scrape_listing_pages():
         url = f"https://www.algerieannonces.com/categorie/306/Multim%C3%A9dia/{page}.html"
         print(f"Loading listing page: {url}")
         
-        async with AsyncWebCrawler(config=browser_config) as crawler:
+        async with lease_crawler(browser_config) as crawler:
             result = await crawler.arun(
                 url=url,
                 config=CrawlerRunConfig(
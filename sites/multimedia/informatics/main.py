@@ -6,6 +6,12 @@ from bs4 import BeautifulSoup
 from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
 from scrape_details import scrape_product_details
 
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
 # Configuration - can handle both categories
 CATEGORIES = {
     "desktop_pc": "https://www.informatics.dz/pc-de-bureau/",
@@ -24,7 +30,7 @@ async def scrape_category_listing(category_name, category_url):
     
     product_urls = []
     
-    async with AsyncWebCrawler(config=browser_config) as crawler:
+    async with lease_crawler(browser_config) as crawler:
         result = await crawler.arun(
             url=category_url,
             config=CrawlerRunConfig(
@@ -8,6 +8,12 @@ from scrape_details import extract_product_details
 from urllib.parse import urljoin
 import uuid
 
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
 # Global lists to collect URLs
 category_urls_list = []
 product_urls_list = []
@@ -27,7 +33,7 @@ async def scrape_category_pages():
     
     print(f"▶ Loading category page: {base_url}")
     
-    async with AsyncWebCrawler(config=browser_config) as crawler:
+    async with lease_crawler(browser_config) as crawler:
         result = await crawler.arun(
             url=base_url,
             config=CrawlerRunConfig(
@@ -82,7 +88,7 @@ async def scrape_listing_pages(category_urls):
     for url in category_urls:
         print(f"▶ Loading listing page: {url}")
         
-        async with AsyncWebCrawler(config=browser_config) as crawler:
+        async with lease_crawler(browser_config) as crawler:
             result = await crawler.arun(
                 url=url,
                 config=CrawlerRunConfig(
@@ -145,7 +151,7 @@ async def scrape_seller_urls(product_urls):
     for url in product_urls:
         print(f"▶ Loading product page for seller URLs: {url}")
         
-        async with AsyncWebCrawler(config=browser_config) as crawler:
+        async with lease_crawler(browser_config) as crawler:
             result = await crawler.arun(
                 url=url,
                 config=CrawlerRunConfig(
@@ -11,6 +11,12 @@ from crawl4ai import (
 from bs4 import BeautifulSoup
 from scrape_details import extract_car_details  # your detail‐page extractor
 
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
 async def scrape_listing_pages():
     page = 1
     all_urls = []
@@ -27,7 +33,7 @@ async def scrape_listing_pages():
         )
         print(f"→ Loading page {page}: {listing_url}")
 
-        async with AsyncWebCrawler(config=browser_config) as crawler:
+        async with lease_crawler(browser_config) as crawler:
             result = await crawler.arun(
                 url=listing_url,
                 config=CrawlerRunConfig(
@@ -16,8 +16,19 @@ from utils.voiture import VoitureUtils
 try:
     from insert2db.insert_scrape import insert_data_to_es
 except ImportError:
-    def insert_data_to_es(data, index):
-        print(f"[Mock] there is a problem in saving data'{index}'")
+    try:
+        # No Elasticsearch client here: spool the document for a process that has one
+        from core.spool import spool_document as insert_data_to_es
+    except ImportError:
+        def insert_data_to_es(data, index):
+            print(f"[Mock] there is a problem in saving data'{index}'")
+
+try:
+    from scraper.crawler.tiered_fetcher import fetch_page
+except ImportError:
+    async def fetch_page(url, site_key, browser_config=None, run_config=None, proxy=None):
+        async with AsyncWebCrawler(config=browser_config) as crawler:
+            return await crawler.arun(url=url, config=run_config)
 
 BASE_URL = "https://www.algerieannonces.com/"
 
@@ -60,14 +71,15 @@ async def extract_car_details(url):
             "Chrome/91.0.4472.124 Safari/537.36"
         )
     )
-    async with AsyncWebCrawler(config=browser_config) as crawler:
-        result = await crawler.arun(
-            url=url,
-            config=CrawlerRunConfig(
-                cache_mode=CacheMode.BYPASS,
-                delay_before_return_html=15
-            )
-        )
+    result = await fetch_page(
+        url,
+        "voiture/algerieannonces",
+        browser_config,
+        CrawlerRunConfig(
+            cache_mode=CacheMode.BYPASS,
+            delay_before_return_html=15,
+        ),
+    )
     if not result.success:
         raise Exception(f"Failed to load page: {result.error_message}")
 
@@ -8,6 +8,12 @@ except ImportError as e:
     print(f"Error importing scrape_details: {e}")
     raise
 
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
 # Global list to collect detail page URLs
 all_urls = []
 
@@ -24,7 +30,7 @@ async def scrape_listing_pages():
         # Pagination URL for Autobessah.fr
         url = f"https://www.autobessah.fr/voiture-moins-de-3-ans-algerie?ep%5B210193371%5D%5Bpage%5D={page}&ep%5B210193371%5D%5Bsort%5D=created-desc"
         print(f"Loading listing page: {url}")
-        async with AsyncWebCrawler(config=browser_config) as crawler:
+        async with lease_crawler(browser_config) as crawler:
             try:
                 result = await crawler.arun(
                     url=url,
@@ -8,6 +8,12 @@ except ImportError as e:
     print(f"Error importing scrape_details: {e}")
     raise
 
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
 # Global list to collect detail page URLs
 all_urls = []
 
@@ -24,7 +30,7 @@ async def scrape_listing_pages():
         # Pagination URL for AutoCango.com
         url = f"https://www.autocango.com/usedcar/energyType=Petrol/minYear=2023/seedId=94401ccaa245aced94401ccaa245aced?page={page}"
         print(f"Loading listing page: {url}")
-        async with AsyncWebCrawler(config=browser_config) as crawler:
+        async with lease_crawler(browser_config) as crawler:
             try:
                 result = await crawler.arun(
                     url=url,
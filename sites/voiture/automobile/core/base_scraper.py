@@ -1,4 +1,5 @@
 import asyncio
+import dataclasses
 import logging
 from abc import ABC, abstractmethod
 from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
@@ -9,6 +10,9 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(level
 logger = logging.getLogger(__name__)
 
 class BaseScraper(ABC):
+    # Optional default readiness profile (scraper.crawler.readiness.ReadinessProfile)
+    readiness = None
+
     def __init__(self, base_url):
         self.base_url = base_url
         self.config = Config()
@@ -31,7 +35,7 @@ class BaseScraper(ABC):
         if self.crawler:
             await self.crawler.close()
 
-    async def scrape_page(self, url, css_selector=None, js_code=None, wait_for=None):
+    async def scrape_page(self, url, css_selector=None, js_code=None, wait_for=None, readiness=None):
         """
         Generic method to scrape a single page.
         
@@ -40,6 +44,10 @@ class BaseScraper(ABC):
             css_selector (str, optional): A CSS selector to wait for.
             js_code (str, optional): JavaScript code to execute on the page.
             wait_for (str, optional): CSS selector to wait for before returning.
+            readiness (ReadinessProfile, optional): Adaptive readiness profile used
+                instead of the fixed DELAY_BEFORE_RETURN_HTML (defaults to self.readiness).
+                A CSS `wait_for` / `css_selector` becomes the profile's required
+                selector; a `js:` condition cannot be combined with a profile.
             
         Returns:
             The result object from crawl4ai.
@@ -47,11 +55,29 @@ class BaseScraper(ABC):
         if not self.crawler:
             await self.start_session()
 
+        readiness = readiness or self.readiness
+        selector = wait_for or css_selector
+        if readiness is not None:
+            if selector:
+                if selector.startswith("js:"):
+                    raise ValueError("A js: wait_for cannot be combined with a readiness profile")
+                selector = selector[len("css:"):] if selector.startswith("css:") else selector
+                if readiness.selector and readiness.selector != selector:
+                    raise ValueError(
+                        f"wait_for {selector!r} conflicts with the readiness selector {readiness.selector!r}"
+                    )
+                readiness = dataclasses.replace(readiness, selector=selector)
+            wait_kwargs = readiness.run_config_kwargs()
+        else:
+            wait_kwargs = {
+                "delay_before_return_html": self.config.DELAY_BEFORE_RETURN_HTML / 1000, # Convert to seconds
+                "wait_for": selector,
+            }
+
         run_config = CrawlerRunConfig(
             cache_mode=getattr(CacheMode, self.config.CACHE_MODE, CacheMode.BYPASS),
-            delay_before_return_html=self.config.DELAY_BEFORE_RETURN_HTML / 1000, # Convert to seconds
             js_code=js_code,
-            wait_for=wait_for or css_selector
+            **wait_kwargs
         )
 
         try:
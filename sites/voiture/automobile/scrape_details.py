@@ -16,9 +16,12 @@ from utils.voiture import VoitureUtils
 try:
     from insert2db.insert_scrape import insert_data_to_es
 except ImportError:
-
-    def insert_data_to_es(data, index):
-        print(f"[Mock] Inserting data to ES index '{index}'")
+    try:
+        # No Elasticsearch client here: spool the document for a process that has one
+        from core.spool import spool_document as insert_data_to_es
+    except ImportError:
+        def insert_data_to_es(data, index):
+            print(f"[Mock] Inserting data to ES index '{index}'")
 
 
 class MobileScraper(BaseScraper):
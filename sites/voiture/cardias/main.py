@@ -6,6 +6,12 @@ from scrape_details import extract_car_details  # Ensure this function is implem
 import sys
 from insert2db.insert_scrape import insert_data_to_es
 
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
 # Global list to collect detail page URLs
 all_urls = []
 semaphore = asyncio.Semaphore(5)
@@ -26,7 +32,7 @@ async def scrape_listing_pages():
         url = f"https://www.cardias.fr/products/?page={page}"
         print(f"Loading listing page: {url}")
         
-        async with AsyncWebCrawler(config=browser_config) as crawler:
+        async with lease_crawler(browser_config) as crawler:
             result = await crawler.arun(
                 url=url,
                 config=CrawlerRunConfig(
@@ -13,8 +13,19 @@ from utils.voiture import VoitureUtils
 try:
     from insert2db.insert_scrape import insert_data_to_es
 except ImportError:
-    def insert_data_to_es(data, index):
-        print(f"[Mock] Inserting data to ES index '{index}'")
+    try:
+        # No Elasticsearch client here: spool the document for a process that has one
+        from core.spool import spool_document as insert_data_to_es
+    except ImportError:
+        def insert_data_to_es(data, index):
+            print(f"[Mock] Inserting data to ES index '{index}'")
+
+try:
+    from scraper.crawler.tiered_fetcher import fetch_page
+except ImportError:
+    async def fetch_page(url, site_key, browser_config=None, run_config=None, proxy=None):
+        async with AsyncWebCrawler(config=browser_config) as crawler:
+            return await crawler.arun(url=url, config=run_config)
 
 @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1))
 async def extract_car_details(url):
@@ -29,14 +40,15 @@ async def extract_car_details(url):
         )
     )
 
-    async with AsyncWebCrawler(config=browser_config) as crawler:
-        result = await crawler.arun(
-            url=url,
-            config=CrawlerRunConfig(
-                cache_mode=CacheMode.BYPASS,
-                delay_before_return_html=15
-            )
-        )
+    result = await fetch_page(
+        url,
+        "voiture/cardias",
+        browser_config,
+        CrawlerRunConfig(
+            cache_mode=CacheMode.BYPASS,
+            delay_before_return_html=15,
+        ),
+    )
     
     if not result.success:
         raise Exception(f"Failed to load page: {result.error_message}")
@@ -4,6 +4,12 @@ from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 from scrape_details import extract_car_details
 
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
 MAX_CONCURRENT = 5   # do NOT exceed (Chrome/Firefox dies)
 LISTING_PAGES = 20   # or detect automatically
 
@@ -37,7 +43,7 @@ async def fetch_listing_page(crawler, page_num):
 async def scrape_all_listings():
     browser_config = BrowserConfig(headless=True, browser_type="firefox", text_mode=False)
 
-    async with AsyncWebCrawler(config=browser_config) as crawler:
+    async with lease_crawler(browser_config) as crawler:
         tasks = [
             fetch_listing_page(crawler, page)
             for page in range(1, LISTING_PAGES + 1)
@@ -12,10 +12,17 @@ from scraper.utils.logger import get_logger
 from utils.voiture import VoitureUtils
 
 try:
-    from insert2db.insert_scrape import insert_data_to_es
+    from insert2db.insert_scrape import insert_data_to_es, insert_data_to_es_async
 except ImportError:
-    def insert_data_to_es(data, index):
-        print(f"[Mock] there is a problem in saving data'{index}'")
+    try:
+        # No Elasticsearch client here: spool the document for a process that has one
+        from core.spool import spool_document as insert_data_to_es
+    except ImportError:
+        def insert_data_to_es(data, index):
+            print(f"[Mock] there is a problem in saving data'{index}'")
+
+    async def insert_data_to_es_async(*args, **kwargs):
+        return await asyncio.to_thread(insert_data_to_es, *args, **kwargs)
 
 
 # ------------------- [NEW] JSON saver helper -------------------
@@ -34,7 +41,12 @@ def normalize_url(url):
     return os.path.splitext(url)[0]
 
 async def scrape_single_url(target_url, proxy_manager=None, max_retries=3):
-    """Main scraping function to scrape the data from a URL with infinite retries."""
+    """
+    Main scraping function to scrape the data from a URL.
+
+    Returns True once the record is saved, False when it was not (every
+    attempt failed, or the save itself did).
+    """
     
     # JS for scrolling to load dynamic content (User Info)
     js_commands = [
@@ -384,8 +396,7 @@ async def scrape_single_url(target_url, proxy_manager=None, max_retries=3):
                     # Save to JSONL
                     save_to_json(vehicle_data)
 
-                    insert_data_to_es(vehicle_data, index_name="voiture")
-                    return
+                    return bool(await insert_data_to_es_async(vehicle_data, index_name="voiture"))
                 else:
                     print("Essential fields are empty. Retrying...")
 
@@ -399,6 +410,7 @@ async def scrape_single_url(target_url, proxy_manager=None, max_retries=3):
         await asyncio.sleep(2)
         
     print(f"Failed to scrape {target_url} after {max_retries} attempts.")
+    return False
 
 # Run the function (uncomment to test)
 # asyncio.run(scrape_single_url("https://www.ouedkniss.com/voitures-suzuki-maruti-800-2011-bab-el-oued-alger-algerie-d47059732"))
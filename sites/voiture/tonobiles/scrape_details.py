@@ -13,8 +13,18 @@ from utils.voiture import VoitureUtils
 try:
     from insert2db.insert_scrape import insert_data_to_es
 except ImportError:
-    def insert_data_to_es(data, index):
-        print(f"[Mock] Inserting data to ES index '{index}'")
+    try:
+        # No Elasticsearch client here: spool the document for a process that has one
+        from core.spool import spool_document as insert_data_to_es
+    except ImportError:
+        def insert_data_to_es(data, index):
+            print(f"[Mock] Inserting data to ES index '{index}'")
+
+try:
+    from scraper.crawler.readiness import readiness_kwargs
+except ImportError:
+    def readiness_kwargs(category, site, page="detail", fallback_delay=5.0):
+        return {"delay_before_return_html": fallback_delay}
 
 async def scrape_car_details(url, item, etat):
     print(f"Scraping URL: {url}")
@@ -52,7 +62,7 @@ async def scrape_car_details(url, item, etat):
     config = CrawlerRunConfig(
         cache_mode=CacheMode.BYPASS,
         js_code=js_commands,
-        delay_before_return_html=10
+        **readiness_kwargs("voiture", "tonobiles", "detail", fallback_delay=10)
     )
 
     async with AsyncWebCrawler(verbose=True, config=browser_config) as crawler:
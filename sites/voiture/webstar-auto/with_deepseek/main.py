@@ -5,6 +5,12 @@ from config import BASE_URL, CSS_SELECTOR, REQUIRED_KEYS
 import asyncio
 from pydantic import BaseModel
 
+try:
+    from scraper.crawler.browser_pool import lease_crawler
+except ImportError:
+    def lease_crawler(browser_config):
+        return AsyncWebCrawler(config=browser_config)
+
 class Car(BaseModel):
     """
     Represents the data structure of a Car.
@@ -121,7 +127,7 @@ async def crawl_cars():
     seen_names = set()
 
     # Start the web crawler context
-    async with AsyncWebCrawler(config=browser_config) as crawler:
+    async with lease_crawler(browser_config) as crawler:
         # Fetch and process data from the first (and only) page
         cars, no_results_found = await fetch_and_process_page(
             crawler,
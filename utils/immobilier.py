@@ -25,48 +25,23 @@ class ImmobilierUtils:
 
     @staticmethod
     def save_listing_file(data: dict, folder: str = "junk_test"):
-        """Save a single listing as a pretty JSON file in the project root's junk_test folder."""
+        """
+        Append a single listing to the rolling JSONL segment of its site, in the
+        project root's junk_test/immobilier/<site>/ folder (see core/segments.py).
+        """
         # Calculate project root relative to this file (utils/immobilier.py)
-        # Assuming utils/immobilier.py is in the project root or a subfolder
-        try:
-            # If utils/immobilier.py is at root/utils/immobilier.py, root is ../
-            root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-            base_dir = os.path.join(root_dir, folder)
-        except Exception:
-            base_dir = folder
-        
-        os.makedirs(base_dir, exist_ok=True)
-
-        # Identifier logic
-        identifier = "item"
-        if isinstance(data.get("numero"), str) and data.get("numero"):
-            identifier = re.sub(r"[^0-9A-Za-z_-]", "", data["numero"])[:64]
-        else:
-            prof = data.get("contact", {}).get("profile_link")
-            if prof:
-                m = re.search(r"/membre/(\d+)", prof)
-                if m:
-                    identifier = m.group(1)
-            if identifier == "item":
-                try:
-                    last = os.path.basename(data.get("url", "").rstrip("/"))
-                    if last:
-                        identifier = re.sub(r"[^0-9A-Za-z_-]", "", last)[:64]
-                except Exception:
-                    pass
-        
-        if identifier == "item":
-            title = data.get("titre") or "listing"
-            identifier = re.sub(r"[^0-9A-Za-z_-]", "", title.replace(" ", "-"))[:64]
+        root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+        base_dir = os.path.join(root_dir, folder)
+
+        # "Ouedkniss.com" -> "ouedkniss" (the sites/ folder name)
+        site = str(data.get("site_origine") or "listings").lower().split(".")[0]
+        site = re.sub(r"[^0-9a-z_-]", "", site) or "listings"
+        path = os.path.join(base_dir, "immobilier", site)
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{timestamp}_{identifier}.json"
-        path = os.path.join(base_dir, filename)
-        
         try:
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            print(f"Saved listing to {path}")
+            from core.segments import get_segment_writer
+
+            get_segment_writer(path).write(data)
         except Exception as e:
             print(f"Failed to save listing file: {e}")
 